@@ -1,39 +1,53 @@
 # ai_analysis/analysis.py
-import pandas as pd
-from textblob import TextBlob
+from django.conf import settings
+
+from stock_project.executors import gather_legs, get_cpu_executor, run_io
+
+from .indicators import get_indicator_store
+from .sentiment import get_sentiment_pipeline, load_headlines
 
 def analyze_historical_data():
-    # Load historical stock data from a CSV or external API
-    stock_data = pd.read_csv("data/historical_stock_data.csv")
-    
-    # Example: Compute a 50-day moving average for trend analysis
-    stock_data['MA50'] = stock_data['Close'].rolling(window=50).mean()
-    latest_ma50 = stock_data['MA50'].iloc[-1]
-    
-    return latest_ma50
-
-def analyze_news_sentiment():
-    # In a real-world scenario, fetch news headlines from an API
-    news_headlines = [
-        "Market shows bullish trends as earnings beat expectations",
-        "Economic slowdown worries investors amid geopolitical tensions"
-    ]
-    
-    sentiments = [TextBlob(headline).sentiment.polarity for headline in news_headlines]
-    average_sentiment = sum(sentiments) / len(sentiments)
-    
-    return average_sentiment
+    # 50-day moving average for trend analysis, maintained incrementally
+    # (see indicators.IndicatorStore) instead of re-reading the CSV
+    return get_indicator_store().state().latest_ma
 
-def run_market_trend_analysis():
-    # Get analysis from various sources
-    trend_indicator = analyze_historical_data()
-    news_sentiment = analyze_news_sentiment()
-    
+def analyze_news_sentiment(news_headlines=None, executor=None):
+    # Headlines come from the configured feed file unless given; polarities
+    # are cached by content hash, so only unseen headlines hit TextBlob
+    if news_headlines is None:
+        news_headlines = load_headlines()
+    return get_sentiment_pipeline().average(news_headlines, executor)
+
+def combine_analysis(trend_indicator, news_sentiment):
     # Combine analysis into a result dictionary
-    results = {
+    return {
         "trend_indicator": trend_indicator,
         "news_sentiment": news_sentiment,
-        "investment_suggestion": "Buy" if trend_indicator > 100 and news_sentiment > 0 else "Sell"
+        "investment_suggestion": "Buy" if trend_indicator is not None and trend_indicator > 100 and news_sentiment is not None and news_sentiment > 0 else "Sell"
     }
-    
+
+def run_market_trend_analysis():
+    # Get analysis from various sources
+    trend_indicator = analyze_historical_data()
+    news_sentiment = analyze_news_sentiment()
+
+    return combine_analysis(trend_indicator, news_sentiment)
+
+async def run_market_trend_analysis_async():
+    """
+    Both legs at once: the indicator read on the I/O thread pool and the
+    sentiment scoring's TextBlob work on the CPU process pool (when one is
+    configured). Each leg is bounded by AI_LEG_TIMEOUTS; a leg that times
+    out or fails contributes None, and the result is flagged as partial
+    with the per-leg errors.
+    """
+    values, errors = await gather_legs({
+        "trend_indicator": run_io(analyze_historical_data),
+        "news_sentiment": run_io(analyze_news_sentiment, executor=get_cpu_executor()),
+    }, getattr(settings, "AI_LEG_TIMEOUTS", {}))
+
+    results = combine_analysis(values["trend_indicator"], values["news_sentiment"])
+    results["partial"] = bool(errors)
+    if errors:
+        results["errors"] = errors
     return results
@@ -0,0 +1,24 @@
+import logging
+
+from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AiAnalysisConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'ai_analysis'
+
+    def ready(self):
+        if not getattr(settings, 'STARTUP_WARMUP', False):
+            return
+        from .indicators import get_indicator_store
+        from .sentiment import warm_up
+
+        warm_up()
+        try:
+            # Loads the checkpoint (or parses the CSV once) ahead of the first request
+            get_indicator_store().state()
+        except Exception:
+            logger.warning('Could not warm up the indicator store.', exc_info=True)
@@ -0,0 +1,298 @@
+# ai_analysis/indicators.py
+import contextlib
+import csv
+import datetime
+import fcntl
+import json
+import math
+import os
+import tempfile
+import threading
+from collections import deque
+
+from django.conf import settings
+
+OHLCV_FIELDS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+CHECKPOINT_FORMAT = 1
+
+
+class BarError(ValueError):
+    """Raised when an OHLCV bar is malformed or out of order."""
+
+
+def get_historical_csv_path():
+    """Return the path of the historical OHLCV CSV."""
+    return str(getattr(
+        settings, "AI_HISTORICAL_CSV",
+        os.path.join(settings.BASE_DIR, "data", "historical_stock_data.csv"),
+    ))
+
+
+def get_checkpoint_path():
+    """Return the path the indicator state is checkpointed to."""
+    return str(getattr(
+        settings, "AI_INDICATOR_CHECKPOINT",
+        os.path.join(settings.BASE_DIR, "data", "indicator_state.json"),
+    ))
+
+
+def file_signature(path):
+    """(mtime_ns, size) of `path`, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def parse_date(value):
+    """The calendar date of an ISO date or datetime string ("2024-01-31", "2024-01-31 16:00")."""
+    if not isinstance(value, str):
+        raise TypeError("Expected a string.")
+    value = value.strip()
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).date()
+
+
+def parse_bar(data):
+    """Validate one OHLCV bar (a dict keyed by OHLCV_FIELDS) and return a clean copy."""
+    if not isinstance(data, dict):
+        raise BarError("Invalid bar. Expected an object.")
+    missing = [field for field in OHLCV_FIELDS if data.get(field) in (None, "")]
+    if missing:
+        raise BarError(f"Missing bar fields: {', '.join(missing)}.")
+    try:
+        date = parse_date(data["Date"])
+    except (TypeError, ValueError):
+        raise BarError("Invalid value for Date. Expected an ISO date (YYYY-MM-DD).")
+    bar = {"Date": date.isoformat()}
+    for field in OHLCV_FIELDS[1:]:
+        try:
+            value = float(data[field])
+        except (TypeError, ValueError):
+            raise BarError(f"Invalid numeric value for {field}.")
+        if isinstance(data[field], bool) or not math.isfinite(value):
+            raise BarError(f"Invalid numeric value for {field}.")
+        bar[field] = value
+    bar["Volume"] = int(bar["Volume"])
+    return bar
+
+
+class RollingMean:
+    """
+    Mean over the last `window` values, updated in O(1) per push by keeping
+    a running sum. The sum is re-anchored with math.fsum once per window so
+    floating-point drift cannot accumulate over a long-lived state.
+    """
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self._since_anchor = 0
+        for value in values:
+            self.push(value)
+
+    def push(self, value):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        self._since_anchor += 1
+        if self._since_anchor >= self.window:
+            self.total = math.fsum(self.values)
+            self._since_anchor = 0
+
+    @property
+    def value(self):
+        """The mean, or None until the window has filled (like pandas' NaN)."""
+        if len(self.values) < self.window:
+            return None
+        return self.total / self.window
+
+
+class IndicatorState:
+    """
+    Incremental indicators over a single OHLCV series.
+
+    Only what the indicators need is kept in memory: the last `window`
+    closes and the last bar. `append` is O(1), so serving the latest MA50
+    never touches the history CSV; the CSV is read once to bootstrap and
+    after that only checkpoints are loaded.
+    """
+
+    def __init__(self, window=50, closes=(), last_bar=None, bars=0, csv_signature=None):
+        self.ma = RollingMean(window, closes)
+        self.last_bar = last_bar
+        self.bars = bars
+        self.csv_signature = csv_signature
+
+    @property
+    def window(self):
+        return self.ma.window
+
+    @classmethod
+    def from_csv(cls, path, window=50):
+        """Bootstrap from the full history CSV (one streaming pass)."""
+        state = cls(window=window)
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                state.append(parse_bar(row))
+        state.csv_signature = file_signature(path)
+        return state
+
+    def append(self, bar):
+        """Add a validated bar; dates must be strictly increasing."""
+        if self.last_bar is not None and parse_date(bar["Date"]) <= parse_date(self.last_bar["Date"]):
+            raise BarError(f"Bar {bar['Date']} is not after the last bar ({self.last_bar['Date']}).")
+        self.ma.push(bar["Close"])
+        self.last_bar = bar
+        self.bars += 1
+
+    @property
+    def latest_ma(self):
+        return self.ma.value
+
+    def to_dict(self):
+        return {
+            "format": CHECKPOINT_FORMAT,
+            "window": self.window,
+            "closes": list(self.ma.values),
+            "last_bar": self.last_bar,
+            "bars": self.bars,
+            "csv_signature": self.csv_signature,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("format") != CHECKPOINT_FORMAT:
+            raise ValueError("Unsupported checkpoint format.")
+        if data["last_bar"] is not None:
+            parse_date(data["last_bar"]["Date"])
+        return cls(
+            window=data["window"], closes=data["closes"], last_bar=data["last_bar"],
+            bars=data["bars"], csv_signature=data["csv_signature"],
+        )
+
+    def save(self, path):
+        """Checkpoint atomically (temp file + rename) so readers never see a partial file."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def append_bars_to_csv(path, bars):
+    """Append bars to the history CSV so a rebuild from it stays complete."""
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=OHLCV_FIELDS)
+        writer.writerows(bars)
+
+
+class IndicatorStore:
+    """
+    Process-wide holder of the IndicatorState.
+
+    The state comes from the checkpoint when it matches the history CSV
+    (same mtime and size) and is rebuilt from the CSV otherwise. Appends
+    go to the CSV, the in-memory state and a fresh checkpoint under one
+    lock. Other workers pick the new state up when the checkpoint or the
+    CSV changes, at the cost of two stat() calls per read. Appends and
+    (re)loads hold an flock on `<checkpoint>.lock`, so a worker never
+    reads a CSV another worker is appending to, nor overwrites a newer
+    checkpoint with a state rebuilt from an older CSV.
+    """
+
+    def __init__(self, csv_path, checkpoint_path, window=50):
+        self.csv_path = csv_path
+        self.checkpoint_path = checkpoint_path
+        self.window = window
+        self._state = None
+        self._checkpoint_signature = None
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        with self._lock, open(self.checkpoint_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _load(self):
+        # Called with _file_lock held
+        csv_signature = file_signature(self.csv_path)
+        try:
+            state = IndicatorState.load(self.checkpoint_path)
+            if state.csv_signature == csv_signature and state.window == self.window:
+                return state, file_signature(self.checkpoint_path)
+        except (OSError, ValueError, KeyError):
+            pass
+        state = IndicatorState.from_csv(self.csv_path, window=self.window)
+        state.save(self.checkpoint_path)
+        return state, file_signature(self.checkpoint_path)
+
+    def _is_stale(self):
+        return (
+            self._state is None
+            or file_signature(self.checkpoint_path) != self._checkpoint_signature
+            or file_signature(self.csv_path) != self._state.csv_signature
+        )
+
+    def state(self):
+        """Return the current IndicatorState, (re)loading it if needed."""
+        if self._is_stale():
+            with self._file_lock():
+                if self._is_stale():
+                    self._state, self._checkpoint_signature = self._load()
+        return self._state
+
+    def append(self, bars):
+        """Validate and append bars; all or nothing. Returns the updated state."""
+        bars = [parse_bar(bar) for bar in bars]
+        with self._file_lock():
+            # Another worker may have appended while we waited for the lock
+            if self._is_stale():
+                self._state, self._checkpoint_signature = self._load()
+            state = IndicatorState.from_dict(self._state.to_dict())
+            for bar in bars:
+                state.append(bar)
+            append_bars_to_csv(self.csv_path, bars)
+            state.csv_signature = file_signature(self.csv_path)
+            state.save(self.checkpoint_path)
+            self._state, self._checkpoint_signature = state, file_signature(self.checkpoint_path)
+        return state
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_indicator_store():
+    """Return the process-wide IndicatorStore configured from settings."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IndicatorStore(
+                    get_historical_csv_path(), get_checkpoint_path(),
+                    window=getattr(settings, "AI_MA_WINDOW", 50),
+                )
+    return _store
+
+
+def reset_indicator_store():
+    """Drop the cached store (used when settings change, e.g. in tests)."""
+    global _store
+    with _store_lock:
+        _store = None
@@ -0,0 +1,40 @@
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_analysis.store import get_store_path, write_store_from_frame
+
+REQUIRED_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+
+
+class Command(BaseCommand):
+    help = "Build the memory-mapped OHLCV store from one or more CSV files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("inputs", nargs="+", help="CSV files with Date,Open,High,Low,Close,Volume (and Ticker).")
+        parser.add_argument("--ticker", help="Ticker for files without a Ticker column.")
+        parser.add_argument("--output", help="Store directory (defaults to AI_OHLCV_STORE).")
+
+    def handle(self, *args, **options):
+        frames = []
+        for path in options["inputs"]:
+            frame = pd.read_csv(path)
+            missing = [column for column in REQUIRED_COLUMNS if column not in frame]
+            if missing:
+                raise CommandError(f"{path} is missing columns: {', '.join(missing)}")
+            if "Ticker" not in frame:
+                if not options["ticker"]:
+                    raise CommandError(f"{path} has no Ticker column; pass --ticker.")
+                frame["Ticker"] = options["ticker"]
+            frames.append(frame[["Ticker"] + REQUIRED_COLUMNS])
+
+        bars = pd.concat(frames, ignore_index=True)
+        bars["Ticker"] = bars["Ticker"].astype(str).str.upper()
+        bars["Date"] = pd.to_datetime(bars["Date"])
+        # Later files win when the same (ticker, date) bar appears twice
+        bars = bars.drop_duplicates(["Ticker", "Date"], keep="last")
+
+        output = options["output"] or get_store_path()
+        write_store_from_frame(output, bars)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(bars)} bars for {bars['Ticker'].nunique()} tickers to {output}"
+        ))
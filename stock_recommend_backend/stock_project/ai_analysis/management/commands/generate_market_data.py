@@ -0,0 +1,85 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_analysis.store import StoreWriter
+from ai_analysis.synthetic import (
+    APPLICANT_CHUNK, BLOCK_TICKERS, DEFAULT_START, bars_frame, iter_applicant_blocks, iter_bar_blocks, universe_rows,
+)
+from riskpredictor.bulk import ChunkWriter, is_parquet
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate seeded synthetic OHLCV random walks for N tickers x M business days, "
+        "streamed in blocks to CSV, Parquet or the memory-mapped OHLCV store, plus an "
+        "optional matching stock universe and risk-applicant dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Bars output: .csv, .parquet or a store directory.")
+        parser.add_argument("--tickers", type=int, default=1, help="Number of tickers (default 1).")
+        parser.add_argument("--days", type=int, default=2000, help="Business days per ticker (default 2000).")
+        parser.add_argument("--start", default=DEFAULT_START, help=f"First business day (default {DEFAULT_START}).")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed (default 42).")
+        parser.add_argument("--universe", help="Also write a stocks_output.csv-style universe for the tickers.")
+        parser.add_argument("--applicants", type=int, default=0, help="Number of risk applicants to generate.")
+        parser.add_argument("--applicants-output", help="Applicants output (.csv or .parquet).")
+
+    def handle(self, *args, **options):
+        n_tickers, n_days = options["tickers"], options["days"]
+        if n_tickers <= 0 or n_days <= 0:
+            raise CommandError("--tickers and --days must be positive.")
+        if options["applicants"] and not options["applicants_output"]:
+            raise CommandError("--applicants needs --applicants-output.")
+        if not (options["output"] or options["universe"] or options["applicants"]):
+            raise CommandError("Nothing to do: pass --output, --universe and/or --applicants.")
+
+        started = time.perf_counter()
+        if options["output"] or options["universe"]:
+            self.write_bars(options, n_tickers, n_days)
+        if options["applicants"]:
+            writer = ChunkWriter(options["applicants_output"])
+            for frame in iter_applicant_blocks(options["applicants"], seed=options["seed"]):
+                writer.write(frame)
+            writer.close()
+            self.stdout.write(
+                f"Wrote {options['applicants']} applicants to {options['applicants_output']} "
+                f"(blocks of {APPLICANT_CHUNK})"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.2f}s"))
+
+    def write_bars(self, options, n_tickers, n_days):
+        output = options["output"]
+        bars_writer = None
+        if output and (output.endswith(".csv") or is_parquet(output)):
+            bars_writer = ChunkWriter(output)
+        elif output:
+            bars_writer = StoreWriter(output, n_tickers * n_days)
+        universe_writer = ChunkWriter(options["universe"]) if options["universe"] else None
+
+        try:
+            blocks = iter_bar_blocks(n_tickers, n_days, seed=options["seed"], start=options["start"])
+            for tickers, dates, columns in blocks:
+                if isinstance(bars_writer, StoreWriter):
+                    bars_writer.write(tickers, [n_days] * len(tickers), np.tile(dates, len(tickers)), columns)
+                elif bars_writer is not None:
+                    # A single series keeps the original historical_stock_data.csv layout
+                    bars_writer.write(bars_frame(tickers, dates, columns, ticker_column=n_tickers > 1))
+                if universe_writer is not None:
+                    universe_writer.write(universe_rows(tickers, dates, columns))
+        except BaseException:
+            if isinstance(bars_writer, StoreWriter):
+                bars_writer.abort()
+            raise
+        if bars_writer is not None:
+            bars_writer.close()
+            self.stdout.write(
+                f"Wrote {n_tickers * n_days} bars for {n_tickers} tickers to {output} "
+                f"(blocks of {BLOCK_TICKERS} tickers)"
+            )
+        if universe_writer is not None:
+            universe_writer.close()
+            self.stdout.write(f"Wrote a {n_tickers}-stock universe to {options['universe']}")
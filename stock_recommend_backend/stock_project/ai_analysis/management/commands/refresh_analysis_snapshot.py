@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_analysis.snapshots import build_snapshot_store, get_snapshot_config
+
+
+class Command(BaseCommand):
+    help = "Precompute the /ai/ analysis snapshot, once or on a fixed interval."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=60.0, help="Seconds between refreshes.")
+        parser.add_argument("--once", action="store_true", help="Refresh once and exit.")
+
+    def handle(self, *args, **options):
+        config = get_snapshot_config()
+        if not config.get("ENABLED", False):
+            raise CommandError("AI_SNAPSHOT is disabled.")
+        # A store of our own, so this process does not also start the in-process refresher
+        store = build_snapshot_store(config)
+        while True:
+            started = time.perf_counter()
+            snapshot = store.refresh()
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            self.stdout.write(f"Published snapshot v{snapshot.version} in {elapsed_ms:.1f} ms")
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,188 @@
+# ai_analysis/sentiment.py
+import hashlib
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+
+from stock_project.metrics import Histogram
+
+from .indicators import file_signature
+
+# Used when no headline feed file is configured or it does not exist
+DEFAULT_HEADLINES = [
+    "Market shows bullish trends as earnings beat expectations",
+    "Economic slowdown worries investors amid geopolitical tensions",
+]
+
+BATCH_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def normalize_headline(text):
+    """Collapse whitespace so trivially different copies share a cache entry."""
+    return " ".join(str(text).split())
+
+
+def headline_key(text):
+    """Content hash of a normalized headline, used as its cache key."""
+    return "sentiment:" + hashlib.sha256(normalize_headline(text).encode()).hexdigest()
+
+
+def score_batch(headlines):
+    """
+    TextBlob polarity for a batch of headlines plus the time it took (ms).
+    Module-level so process-pool workers can run it.
+    """
+    # Deferred: textblob pulls in nltk and scipy, over a second of import time
+    from textblob import TextBlob
+
+    started = time.perf_counter()
+    scores = [TextBlob(headline).sentiment.polarity for headline in headlines]
+    return scores, (time.perf_counter() - started) * 1000.0
+
+
+def warm_up():
+    """Import TextBlob and load its lexicon so the first request does not pay for it."""
+    score_batch(["Markets open higher"])
+
+
+class SentimentPipeline:
+    """
+    Scores headlines through a persistent, bounded cache of polarities.
+
+    Headlines are content-hashed; only the unseen ones are scored, in
+    batches of `batch_size`, either inline or (with `workers` > 0) across a
+    process pool. The cache is a Django cache alias, so a FileBasedCache
+    with MAX_ENTRIES gives a bound that survives restarts and is shared by
+    workers. Hit/miss counters and per-batch latency are kept per process.
+    """
+
+    def __init__(self, cache_alias="default", batch_size=256, workers=0):
+        self.cache_alias = cache_alias
+        self.batch_size = batch_size
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+        self.batch_latency_ms = Histogram(BATCH_LATENCY_BUCKETS_MS)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _score_unseen(self, texts, executor=None):
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if executor is None and self.workers > 0 and len(batches) > 1:
+            executor = self._get_pool()
+        if executor is not None:
+            results = executor.map(score_batch, batches)
+        else:
+            results = map(score_batch, batches)
+        scores = []
+        for batch_scores, elapsed_ms in results:
+            self.batch_latency_ms.observe(elapsed_ms)
+            scores.extend(batch_scores)
+        return scores
+
+    def score(self, headlines, executor=None):
+        """
+        Polarity of every headline, aligned with `headlines`. Unseen
+        headlines are scored on `executor` when one is given (e.g. the
+        shared process pool of the async views).
+        """
+        keys = [headline_key(headline) for headline in headlines]
+        cache = caches[self.cache_alias]
+        polarities = cache.get_many(list(set(keys)))
+
+        unseen = {key: normalize_headline(headline)
+                  for key, headline in zip(keys, headlines) if key not in polarities}
+        if unseen:
+            fresh = dict(zip(unseen, self._score_unseen(list(unseen.values()), executor)))
+            cache.set_many(fresh, timeout=None)
+            polarities.update(fresh)
+
+        with self._lock:
+            self.misses += len(unseen)
+            self.hits += len(keys) - len(unseen)
+        return [polarities[key] for key in keys]
+
+    def average(self, headlines, executor=None):
+        """Mean polarity of `headlines`, or None when there are none."""
+        if not headlines:
+            return None
+        scores = self.score(headlines, executor)
+        return sum(scores) / len(scores)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "cache": self.cache_alias,
+            "batch_size": self.batch_size,
+            "workers": self.workers,
+            "batch_latency_ms": self.batch_latency_ms.snapshot(),
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+_feed = (None, None)
+
+
+def get_sentiment_pipeline():
+    """Return the process-wide SentimentPipeline configured from AI_SENTIMENT."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                config = getattr(settings, "AI_SENTIMENT", {})
+                _pipeline = SentimentPipeline(
+                    cache_alias=config.get("CACHE", "default"),
+                    batch_size=config.get("BATCH_SIZE", 256),
+                    workers=config.get("WORKERS", 0),
+                )
+    return _pipeline
+
+
+def reset_sentiment_pipeline():
+    """Drop the pipeline (and its pool) so settings changes take effect."""
+    global _pipeline, _feed
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.close()
+        _pipeline = None
+        _feed = (None, None)
+
+
+def load_headlines():
+    """
+    Headlines from AI_SENTIMENT['HEADLINES_FILE'] (one per line, blank lines
+    skipped), re-read only when the file changes. Falls back to
+    DEFAULT_HEADLINES when no file is configured or it is missing.
+    """
+    global _feed
+    path = getattr(settings, "AI_SENTIMENT", {}).get("HEADLINES_FILE")
+    if not path:
+        return list(DEFAULT_HEADLINES)
+    signature = (str(path), file_signature(path))
+    if signature[1] is None:
+        return list(DEFAULT_HEADLINES)
+    cached_signature, headlines = _feed
+    if cached_signature != signature:
+        with open(path, encoding="utf-8") as f:
+            headlines = [line.strip() for line in f if line.strip()]
+        _feed = (signature, headlines)
+    return list(headlines)
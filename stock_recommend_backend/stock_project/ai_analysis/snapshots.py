@@ -0,0 +1,244 @@
+# ai_analysis/snapshots.py
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .analysis import analyze_historical_data, analyze_news_sentiment, combine_analysis
+from .indicators import file_signature
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+
+def compute_payloads():
+    """Run each analysis leg once and build the body of every snapshot view."""
+    trend_indicator = analyze_historical_data()
+    news_sentiment = analyze_news_sentiment()
+    return {
+        "analyze": combine_analysis(trend_indicator, news_sentiment),
+        "news": {"news_sentiment": news_sentiment},
+        "historical": {"trend_indicator": trend_indicator},
+    }
+
+
+def payload_etag(payload):
+    """Strong ETag derived from the payload's content."""
+    encoded = json.dumps(payload, sort_keys=True, cls=DjangoJSONEncoder).encode()
+    return '"' + hashlib.sha1(encoded).hexdigest()[:20] + '"'
+
+
+class Snapshot:
+    """
+    One immutable, versioned set of precomputed view payloads. Each entry
+    has its ETag and the time its content last changed (Last-Modified), so
+    a refresh that produces the same content keeps clients' 304s valid.
+    """
+
+    def __init__(self, version, computed_at, entries):
+        self.version = version
+        self.computed_at = computed_at
+        self.entries = entries
+
+    def age(self):
+        return time.time() - self.computed_at
+
+    def to_dict(self):
+        return {
+            "format": SNAPSHOT_FORMAT,
+            "version": self.version,
+            "computed_at": self.computed_at,
+            "entries": self.entries,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError("Unsupported snapshot format.")
+        return cls(data["version"], data["computed_at"], data["entries"])
+
+    @classmethod
+    def build(cls, payloads, previous=None):
+        now = time.time()
+        entries = {}
+        for name, payload in payloads.items():
+            etag = payload_etag(payload)
+            old = previous.entries.get(name) if previous is not None else None
+            last_modified = old["last_modified"] if old and old["etag"] == etag else now
+            entries[name] = {"payload": payload, "etag": etag, "last_modified": last_modified}
+        return cls((previous.version + 1) if previous is not None else 1, now, entries)
+
+
+class SnapshotStore:
+    """
+    Serves analysis snapshots from memory and keeps them fresh.
+
+    The snapshot is persisted to `path` (atomically), so it can be produced
+    by the `refresh_analysis_snapshot` command or by any worker and picked
+    up by the others; the file is checked at most every `check_interval`
+    seconds. A snapshot older than `max_age` is recomputed before it is
+    served, which bounds staleness even with no refresher running.
+    Refreshes hold an flock on `<path>.lock` and start from the newest
+    file, so processes never publish the same version twice and a stale
+    snapshot is recomputed by one process while the others wait for it.
+    """
+
+    def __init__(self, path, max_age=300.0, check_interval=1.0):
+        self.path = str(path)
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def _load_file(self):
+        signature = file_signature(self.path)
+        if signature is None or signature == self._signature:
+            return
+        try:
+            with open(self.path) as f:
+                snapshot = Snapshot.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            logger.warning("Ignoring unreadable analysis snapshot at %s.", self.path)
+            return
+        if self._snapshot is None or snapshot.version >= self._snapshot.version:
+            self._snapshot = snapshot
+        self._signature = signature
+
+    def _save(self, snapshot):
+        """Write `snapshot` atomically and return the file's new signature."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot.to_dict(), f, cls=DjangoJSONEncoder)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return file_signature(self.path)
+
+    def _is_stale(self, snapshot, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        return snapshot is None or (max_age is not None and snapshot.age() > max_age)
+
+    def refresh(self, only_if_stale=False, max_age=None):
+        """
+        Recompute every payload now and publish a new snapshot version.
+        With `only_if_stale`, a snapshot no older than `max_age` (default:
+        the store's) that another thread or process already refreshed is
+        returned instead.
+
+        Publishers (threads included: each opens its own lock file) are
+        serialized by the flock alone; the payloads are computed without
+        holding `_lock`, so readers keep being served the current snapshot
+        meanwhile.
+        """
+        with open(self.path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            with self._lock:
+                self._load_file()
+                previous = self._snapshot
+            if only_if_stale and not self._is_stale(previous, max_age):
+                return previous
+            snapshot = Snapshot.build(compute_payloads(), previous=previous)
+            signature = self._save(snapshot)
+            with self._lock:
+                self._snapshot, self._signature = snapshot, signature
+        return snapshot
+
+    def current(self):
+        """Return a snapshot no older than `max_age`, computing one if needed."""
+        now = time.monotonic()
+        if self._snapshot is None or now - self._checked_at >= self.check_interval:
+            # With a snapshot in hand, skip the check rather than wait for a
+            # thread that is already checking
+            if self._lock.acquire(blocking=self._snapshot is None):
+                try:
+                    self._checked_at = now
+                    self._load_file()
+                finally:
+                    self._lock.release()
+        snapshot = self._snapshot
+        if self._is_stale(snapshot):
+            snapshot = self.refresh(only_if_stale=True)
+        return snapshot
+
+    def get(self, name):
+        """The entry ({payload, etag, last_modified}) for one view."""
+        return self.current().entries[name]
+
+    def start_refresher(self, interval):
+        """
+        Refresh every `interval` seconds on a daemon thread (once per
+        process). When several workers run one, a worker skips its turn if
+        another published within the interval, so the group refreshes
+        about once per interval rather than once per worker.
+        """
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_forever, args=(interval,), name="analysis-snapshot", daemon=True,
+            )
+            self._refresher.start()
+
+    def _refresh_forever(self, interval):
+        while True:
+            try:
+                self.refresh(only_if_stale=True, max_age=interval)
+            except Exception:
+                logger.exception("Refreshing the analysis snapshot failed.")
+            time.sleep(interval)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_config():
+    return getattr(settings, "AI_SNAPSHOT", {})
+
+
+def build_snapshot_store(config):
+    """Build a SnapshotStore from an AI_SNAPSHOT settings dict."""
+    return SnapshotStore(
+        config.get("PATH", os.path.join(settings.BASE_DIR, "data", "analysis_snapshot.json")),
+        max_age=config.get("MAX_AGE", 300.0),
+        check_interval=config.get("CHECK_INTERVAL", 1.0),
+    )
+
+
+def get_snapshot_store():
+    """
+    Return the process-wide SnapshotStore, or None when AI_SNAPSHOT is off.
+    Starts the in-process refresher on first use if REFRESH_INTERVAL is set.
+    """
+    global _store
+    config = get_snapshot_config()
+    if not config.get("ENABLED", False):
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = build_snapshot_store(config)
+                if config.get("REFRESH_INTERVAL"):
+                    _store.start_refresher(config["REFRESH_INTERVAL"])
+    return _store
+
+
+def reset_snapshot_store():
+    """Drop the cached store so settings changes take effect (tests)."""
+    global _store
+    with _store_lock:
+        _store = None
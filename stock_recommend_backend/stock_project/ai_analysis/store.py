@@ -0,0 +1,238 @@
+# ai_analysis/store.py
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .indicators import file_signature
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+MANIFEST = "manifest.json"
+STORE_FORMAT = 1
+
+
+class StoreError(Exception):
+    """Raised when the OHLCV store is missing or a lookup cannot be served."""
+
+
+def get_store_path():
+    """Return the directory of the columnar OHLCV store."""
+    return str(getattr(
+        settings, "AI_OHLCV_STORE",
+        os.path.join(settings.BASE_DIR, "data", "ohlcv"),
+    ))
+
+
+class OHLCVSlice:
+    """
+    A contiguous, in-memory copy of some tickers' bars, laid out exactly
+    like the store (per-ticker segments back to back) so the vectorized
+    indicators in `technical` run over it in one pass.
+    """
+
+    def __init__(self, tickers, lengths, dates, columns):
+        self.tickers = list(tickers)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.offsets = np.cumsum(self.lengths) - self.lengths
+        self.dates = dates
+        self.columns = columns
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    @property
+    def last_index(self):
+        return self.offsets + self.lengths - 1
+
+
+class OHLCVStore:
+    """
+    Columnar OHLCV bars for many tickers.
+
+    Each column (dates, open, high, low, close, volume) is one contiguous
+    .npy array holding every ticker's bars back to back, sorted by date
+    within a ticker; manifest.json maps each ticker to its (offset,
+    length). Arrays are opened with mmap_mode='r', so looking up a few
+    tickers only pages in their slices.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise StoreError(f"No OHLCV store at {self.path}. Run build_ohlcv_store first.")
+        if manifest.get("format") != STORE_FORMAT:
+            raise StoreError("Unsupported OHLCV store format.")
+        self.tickers = manifest["tickers"]
+        self.offsets = np.asarray(manifest["offsets"], dtype=np.int64)
+        self.lengths = np.asarray(manifest["lengths"], dtype=np.int64)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.dates = np.load(os.path.join(self.path, "dates.npy"), mmap_mode="r")
+        self.columns = {
+            column: np.load(os.path.join(self.path, f"{column}.npy"), mmap_mode="r")
+            for column in PRICE_COLUMNS
+        }
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self.index
+
+    def select(self, tickers, lookback=None):
+        """
+        Copy the bars of `tickers` (optionally only the last `lookback` of
+        each) into an OHLCVSlice. Raises StoreError for unknown tickers.
+        """
+        unknown = [ticker for ticker in tickers if ticker not in self.index]
+        if unknown:
+            raise StoreError(f"Unknown tickers: {', '.join(unknown)}.")
+        positions = np.array([self.index[ticker] for ticker in tickers], dtype=np.int64)
+        lengths = self.lengths[positions]
+        starts = self.offsets[positions]
+        if lookback is not None:
+            starts = starts + np.maximum(lengths - lookback, 0)
+            lengths = np.minimum(lengths, lookback)
+        # One fancy-indexing gather per column touches only the needed pages
+        rows = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+        return OHLCVSlice(
+            tickers, lengths, np.asarray(self.dates[rows]),
+            {column: np.asarray(values[rows]) for column, values in self.columns.items()},
+        )
+
+    def all(self):
+        """Every ticker as one OHLCVSlice (reads the whole store)."""
+        return OHLCVSlice(
+            self.tickers, self.lengths, np.asarray(self.dates),
+            {column: np.asarray(values) for column, values in self.columns.items()},
+        )
+
+
+class StoreWriter:
+    """
+    Streams ticker blocks into a new store of `total_rows` bars. Columns
+    are preallocated .npy memmaps in a sibling temp directory, so memory
+    stays bounded by one block; `close()` writes the manifest and swaps the
+    directory in place of `path`, so readers see either the old or the new
+    store. Used as a context manager, an exception discards the partial store.
+    """
+
+    def __init__(self, path, total_rows):
+        self.path = os.path.abspath(str(path))
+        self.total_rows = int(total_rows)
+        self.tickers = []
+        self.lengths = []
+        self.position = 0
+        parent = os.path.dirname(self.path)
+        os.makedirs(parent, exist_ok=True)
+        self.tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".ohlcv-")
+        self.dates = np.lib.format.open_memmap(
+            os.path.join(self.tmp_dir, "dates.npy"), mode="w+", dtype="datetime64[D]", shape=(self.total_rows,),
+        )
+        self.columns = {
+            column: np.lib.format.open_memmap(
+                os.path.join(self.tmp_dir, f"{column}.npy"), mode="w+", dtype=np.float64, shape=(self.total_rows,),
+            )
+            for column in PRICE_COLUMNS
+        }
+
+    def write(self, tickers, lengths, dates, columns):
+        """Append a block: bars of `tickers` (grouped, in order) with their `lengths`."""
+        end = self.position + len(dates)
+        if int(np.sum(lengths)) != len(dates) or end > self.total_rows:
+            raise ValueError("Block does not fit the declared store size.")
+        self.dates[self.position:end] = np.asarray(dates, dtype="datetime64[D]")
+        for column in PRICE_COLUMNS:
+            self.columns[column][self.position:end] = columns[column]
+        self.tickers.extend(tickers)
+        self.lengths.extend(int(length) for length in lengths)
+        self.position = end
+
+    def close(self):
+        if self.position != self.total_rows:
+            raise ValueError(f"Store has {self.position} of {self.total_rows} declared bars.")
+        for array in (self.dates, *self.columns.values()):
+            array.flush()
+        self.dates = self.columns = None
+        lengths = np.asarray(self.lengths, dtype=np.int64)
+        with open(os.path.join(self.tmp_dir, MANIFEST), "w") as f:
+            json.dump({
+                "format": STORE_FORMAT,
+                "tickers": self.tickers,
+                "offsets": (np.cumsum(lengths) - lengths).tolist(),
+                "lengths": lengths.tolist(),
+            }, f)
+        parent = os.path.dirname(self.path)
+        old_dir = None
+        if os.path.exists(self.path):
+            old_dir = tempfile.mkdtemp(dir=parent, prefix=".ohlcv-old-")
+            os.replace(self.path, os.path.join(old_dir, "store"))
+        os.replace(self.tmp_dir, self.path)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    def abort(self):
+        self.dates = self.columns = None
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_store(path, tickers, lengths, dates, columns):
+    """
+    Write a whole store at once. `columns` maps each of PRICE_COLUMNS to a
+    float array aligned with `dates` (datetime64[D]), grouped by ticker in
+    `tickers` order.
+    """
+    if int(np.sum(lengths)) != len(dates):
+        raise ValueError("Ticker lengths do not add up to the number of bars.")
+    with StoreWriter(path, len(dates)) as writer:
+        writer.write(tickers, lengths, dates, columns)
+
+
+def write_store_from_frame(path, frame):
+    """
+    Write a store from a DataFrame with Ticker, Date, Open, High, Low,
+    Close and Volume columns (any order; rows are sorted here).
+    """
+    frame = frame.sort_values(["Ticker", "Date"], kind="stable")
+    tickers, lengths = np.unique(frame["Ticker"].astype(str).to_numpy(), return_counts=True)
+    write_store(
+        path, tickers.tolist(), lengths,
+        frame["Date"].to_numpy(dtype="datetime64[D]"),
+        {column: frame[column.capitalize()].to_numpy(dtype=np.float64) for column in PRICE_COLUMNS},
+    )
+
+
+_store = None
+_store_signature = None
+_store_lock = threading.Lock()
+
+
+def get_ohlcv_store():
+    """
+    Return the process-wide OHLCVStore, reopening it when the manifest
+    changes (a rebuild replaces the whole directory).
+    """
+    global _store, _store_signature
+    path = get_store_path()
+    signature = (path, file_signature(os.path.join(path, MANIFEST)))
+    if _store is None or signature != _store_signature:
+        with _store_lock:
+            if _store is None or signature != _store_signature:
+                _store = OHLCVStore(path)
+                _store_signature = signature
+    return _store
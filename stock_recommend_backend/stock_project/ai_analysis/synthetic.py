@@ -0,0 +1,143 @@
+# ai_analysis/synthetic.py
+"""
+Seeded, vectorized synthetic data for fixtures and benchmarks: OHLCV
+random walks for many tickers, a matching stock universe and risk
+applicants. Used by the `generate_market_data` command.
+"""
+import numpy as np
+import pandas as pd
+
+from stock_app.ingest import CSV_FIELDS, classify_volatility
+
+# Tickers are generated in fixed-size blocks, each with its own RNG stream,
+# so the output for a seed does not depend on how it is written out
+BLOCK_TICKERS = 256
+
+# Applicants are generated the same way, APPLICANT_CHUNK rows per stream
+APPLICANT_CHUNK = 100000
+
+# First business day of the generated bars
+DEFAULT_START = "2020-01-01"
+
+# Categories the risk model was trained on
+APPLICANT_CATEGORIES = {
+    "gender": ["Female", "Male", "Other", "Prefer not to say"],
+    "alcohol_consumption": ["Never", "Occasionally", "Frequently", "Daily"],
+    "physical_activity": ["Sedentary", "Moderate", "Active", "Very Active"],
+    "dietary_habits": ["Healthy", "Balanced", "Unhealthy", "Junk Food Regularly"],
+    "occupation": ["Office Job", "Field Job", "Heavy Labor", "Freelancer", "Self-employed", "Unemployed"],
+}
+
+
+def ticker_symbols(start, stop):
+    """Deterministic four-letter symbols (AAAA, AAAB, ...) for indices [start, stop)."""
+    index = np.arange(start, stop)
+    letters = [(index // 26 ** power) % 26 for power in (3, 2, 1, 0)]
+    codes = np.stack(letters, axis=1) + ord("A")
+    return ["".join(map(chr, row)) for row in codes]
+
+
+def generate_bars(rng, n_tickers, dates):
+    """
+    Geometric random walks for `n_tickers` over `dates`, all at once.
+    Each ticker draws its own starting price, daily volatility and drift.
+    The open is the previous close, and the high/low wicks scale with
+    volatility. Returns flat, ticker-major columns (open, high, low,
+    close, volume).
+    """
+    n_days = len(dates)
+    start = rng.lognormal(np.log(100.0), 0.8, n_tickers)
+    volatility = rng.uniform(0.005, 0.035, n_tickers)
+    drift = rng.normal(0.0003, 0.0003, n_tickers)
+
+    returns = rng.standard_normal((n_tickers, n_days)) * volatility[:, None]
+    returns += (drift - 0.5 * volatility ** 2)[:, None]
+    close = start[:, None] * np.exp(np.cumsum(returns, axis=1))
+    open_ = np.empty_like(close)
+    open_[:, 0] = close[:, 0]
+    open_[:, 1:] = close[:, :-1]
+
+    wicks = np.abs(rng.standard_normal((2, n_tickers, n_days))) * (0.5 * volatility[:, None] * close)
+    high = np.maximum(open_, close) + wicks[0]
+    low = np.maximum(np.minimum(open_, close) - wicks[1], 0.01)
+    volume = rng.integers(100_000, 1_000_000, (n_tickers, n_days))
+
+    return {
+        "open": np.round(open_, 2).ravel(),
+        "high": np.round(high, 2).ravel(),
+        "low": np.round(low, 2).ravel(),
+        "close": np.round(close, 2).ravel(),
+        "volume": volume.ravel().astype(np.float64),
+    }
+
+
+def iter_bar_blocks(n_tickers, n_days, seed=42, start=DEFAULT_START):
+    """
+    Yield (tickers, dates, columns) per block of BLOCK_TICKERS tickers;
+    `dates` are the business days shared by every ticker.
+    """
+    dates = pd.bdate_range(start=start, periods=n_days).values.astype("datetime64[D]")
+    for block, first in enumerate(range(0, n_tickers, BLOCK_TICKERS)):
+        last = min(first + BLOCK_TICKERS, n_tickers)
+        rng = np.random.default_rng([seed, block])
+        yield ticker_symbols(first, last), dates, generate_bars(rng, last - first, dates)
+
+
+def bars_frame(tickers, dates, columns, ticker_column=True):
+    """DataFrame in the historical CSV layout for one block."""
+    frame = pd.DataFrame({
+        "Date": np.tile(dates, len(tickers)).astype(str),
+        "Open": columns["open"],
+        "High": columns["high"],
+        "Low": columns["low"],
+        "Close": columns["close"],
+        "Volume": columns["volume"].astype(np.int64),
+    })
+    if ticker_column:
+        frame.insert(0, "Ticker", np.repeat(tickers, len(dates)))
+    return frame
+
+
+def universe_rows(tickers, dates, columns, window=20):
+    """
+    stocks_output.csv rows for one block: volatility is classified exactly
+    as stock_app ingest does, from the mean intraday range over the last
+    `window` days.
+    """
+    shape = (len(tickers), len(dates))
+    high, low, close = (columns[c].reshape(shape)[:, -window:] for c in ("high", "low", "close"))
+    range_pct = ((high - low) / close * 100).mean(axis=1)
+    volatility = classify_volatility(range_pct)
+    return pd.DataFrame({
+        "ticker": tickers,
+        "company_name": [f"{ticker} Synthetic Corp." for ticker in tickers],
+        "volatility": volatility,
+        "range_pct": np.round(range_pct, 4),
+    })[CSV_FIELDS]
+
+
+def applicant_frame(rng, n):
+    """`n` risk applicants using the predict_risk payload keys (score_risk input)."""
+    smoker = rng.random(n) < 0.2
+    applicants = {
+        "age": rng.integers(18, 81, n),
+        "height": np.round(np.clip(rng.normal(170, 10, n), 140, 210), 1),
+        "weight": np.round(np.clip(rng.normal(78, 16, n), 40, 180), 1),
+        "smoking_status": np.where(smoker, "Yes", "No"),
+        "cigarettes_per_day": np.where(smoker, rng.integers(1, 41, n), 0),
+    }
+    for field, categories in APPLICANT_CATEGORIES.items():
+        applicants[field] = np.asarray(categories, dtype=object)[rng.integers(0, len(categories), n)]
+    return pd.DataFrame(applicants)
+
+
+def iter_applicant_blocks(n, seed=42):
+    """Yield applicant frames of up to APPLICANT_CHUNK rows, one RNG stream each."""
+    for block, first in enumerate(range(0, n, APPLICANT_CHUNK)):
+        rng = np.random.default_rng([seed, 1_000_003, block])
+        yield applicant_frame(rng, min(APPLICANT_CHUNK, n - first))
+
+
+def generate_applicants(n, seed=42):
+    """All `n` applicants of `iter_applicant_blocks` in one frame."""
+    return pd.concat(iter_applicant_blocks(n, seed=seed), ignore_index=True)
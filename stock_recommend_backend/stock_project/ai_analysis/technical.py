@@ -0,0 +1,181 @@
+# ai_analysis/technical.py
+"""
+Vectorized technical indicators over many tickers at once.
+
+Series are laid out as in the OHLCV store: one flat array with each
+ticker's bars back to back, described by per-ticker `lengths`. Every
+indicator runs over the whole flat array in one pass; values inside a
+ticker's warm-up period (not enough bars yet) are NaN, and no window ever
+reaches across a ticker boundary.
+"""
+import numpy as np
+
+TRADING_DAYS = 252
+
+# Indicator name -> (function name, parameter) computed by `latest_indicators`
+DEFAULT_INDICATORS = {
+    "sma_50": ("sma", 50),
+    "ema_20": ("ema", 20),
+    "rsi_14": ("rsi", 14),
+    "atr_14": ("atr", 14),
+    "volatility_20": ("realized_volatility", 20),
+}
+
+
+def segment_positions(lengths):
+    """Position of every bar within its own ticker (0 for each first bar)."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) - np.repeat(offsets, lengths)
+
+
+def rolling_sum(values, lengths, window, positions=None):
+    """Sum over the last `window` values of each ticker (NaN during warm-up)."""
+    positions = segment_positions(lengths) if positions is None else positions
+    cumulative = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    end = np.arange(1, len(values) + 1)
+    out = cumulative[end] - cumulative[np.maximum(end - window, 0)]
+    out[positions < window - 1] = np.nan
+    return out
+
+
+def sma(close, lengths, window=50):
+    """Simple moving average (matches pandas `rolling(window).mean()`)."""
+    return rolling_sum(close, lengths, window) / window
+
+
+def ewm(values, lengths, alpha):
+    """
+    Exponentially weighted mean seeded with each ticker's first value
+    (pandas `ewm(alpha=alpha, adjust=False)`). The recursion is walked one
+    time step at a time for all tickers together; tickers are ordered by
+    length so the ones still active at step t are a prefix.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    out = np.empty(len(values), dtype=np.float64)
+    if not len(values):
+        return out
+    offsets = np.cumsum(lengths) - lengths
+    order = np.argsort(-lengths, kind="stable")
+    order = order[lengths[order] > 0]
+    starts = offsets[order]
+    sorted_lengths = lengths[order]
+    active_counts = np.searchsorted(-sorted_lengths, -np.arange(sorted_lengths[0]), side="left")
+
+    current = np.asarray(values[starts], dtype=np.float64)
+    out[starts] = current
+    for t in range(1, int(sorted_lengths[0])):
+        n = active_counts[t]
+        index = starts[:n] + t
+        current = current[:n]
+        current += alpha * (values[index] - current)
+        out[index] = current
+    return out
+
+
+def ema(close, lengths, span=20):
+    """Exponential moving average, NaN until `span` bars are available."""
+    out = ewm(close, lengths, 2.0 / (span + 1))
+    out[segment_positions(lengths) < span - 1] = np.nan
+    return out
+
+
+def _previous(values, positions):
+    """Previous bar's value within the same ticker (the bar itself at position 0)."""
+    previous = np.empty_like(values)
+    previous[1:] = values[:-1]
+    first = positions == 0
+    previous[first] = values[first]
+    return previous
+
+
+def rsi(close, lengths, period=14):
+    """Relative Strength Index with Wilder's smoothing of gains and losses."""
+    positions = segment_positions(lengths)
+    delta = close - _previous(close, positions)
+    # The first bar of each ticker has no change; smoothing starts at the second
+    keep = positions > 0
+    delta_lengths = np.maximum(np.asarray(lengths) - 1, 0)
+    delta = delta[keep]
+    gains = ewm(np.clip(delta, 0, None), delta_lengths, 1.0 / period)
+    losses = ewm(np.clip(-delta, 0, None), delta_lengths, 1.0 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.where(losses == 0, 100.0, 100.0 - 100.0 / (1.0 + gains / losses))
+    out = np.full(len(close), np.nan)
+    out[keep] = values
+    out[positions < period] = np.nan
+    return out
+
+
+def true_range(high, low, close, lengths):
+    """High-low range widened by gaps from the previous close."""
+    previous_close = _previous(close, segment_positions(lengths))
+    return np.maximum.reduce([high - low, np.abs(high - previous_close), np.abs(low - previous_close)])
+
+
+def atr(high, low, close, lengths, period=14):
+    """Average True Range with Wilder's smoothing."""
+    out = ewm(true_range(high, low, close, lengths), lengths, 1.0 / period)
+    out[segment_positions(lengths) < period - 1] = np.nan
+    return out
+
+
+def realized_volatility(close, lengths, window=20, periods_per_year=TRADING_DAYS):
+    """Annualized rolling standard deviation of daily log returns."""
+    positions = segment_positions(lengths)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.log(close / _previous(close, positions))
+    returns[positions == 0] = 0.0
+    total = rolling_sum(returns, lengths, window, positions)
+    squares = rolling_sum(returns ** 2, lengths, window, positions)
+    variance = np.clip((squares - total ** 2 / window) / (window - 1), 0, None)
+    out = np.sqrt(variance * periods_per_year)
+    # The window must hold `window` real returns, which needs window + 1 bars
+    out[positions < window] = np.nan
+    return out
+
+
+INDICATOR_FUNCTIONS = {
+    "sma": lambda bars, window: sma(bars["close"], bars.lengths, window),
+    "ema": lambda bars, span: ema(bars["close"], bars.lengths, span),
+    "rsi": lambda bars, period: rsi(bars["close"], bars.lengths, period),
+    "atr": lambda bars, period: atr(bars["high"], bars["low"], bars["close"], bars.lengths, period),
+    "realized_volatility": lambda bars, window: realized_volatility(bars["close"], bars.lengths, window),
+}
+
+
+def compute_indicators(bars, indicators=None):
+    """
+    Compute every indicator for all tickers in `bars` (an OHLCVSlice).
+    Returns {name: flat array aligned with the bars}.
+    """
+    indicators = indicators or DEFAULT_INDICATORS
+    return {
+        name: INDICATOR_FUNCTIONS[function](bars, parameter)
+        for name, (function, parameter) in indicators.items()
+    }
+
+
+def latest_indicators(bars, indicators=None):
+    """
+    Latest bar and indicator values per ticker:
+    {ticker: {"date", "close", "volume", <indicator>: float | None}}.
+    """
+    computed = compute_indicators(bars, indicators)
+    last = bars.last_index
+    results = {}
+    for i, ticker in enumerate(bars.tickers):
+        if bars.lengths[i] == 0:
+            results[ticker] = None
+            continue
+        row = last[i]
+        entry = {
+            "date": str(bars.dates[row]),
+            "close": float(bars["close"][row]),
+            "volume": float(bars["volume"][row]),
+        }
+        for name, values in computed.items():
+            value = float(values[row])
+            entry[name] = None if np.isnan(value) else value
+        results[ticker] = entry
+    return results
@@ -1,8 +1,69 @@
 # ai_analysis/tests.py
-from django.test import TestCase
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.core.management import call_command
+from django.conf import settings
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 
-class AIAnalysisTests(TestCase):
+from riskpredictor.features import parse_applicant
+from stock_app.universe import VOLATILITY_BUCKETS, UniverseIndex
+
+from . import snapshots, views
+from .indicators import IndicatorState, IndicatorStore, get_indicator_store, reset_indicator_store
+from .sentiment import get_sentiment_pipeline, reset_sentiment_pipeline, score_batch
+from .snapshots import build_snapshot_store, get_snapshot_store, reset_snapshot_store
+from .store import OHLCVStore
+from .synthetic import DEFAULT_START, generate_applicants
+
+SOURCE_CSV = os.path.join(settings.BASE_DIR, "data", "historical_stock_data.csv")
+
+
+class AIAnalysisTestCase(TestCase):
+    """Points the historical CSV and indicator checkpoint at a temp copy."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.csv_path = os.path.join(self.tmpdir, "historical_stock_data.csv")
+        self.checkpoint_path = os.path.join(self.tmpdir, "indicator_state.json")
+        shutil.copy(SOURCE_CSV, self.csv_path)
+        overrides = override_settings(
+            AI_HISTORICAL_CSV=self.csv_path,
+            AI_INDICATOR_CHECKPOINT=self.checkpoint_path,
+            AI_SNAPSHOT={"ENABLED": False},
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                "sentiment": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": self.tmpdir},
+            },
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for reset in (reset_indicator_store, reset_sentiment_pipeline, reset_snapshot_store):
+            reset()
+            self.addCleanup(reset)
+
+    def pandas_ma50(self):
+        return pd.read_csv(self.csv_path)["Close"].rolling(window=50).mean().iloc[-1]
+
+    def append(self, bars):
+        return self.client.post(reverse("append_bars"), data={"bars": bars}, content_type="application/json")
+
+
+class AIAnalysisTests(AIAnalysisTestCase):
     def test_analyze_endpoint(self):
         response = self.client.get(reverse('analyze'))
         self.assertEqual(response.status_code, 200)
@@ -22,3 +83,420 @@ class AIAnalysisTests(TestCase):
         self.assertEqual(response.status_code, 200)
         data = response.json()
         self.assertIn('trend_indicator', data)
+
+
+class IncrementalIndicatorTests(AIAnalysisTestCase):
+    BARS = [
+        {"Date": "2028-01-03", "Open": 90.1, "High": 92.0, "Low": 89.5, "Close": 91.7, "Volume": 250000},
+        {"Date": "2028-01-04", "Open": 91.7, "High": 93.4, "Low": 91.0, "Close": 93.1, "Volume": 310000},
+    ]
+
+    def test_matches_pandas_rolling_mean(self):
+        response = self.client.get(reverse("historical_analysis"))
+        self.assertAlmostEqual(response.json()["trend_indicator"], self.pandas_ma50(), places=9)
+
+    def test_append_updates_ma_and_csv(self):
+        self.client.get(reverse("historical_analysis"))
+        response = self.append(self.BARS)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["appended"], 2)
+        self.assertEqual(data["last_date"], "2028-01-04")
+        # The appended bars land in the CSV, so a full rebuild agrees
+        self.assertAlmostEqual(data["trend_indicator"], self.pandas_ma50(), places=9)
+        rebuilt = IndicatorState.from_csv(self.csv_path)
+        self.assertEqual(rebuilt.bars, data["bars"])
+        self.assertAlmostEqual(rebuilt.latest_ma, data["trend_indicator"], places=9)
+
+    def test_served_from_checkpoint_without_reading_csv(self):
+        self.append(self.BARS)
+        expected = self.client.get(reverse("historical_analysis")).json()["trend_indicator"]
+        reset_indicator_store()
+        with mock.patch.object(IndicatorState, "from_csv", side_effect=AssertionError("CSV was read")):
+            response = self.client.get(reverse("historical_analysis"))
+            self.assertEqual(response.json()["trend_indicator"], expected)
+            self.assertEqual(self.client.get(reverse("analyze")).status_code, 200)
+
+    def test_checkpoint_is_rebuilt_when_csv_changes(self):
+        get_indicator_store().state()
+        pd.read_csv(self.csv_path).iloc[:-10].to_csv(self.csv_path, index=False)
+        response = self.client.get(reverse("historical_analysis"))
+        self.assertAlmostEqual(response.json()["trend_indicator"], self.pandas_ma50(), places=9)
+
+    def test_rejects_stale_or_invalid_bars_atomically(self):
+        before = get_indicator_store().state().bars
+        stale = dict(self.BARS[0], Date="2020-01-01")
+        response = self.append([self.BARS[0], stale])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("not after the last bar", response.json()["error"])
+        response = self.append([dict(self.BARS[0], Close="abc")])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(get_indicator_store().state().bars, before)
+        self.assertEqual(len(pd.read_csv(self.csv_path)), before)
+
+    def test_rejects_invalid_dates_and_compares_as_dates(self):
+        get_indicator_store().state()
+        for date in ("zzz", "2028-13-01", 20280103):
+            response = self.append([dict(self.BARS[0], Date=date)])
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("Date", response.json()["error"])
+        # A rejected date must not become the last bar
+        response = self.append([dict(self.BARS[0], Date="2028-01-03 16:00:00")])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["last_date"], "2028-01-03")
+        response = self.append([dict(self.BARS[1], Date=" 2028-01-04")])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["last_date"], "2028-01-04")
+
+    def test_append_picks_up_other_workers_appends(self):
+        get_indicator_store().state()
+        other = IndicatorStore(self.csv_path, get_indicator_store().checkpoint_path)
+        other.append(self.BARS[:1])
+        response = self.append(self.BARS[:1])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.append(self.BARS[1:]).status_code, 200)
+        self.assertEqual(IndicatorState.from_csv(self.csv_path).bars, get_indicator_store().state().bars)
+
+    def test_reload_waits_for_an_append_in_progress(self):
+        before = get_indicator_store().state().bars
+        results = []
+
+        def read():
+            try:
+                results.append(IndicatorStore(self.csv_path, self.checkpoint_path).state().bars)
+            except Exception as e:
+                results.append(e)
+
+        # Another worker holds the lock with half a row written
+        with open(self.checkpoint_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            with open(self.csv_path, "a") as f:
+                f.write("2028-01-03,90.1,92.0,")
+            reader = threading.Thread(target=read)
+            reader.start()
+            reader.join(0.2)
+            self.assertTrue(reader.is_alive())
+            with open(self.csv_path, "a") as f:
+                f.write("89.5,91.7,250000\n")
+        reader.join(5)
+        self.assertEqual(results, [before + 1])
+
+    def test_append_requires_post(self):
+        self.assertEqual(self.client.get(reverse("append_bars")).status_code, 405)
+
+
+class OHLCVStoreTests(AIAnalysisTestCase):
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(7)
+        frames = []
+        for ticker, n in [("aaa", 120), ("bbb", 30), ("ccc", 75)]:
+            close = 100 + np.cumsum(rng.normal(0, 1, n))
+            frames.append(pd.DataFrame({
+                "Ticker": ticker, "Date": pd.bdate_range("2024-01-01", periods=n).strftime("%Y-%m-%d"),
+                "Open": close, "High": close + rng.random(n), "Low": close - rng.random(n),
+                "Close": close, "Volume": rng.integers(1000, 5000, n),
+            }))
+        # Shuffled input: the build sorts by ticker and date
+        self.bars = pd.concat(frames).sample(frac=1, random_state=1)
+        source = os.path.join(self.tmpdir, "bars.csv")
+        self.bars.to_csv(source, index=False)
+        self.store_path = os.path.join(self.tmpdir, "ohlcv")
+        overrides = override_settings(AI_OHLCV_STORE=self.store_path)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command("build_ohlcv_store", source, stdout=open(os.devnull, "w"))
+
+    def expected(self, ticker):
+        frame = self.bars[self.bars["Ticker"] == ticker.lower()].sort_values("Date")
+        close, high, low = frame["Close"], frame["High"], frame["Low"]
+        delta = close.diff()
+        gains = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+        losses = (-delta).clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+        previous = close.shift()
+        true_range = pd.concat([high - low, (high - previous).abs(), (low - previous).abs()], axis=1).max(axis=1)
+        return {
+            "date": frame["Date"].iloc[-1],
+            "sma_50": close.rolling(50).mean().iloc[-1],
+            "ema_20": close.ewm(span=20, adjust=False, min_periods=20).mean().iloc[-1],
+            "rsi_14": (100 - 100 / (1 + gains / losses)).iloc[-1],
+            "atr_14": true_range.ewm(alpha=1 / 14, adjust=False, min_periods=14).mean().iloc[-1],
+            "volatility_20": np.log(close).diff().rolling(20).std().iloc[-1] * np.sqrt(252),
+        }
+
+    def test_store_layout(self):
+        store = OHLCVStore(self.store_path)
+        self.assertEqual(store.tickers, ["AAA", "BBB", "CCC"])
+        self.assertEqual(store.lengths.tolist(), [120, 30, 75])
+        self.assertEqual(store.offsets.tolist(), [0, 120, 150])
+        self.assertIsInstance(store.columns["close"], np.memmap)
+        window = store.select(["CCC", "AAA"], lookback=10)
+        self.assertEqual(window.lengths.tolist(), [10, 10])
+        self.assertEqual(str(window.dates[-1]), self.expected("AAA")["date"])
+
+    def test_indicators_match_pandas_per_ticker(self):
+        response = self.client.get(reverse("historical_analysis"), {"tickers": "aaa,ccc", "ticker": "BBB"})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(list(results), ["BBB", "AAA", "CCC"])
+        for ticker in ("AAA", "CCC"):
+            for name, value in self.expected(ticker).items():
+                if name == "date":
+                    self.assertEqual(results[ticker][name], value)
+                else:
+                    self.assertAlmostEqual(results[ticker][name], value, places=9)
+        # 30 bars: not enough for SMA50, enough for the rest
+        self.assertIsNone(results["BBB"]["sma_50"])
+        self.assertIsNotNone(results["BBB"]["rsi_14"])
+
+    def test_unknown_ticker_and_missing_store(self):
+        response = self.client.get(reverse("historical_analysis"), {"ticker": "AAA,ZZZ"})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("ZZZ", response.json()["error"])
+        with override_settings(AI_OHLCV_STORE=os.path.join(self.tmpdir, "missing")):
+            response = self.client.get(reverse("historical_analysis"), {"ticker": "AAA"})
+        self.assertEqual(response.status_code, 503)
+
+
+class SentimentPipelineTests(AIAnalysisTestCase):
+    HEADLINES = [
+        "Stocks rally to record highs on strong jobs data",
+        "Chipmaker shares plunge after weak guidance",
+        "Central bank holds rates steady",
+        "Investors cheer excellent quarterly results",
+        "Oil prices slump on terrible demand outlook",
+    ]
+
+    def post_headlines(self, headlines):
+        return self.client.post(reverse("news_sentiment"), data={"headlines": headlines},
+                                 content_type="application/json")
+
+    def test_post_scores_match_textblob(self):
+        response = self.post_headlines(self.HEADLINES)
+        self.assertEqual(response.status_code, 200)
+        expected, _ = score_batch(self.HEADLINES)
+        data = response.json()
+        self.assertEqual(data["scores"], expected)
+        self.assertAlmostEqual(data["news_sentiment"], sum(expected) / len(expected))
+
+    @override_settings(AI_SENTIMENT={"CACHE": "sentiment", "BATCH_SIZE": 2})
+    def test_only_unseen_headlines_are_scored_in_batches(self):
+        with mock.patch("ai_analysis.sentiment.score_batch", wraps=score_batch) as scorer:
+            self.post_headlines(self.HEADLINES[:3])
+            # Whitespace variants and repeats hash to the same entry
+            self.post_headlines(["  Central bank   holds rates steady "] + self.HEADLINES)
+        batches = [call.args[0] for call in scorer.call_args_list]
+        self.assertEqual([len(batch) for batch in batches], [2, 1, 2])
+        stats = self.client.get(reverse("sentiment_stats")).json()
+        self.assertEqual(stats["misses"], 5)
+        self.assertEqual(stats["hits"], 4)
+        self.assertEqual(stats["batch_latency_ms"]["count"], 3)
+
+    @override_settings(AI_SENTIMENT={"CACHE": "sentiment", "BATCH_SIZE": 2, "WORKERS": 2})
+    def test_process_pool_scoring(self):
+        scores = get_sentiment_pipeline().score(self.HEADLINES)
+        self.assertEqual(scores, score_batch(self.HEADLINES)[0])
+
+    def test_headline_feed_file(self):
+        feed = os.path.join(self.tmpdir, "headlines.txt")
+        with open(feed, "w") as f:
+            f.write(self.HEADLINES[0] + "\n\n" + self.HEADLINES[3] + "\n")
+        with override_settings(AI_SENTIMENT={"CACHE": "sentiment", "HEADLINES_FILE": feed}):
+            sentiment = self.client.get(reverse("news_sentiment")).json()["news_sentiment"]
+        scores, _ = score_batch([self.HEADLINES[0], self.HEADLINES[3]])
+        self.assertAlmostEqual(sentiment, sum(scores) / 2)
+
+    def test_rejects_invalid_headlines(self):
+        self.assertEqual(self.post_headlines([]).status_code, 400)
+        self.assertEqual(self.post_headlines(["ok", 3]).status_code, 400)
+
+
+class AsyncViewTests(AIAnalysisTestCase):
+    def test_analyze_async_runs_both_legs(self):
+        expected = views.run_market_trend_analysis()
+        response = async_to_sync(views.analyze_async)(RequestFactory().get("/ai/analyze/"))
+        data = json.loads(response.content)
+        self.assertFalse(data.pop("partial"))
+        self.assertEqual(data, expected)
+
+    @override_settings(AI_LEG_TIMEOUTS={"trend_indicator": 2.0, "news_sentiment": 0.05})
+    def test_slow_leg_gives_partial_result(self):
+        def slow_sentiment(*args, **kwargs):
+            time.sleep(0.5)
+            return 1.0
+
+        with mock.patch("ai_analysis.analysis.analyze_news_sentiment", slow_sentiment):
+            started = time.monotonic()
+            response = async_to_sync(views.analyze_async)(RequestFactory().get("/ai/analyze/"))
+            self.assertLess(time.monotonic() - started, 0.4)
+        data = json.loads(response.content)
+        self.assertTrue(data["partial"])
+        self.assertIsNone(data["news_sentiment"])
+        self.assertIn("news_sentiment", data["errors"])
+        self.assertAlmostEqual(data["trend_indicator"], self.pandas_ma50(), places=9)
+        self.assertEqual(data["investment_suggestion"], "Sell")
+
+    def test_news_sentiment_async_post(self):
+        request = RequestFactory().post(
+            "/ai/news/", data=json.dumps({"headlines": ["Shares soar on great results"]}),
+            content_type="application/json",
+        )
+        response = async_to_sync(views.news_sentiment_async)(request)
+        self.assertEqual(json.loads(response.content)["scores"], score_batch(["Shares soar on great results"])[0])
+
+
+class AnalysisSnapshotTests(AIAnalysisTestCase):
+    def setUp(self):
+        super().setUp()
+        self.snapshot_path = os.path.join(self.tmpdir, "snapshot.json")
+        self.config = {"ENABLED": True, "PATH": self.snapshot_path, "MAX_AGE": 300.0,
+                       "REFRESH_INTERVAL": None, "CHECK_INTERVAL": 0}
+        overrides = override_settings(AI_SNAPSHOT=self.config)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_serves_snapshot_with_validators(self):
+        with mock.patch("ai_analysis.snapshots.compute_payloads", wraps=snapshots.compute_payloads) as compute:
+            first = self.client.get(reverse("analyze"))
+            second = self.client.get(reverse("analyze"))
+            self.client.get(reverse("historical_analysis"))
+        self.assertEqual(compute.call_count, 1)
+        self.assertEqual(first.json(), views.run_market_trend_analysis())
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertIn("Last-Modified", first)
+
+        not_modified = self.client.get(reverse("analyze"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], first["ETag"])
+        not_modified = self.client.get(reverse("news_sentiment"), HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_forced_and_stale_refresh(self):
+        first = self.client.get(reverse("analyze"))
+        # Clients cannot force a recompute
+        with mock.patch("ai_analysis.snapshots.compute_payloads", side_effect=AssertionError("recomputed")):
+            ignored = self.client.get(reverse("analyze"), {"refresh": "1"})
+        self.assertEqual(ignored["X-Snapshot-Version"], first["X-Snapshot-Version"])
+        get_snapshot_store().refresh()
+        forced = self.client.get(reverse("analyze"))
+        self.assertEqual(int(forced["X-Snapshot-Version"]), int(first["X-Snapshot-Version"]) + 1)
+        # Same content: validators survive the refresh
+        self.assertEqual(forced["ETag"], first["ETag"])
+        self.assertEqual(forced["Last-Modified"], first["Last-Modified"])
+
+        self.config["MAX_AGE"] = 0
+        reset_snapshot_store()
+        stale = self.client.get(reverse("analyze"))
+        self.assertGreater(int(stale["X-Snapshot-Version"]), int(forced["X-Snapshot-Version"]))
+
+    def test_append_publishes_new_snapshot(self):
+        before = self.client.get(reverse("historical_analysis"))
+        bar = {"Date": "2028-01-03", "Open": 190.0, "High": 260.0, "Low": 189.0, "Close": 255.0, "Volume": 1000}
+        self.client.post(reverse("append_bars"), data={"bars": [bar]}, content_type="application/json")
+        after = self.client.get(reverse("historical_analysis"), HTTP_IF_NONE_MATCH=before["ETag"])
+        self.assertEqual(after.status_code, 200)
+        self.assertAlmostEqual(after.json()["trend_indicator"], self.pandas_ma50(), places=9)
+
+    def test_processes_refresh_from_the_newest_version(self):
+        worker_a = build_snapshot_store(self.config)
+        worker_b = build_snapshot_store(self.config)
+        self.assertEqual(worker_a.refresh().version, 1)
+        self.assertEqual(worker_b.refresh().version, 2)
+        self.assertEqual(worker_a.refresh().version, 3)
+        # A refresher skips its turn when another worker just published
+        with mock.patch("ai_analysis.snapshots.compute_payloads", side_effect=AssertionError("recomputed")):
+            self.assertEqual(worker_b.refresh(only_if_stale=True, max_age=60.0).version, 3)
+
+    def test_readers_are_served_while_a_refresh_computes(self):
+        store = build_snapshot_store(self.config)
+        first = store.refresh()
+        computing, release = threading.Event(), threading.Event()
+        payloads = snapshots.compute_payloads()
+
+        def slow_compute():
+            computing.set()
+            release.wait(5)
+            return payloads
+
+        with mock.patch("ai_analysis.snapshots.compute_payloads", side_effect=slow_compute):
+            refresher = threading.Thread(target=store.refresh)
+            refresher.start()
+            self.assertTrue(computing.wait(5))
+            try:
+                self.assertIs(store.current(), first)
+            finally:
+                release.set()
+                refresher.join()
+        self.assertEqual(store.current().version, first.version + 1)
+
+    def test_refresh_command_publishes_for_workers(self):
+        call_command("refresh_analysis_snapshot", "--once", stdout=open(os.devnull, "w"))
+        store = build_snapshot_store(self.config)
+        with mock.patch("ai_analysis.snapshots.compute_payloads", side_effect=AssertionError("recomputed")):
+            self.assertEqual(store.get("analyze")["payload"], views.run_market_trend_analysis())
+
+
+class GenerateMarketDataTests(AIAnalysisTestCase):
+    def generate(self, *args):
+        call_command("generate_market_data", *args, stdout=open(os.devnull, "w"))
+
+    def test_store_csv_and_fixtures_agree(self):
+        store_path = os.path.join(self.tmpdir, "store")
+        bars_csv = os.path.join(self.tmpdir, "bars.csv")
+        universe_csv = os.path.join(self.tmpdir, "universe.csv")
+        applicants_csv = os.path.join(self.tmpdir, "applicants.csv")
+        chunked = mock.patch("ai_analysis.synthetic.APPLICANT_CHUNK", 20)
+        with mock.patch("ai_analysis.synthetic.BLOCK_TICKERS", 2), chunked:
+            self.generate("--tickers", "5", "--days", "30", "--seed", "3", "--output", store_path,
+                          "--universe", universe_csv, "--applicants", "50", "--applicants-output", applicants_csv)
+        self.generate("--tickers", "5", "--days", "30", "--seed", "3", "--output", bars_csv)
+
+        store = OHLCVStore(store_path)
+        self.assertEqual(store.tickers, ["AAAA", "AAAB", "AAAC", "AAAD", "AAAE"])
+        self.assertEqual(store.lengths.tolist(), [30] * 5)
+        bars = pd.read_csv(bars_csv)
+        self.assertEqual(len(bars), 150)
+        self.assertTrue((bars["High"] >= bars[["Open", "Close"]].max(axis=1)).all())
+        self.assertTrue((bars["Low"] <= bars[["Open", "Close"]].min(axis=1)).all())
+
+        universe = UniverseIndex.from_csv(universe_csv)
+        self.assertEqual(sum(universe.count(bucket) for bucket in VOLATILITY_BUCKETS), 5)
+        applicants = pd.read_csv(applicants_csv)
+        self.assertEqual(len(applicants), 50)
+        with chunked:
+            self.assertEqual(applicants["age"].tolist(), generate_applicants(50, seed=3)["age"].tolist())
+        for applicant in applicants.to_dict("records"):
+            parse_applicant({k: (v.item() if hasattr(v, "item") else v) for k, v in applicant.items()})
+
+    def test_seeded_and_single_series_layout(self):
+        first, second = (os.path.join(self.tmpdir, name) for name in ("a.csv", "b.csv"))
+        self.generate("--days", "60", "--output", first)
+        self.generate("--days", "60", "--output", second)
+        with open(first) as a, open(second) as b:
+            self.assertEqual(a.read(), b.read())
+        bars = pd.read_csv(first)
+        self.assertEqual(list(bars.columns), ["Date", "Open", "High", "Low", "Close", "Volume"])
+        self.assertEqual(bars["Date"].iloc[0], DEFAULT_START)
+
+
+class StartupTests(AIAnalysisTestCase):
+    def test_urlconf_import_does_not_load_heavy_dependencies(self):
+        code = (
+            "import sys, django; django.setup(); import stock_project.urls; "
+            "print(','.join(m for m in ('pandas', 'textblob', 'sklearn') if m in sys.modules))"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "stock_project.settings"}
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        self.assertEqual(output.strip(), "")
+
+    def test_ready_warms_up_only_when_enabled(self):
+        config = apps.get_app_config("ai_analysis")
+        with mock.patch("ai_analysis.sentiment.warm_up") as warm_up:
+            config.ready()
+            warm_up.assert_not_called()
+            with override_settings(STARTUP_WARMUP=True):
+                config.ready()
+            warm_up.assert_called_once_with()
+        self.assertTrue(os.path.exists(self.checkpoint_path))
@@ -1,9 +1,15 @@
 # ai_analysis/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Under ASGI, sync views share one thread, so route the async twins instead
+ASGI = settings.SERVER_INTERFACE == 'asgi'
+
 urlpatterns = [
-    path('analyze/', views.analyze, name='analyze'),
-    path('news/', views.news_sentiment, name='news_sentiment'),
-    path('historical/', views.historical_analysis, name='historical_analysis'),
+    path('analyze/', views.analyze_async if ASGI else views.analyze, name='analyze'),
+    path('news/', views.news_sentiment_async if ASGI else views.news_sentiment, name='news_sentiment'),
+    path('news/stats/', views.sentiment_stats, name='sentiment_stats'),
+    path('historical/', views.historical_analysis_async if ASGI else views.historical_analysis, name='historical_analysis'),
+    path('historical/append/', views.append_bars_async if ASGI else views.append_bars, name='append_bars'),
 ]
@@ -1,18 +1,227 @@
 # ai_analysis/views.py
-from django.http import JsonResponse
-from .analysis import run_market_trend_analysis, analyze_news_sentiment, analyze_historical_data
+import asyncio
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+
+from stock_project.codec import DecodeError, JsonResponse, error_response, load_body
+from stock_project.executors import get_cpu_executor, offload_view, run_io
+from stock_project.schemas import Field, Schema, SchemaError
+
+from .analysis import run_market_trend_analysis, run_market_trend_analysis_async, analyze_news_sentiment, analyze_historical_data
+from .indicators import BarError, get_indicator_store
+from .sentiment import get_sentiment_pipeline
+from .snapshots import get_snapshot_store
+from .store import StoreError, get_ohlcv_store
+from .technical import latest_indicators
+
+# Upper bound on bars accepted by a single append request
+MAX_APPEND_BARS = 10000
+
+# Upper bound on headlines scored by a single news request
+MAX_HEADLINES = 10000
+
+# Upper bound on tickers looked up by a single historical request
+MAX_TICKERS = 1000
+
+HEADLINES_SCHEMA = Schema(
+    [Field("headlines", "list", items="string", min_items=1, max_items=MAX_HEADLINES,
+           error="Invalid data format. Expected a non-empty list of headline strings.",
+           limit_error="Too many headlines. Maximum is {max_items}.")],
+    object_error="Invalid data format. Expected a non-empty list of headline strings.",
+)
+
+BARS_SCHEMA = Schema(
+    [Field("bars", "list", min_items=1, max_items=MAX_APPEND_BARS,
+           error="Invalid data format. Expected a non-empty list of bars.",
+           limit_error="Too many bars. Maximum is {max_items}.")],
+    object_error="Invalid data format. Expected a non-empty list of bars.",
+)
+
+def snapshot_response(request, name):
+    """
+    Serve the `name` payload of the precomputed analysis snapshot with
+    ETag/Last-Modified headers, answering conditional GETs with 304.
+    Returns None when AI_SNAPSHOT is off so the caller computes the result
+    itself. Clients cannot force a recompute; that is left to the refresher
+    and `manage.py refresh_analysis_snapshot`.
+    """
+    store = get_snapshot_store()
+    if store is None:
+        return None
+    snapshot = store.current()
+    entry = snapshot.entries[name]
+    last_modified = int(entry["last_modified"])
+
+    response = get_conditional_response(request, etag=entry["etag"], last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(entry["payload"])
+    response.headers["ETag"] = entry["etag"]
+    response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["X-Snapshot-Version"] = str(snapshot.version)
+    return response
 
 def analyze(request):
+    cached = snapshot_response(request, "analyze")
+    if cached is not None:
+        return cached
     # Trigger the market trends analysis
     analysis_results = run_market_trend_analysis()
     return JsonResponse(analysis_results)
 
+@csrf_exempt
 def news_sentiment(request):
-    # Run and return only news sentiment analysis
-    sentiment = analyze_news_sentiment()
-    return JsonResponse({"news_sentiment": sentiment})
+    """
+    News sentiment for the configured headline feed (GET) or for the
+    headlines in a POST body: {"headlines": ["...", ...]}. POST responses
+    also carry the per-headline polarities.
+    """
+    if request.method == "GET":
+        cached = snapshot_response(request, "news")
+        if cached is not None:
+            return cached
+        # Run and return only news sentiment analysis
+        sentiment = analyze_news_sentiment()
+        return JsonResponse({"news_sentiment": sentiment})
+    headlines, error = _posted_headlines(request)
+    if error is not None:
+        return error
+
+    scores = get_sentiment_pipeline().score(headlines)
+    return JsonResponse({"news_sentiment": sum(scores) / len(scores), "scores": scores})
+
+def _posted_headlines(request):
+    """Return (headlines, None) from a POST body, or (None, error response)."""
+    if request.method != "POST":
+        return None, error_response("Only GET and POST methods allowed.", status=405)
+
+    try:
+        return HEADLINES_SCHEMA(load_body(request))["headlines"], None
+    except (DecodeError, SchemaError) as e:
+        return None, error_response(e)
+
+async def analyze_async(request):
+    """
+    Async twin of `analyze` for ASGI: the historical and sentiment legs
+    run concurrently, each with its own timeout (AI_LEG_TIMEOUTS). If a
+    leg does not finish in time the response still comes back, with that
+    leg set to None, "partial": true and the per-leg "errors".
+    Served from the analysis snapshot when AI_SNAPSHOT is on.
+    """
+    if get_snapshot_store() is not None:
+        return await run_io(snapshot_response, request, "analyze")
+    return JsonResponse(await run_market_trend_analysis_async())
+
+@csrf_exempt
+async def news_sentiment_async(request):
+    """
+    Async twin of `news_sentiment`: scoring runs off the event loop, with
+    TextBlob on the CPU process pool when ASYNC_EXECUTORS['CPU_WORKERS'] is
+    set. Answers 504 when AI_LEG_TIMEOUTS['news_sentiment'] is exceeded.
+    """
+    timeout = getattr(settings, "AI_LEG_TIMEOUTS", {}).get("news_sentiment")
+    executor = get_cpu_executor()
+    try:
+        if request.method == "GET":
+            if get_snapshot_store() is not None:
+                return await run_io(snapshot_response, request, "news", timeout=timeout)
+            sentiment = await run_io(analyze_news_sentiment, executor=executor, timeout=timeout)
+            return JsonResponse({"news_sentiment": sentiment})
+
+        headlines, error = _posted_headlines(request)
+        if error is not None:
+            return error
+        scores = await run_io(get_sentiment_pipeline().score, headlines, executor, timeout=timeout)
+    except asyncio.TimeoutError:
+        return error_response(f"Sentiment scoring timed out after {timeout}s.", status=504)
+    return JsonResponse({"news_sentiment": sum(scores) / len(scores), "scores": scores})
+
+def sentiment_stats(request):
+    """
+    Report the sentiment cache's hit rate and per-batch scoring latency.
+    """
+    return JsonResponse(get_sentiment_pipeline().stats())
+
+def requested_tickers(request):
+    """Tickers from ?ticker=AAPL&ticker=MSFT and/or ?tickers=AAPL,MSFT, in order and de-duplicated."""
+    tickers = []
+    for value in request.GET.getlist("ticker") + request.GET.getlist("tickers"):
+        tickers.extend(t.strip().upper() for t in value.split(",") if t.strip())
+    return list(dict.fromkeys(tickers))
 
 def historical_analysis(request):
-    # Run and return only historical data analysis
-    trend_indicator = analyze_historical_data()
-    return JsonResponse({"trend_indicator": trend_indicator})
\ No newline at end of file
+    """
+    GET endpoint for historical indicators.
+
+    Without tickers it returns the single-series MA50 as before. With
+    ?ticker=AAPL or ?tickers=AAPL,MSFT it reads only those tickers' slices
+    from the OHLCV store and returns, per ticker, the latest bar and its
+    SMA50, EMA20, RSI14, ATR14 and 20-day realized volatility.
+    """
+    tickers = requested_tickers(request)
+    if not tickers:
+        cached = snapshot_response(request, "historical")
+        if cached is not None:
+            return cached
+        # Run and return only historical data analysis
+        trend_indicator = analyze_historical_data()
+        return JsonResponse({"trend_indicator": trend_indicator})
+
+    if len(tickers) > MAX_TICKERS:
+        return error_response(f"Too many tickers. Maximum is {MAX_TICKERS}.")
+    try:
+        store = get_ohlcv_store()
+    except StoreError as e:
+        return error_response(e, status=503)
+
+    unknown = [ticker for ticker in tickers if ticker not in store]
+    if unknown:
+        return error_response(f"Unknown tickers: {', '.join(unknown)}.", status=404)
+
+    bars = store.select(tickers, lookback=getattr(settings, "AI_INDICATOR_LOOKBACK", None))
+    return JsonResponse({"results": latest_indicators(bars)})
+
+@csrf_exempt
+def append_bars(request):
+    """
+    POST endpoint that appends new OHLCV bars to the historical series.
+
+    Expected JSON payload:
+    {"bars": [{"Date": "YYYY-MM-DD", "Open": float, "High": float,
+               "Low": float, "Close": float, "Volume": int}, ...]}
+    Bars must be newer than the last stored bar. The append is all or
+    nothing; the moving average is updated in O(1) per bar and the state
+    is checkpointed so /ai/historical/ never re-reads the CSV.
+    """
+    if request.method != "POST":
+        return error_response("Only POST method allowed.", status=405)
+
+    try:
+        bars = BARS_SCHEMA(load_body(request))["bars"]
+    except (DecodeError, SchemaError) as e:
+        return error_response(e)
+
+    try:
+        state = get_indicator_store().append(bars)
+    except BarError as e:
+        return error_response(e)
+
+    # New bars change the trend, so publish a fresh snapshot right away
+    snapshots = get_snapshot_store()
+    if snapshots is not None:
+        snapshots.refresh()
+
+    return JsonResponse({
+        "appended": len(bars),
+        "bars": state.bars,
+        "last_date": state.last_bar["Date"],
+        "trend_indicator": state.latest_ma,
+    })
+
+# Async twins of the blocking views, routed under ASGI (see urls.py)
+historical_analysis_async = offload_view(
+    historical_analysis, timeout=getattr(settings, "AI_LEG_TIMEOUTS", {}).get("trend_indicator"),
+)
+append_bars_async = csrf_exempt(offload_view(append_bars))
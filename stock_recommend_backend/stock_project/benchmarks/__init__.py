@@ -0,0 +1,12 @@
+"""
+End-to-end performance benchmarks for the API endpoints.
+
+Run from the directory holding manage.py:
+
+    python -m benchmarks run --mode both --concurrency 1,8 --sizes 1,100
+    python -m benchmarks startup --repeat 5 --output startup.json
+    python -m benchmarks compare baseline.json results.json
+
+Every run works on a scratch copy of the database and data files (see
+benchmarks.settings), so it never modifies the repository's data.
+"""
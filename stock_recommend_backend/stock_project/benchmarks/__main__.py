@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(",") if part]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="API endpoint benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run scenarios and write a JSON results file.")
+    run.add_argument("--mode", choices=["in-process", "server", "both"], default="in-process")
+    run.add_argument("--scenarios", default="all", help="Comma-separated scenario names, or 'all'.")
+    run.add_argument("--concurrency", type=_int_list, default=[1, 8], help="Comma-separated levels (default 1,8).")
+    run.add_argument("--sizes", type=_int_list, default=[1, 100],
+                     help="Payload sizes for batch/sized scenarios (default 1,100).")
+    run.add_argument("--requests", type=int, default=200, help="Measured requests per combination.")
+    run.add_argument("--warmup", type=int, default=20, help="Unmeasured requests sent first.")
+    run.add_argument("--url", help="Benchmark an already running server instead of starting one.")
+    run.add_argument("--server-cmd",
+                     help="Command starting the server, with {port} (default: manage.py runserver --noreload).")
+    run.add_argument("--keep-alive", action="store_true",
+                     help="Reuse server connections (only for servers that set TCP_NODELAY).")
+    run.add_argument("--tickers", type=int, default=500, help="Tickers in the generated OHLCV store.")
+    run.add_argument("--days", type=int, default=2520, help="Bars per ticker in the generated OHLCV store.")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--workdir", help="Scratch directory (default: a temporary one, removed afterwards).")
+    run.add_argument("--output", default="results.json")
+
+    startup = commands.add_parser("startup", help="Time worker boot and first requests, lazy vs warm-up.")
+    startup.add_argument("--repeat", type=int, default=5, help="Fresh workers booted per variant.")
+    startup.add_argument("--workdir", help="Scratch directory (default: a temporary one, removed afterwards).")
+    startup.add_argument("--output", default="startup.json")
+
+    compare = commands.add_parser("compare", help="Compare a results file against a baseline.")
+    compare.add_argument("baseline")
+    compare.add_argument("results")
+    compare.add_argument("--threshold", type=float, default=10.0,
+                         help="Percent change in p95 latency or throughput counted as a regression (default 10).")
+    return parser
+
+
+def _setup(args):
+    """Point Django at benchmarks.settings and a scratch workdir; returns the workdir."""
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench-")
+    os.environ["BENCH_WORKDIR"] = os.path.abspath(workdir)
+    os.environ["DJANGO_SETTINGS_MODULE"] = "benchmarks.settings"
+    import django
+
+    django.setup()
+    return workdir
+
+
+def run(args):
+    workdir = _setup(args)
+
+    from ai_analysis.store import get_ohlcv_store
+
+    from .runner import InProcessTarget, ServerTarget, prepare_workdir, run_metadata, run_scenario
+    from .scenarios import build_scenarios
+
+    try:
+        prepare_workdir(workdir, tickers=args.tickers, days=args.days)
+        scenarios = build_scenarios(get_ohlcv_store().tickers)
+        names = list(scenarios) if args.scenarios == "all" else args.scenarios.split(",")
+        unknown = [name for name in names if name not in scenarios]
+        if unknown:
+            sys.exit(f"Unknown scenarios: {', '.join(unknown)}. Available: {', '.join(scenarios)}.")
+
+        modes = ["in-process", "server"] if args.mode == "both" else [args.mode]
+        results = []
+        for mode in modes:
+            if mode == "in-process":
+                target = InProcessTarget()
+            else:
+                target = ServerTarget(url=args.url, command=args.server_cmd, keep_alive=args.keep_alive, env={
+                    "BENCH_WORKDIR": os.environ["BENCH_WORKDIR"], "DJANGO_SETTINGS_MODULE": "benchmarks.settings",
+                })
+            try:
+                for name in names:
+                    scenario = scenarios[name]
+                    for size in (args.sizes if scenario.sized else [1]):
+                        for concurrency in args.concurrency:
+                            result = run_scenario(
+                                target, scenario, size=size, requests=args.requests,
+                                concurrency=concurrency, warmup=args.warmup, seed=args.seed,
+                            )
+                            results.append(result)
+                            print(_format_result(result), flush=True)
+            finally:
+                target.close()
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": {**run_metadata(), "args": vars(args)}, "results": results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    return _report_errors(results)
+
+
+def _report_errors(results):
+    """Warn about results whose timings include failed requests; 1 if there are any."""
+    from .compare import failed_results
+
+    failed = failed_results(results)
+    for result in failed:
+        print(
+            f"ERROR: {result['mode']} {result['scenario']} size={result['size']} c={result['concurrency']}: "
+            f"{result['errors']} of {result['requests']} requests failed {result['status_counts']}; "
+            "its timings measure error responses",
+            file=sys.stderr,
+        )
+    if failed:
+        print(f"{len(failed)} result(s) had errors; do not use them as a baseline.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def startup(args):
+    workdir = _setup(args)
+
+    from .runner import prepare_workdir, run_metadata
+    from .startup import run_startup
+
+    try:
+        # A tiny store is enough; the workers only need the data files
+        prepare_workdir(workdir, tickers=1, days=60)
+        results = run_startup(repeat=args.repeat, env={"BENCH_WORKDIR": os.environ["BENCH_WORKDIR"]})
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for result in results:
+        modules = result.get("heavy_modules")
+        suffix = f" heavy modules at boot: {', '.join(modules) or 'none'}" if modules is not None else ""
+        latency = result["latency_ms"]
+        print(f"{result['scenario']:<34} p50={latency['p50']:8.1f}ms max={latency['max']:8.1f}ms{suffix}")
+    with open(args.output, "w") as f:
+        json.dump({"meta": {**run_metadata(), "args": vars(args)}, "results": results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    return _report_errors(results)
+
+
+def _format_result(result):
+    latency = result["latency_ms"]
+    rss = f"{result['peak_rss_mb']:.0f} MiB" if result["peak_rss_mb"] is not None else "n/a"
+    return (
+        f"{result['mode']:<10} {result['scenario']:<22} size={result['size']:<5} c={result['concurrency']:<3} "
+        f"p50={latency['p50']:8.2f}ms p95={latency['p95']:8.2f}ms p99={latency['p99']:8.2f}ms "
+        f"{result['throughput_rps']:9.1f} req/s errors={result['errors']} rss={rss}"
+    )
+
+
+def compare(args):
+    from .compare import compare_results
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        current = json.load(f)
+    rows, regressions, skipped = compare_results(baseline, current, threshold=args.threshold)
+    for row in rows:
+        mode, scenario, size, concurrency = row["key"]
+        old_p95, new_p95, p95_change = row["p95_ms"]
+        old_rps, new_rps, rps_change = row["throughput_rps"]
+        flag = "REGRESSION" if row in regressions else ""
+        print(
+            f"{mode:<10} {scenario:<22} size={size:<5} c={concurrency:<3} "
+            f"p95 {old_p95:8.2f} -> {new_p95:8.2f}ms ({p95_change:+6.1f}%)  "
+            f"rps {old_rps:9.1f} -> {new_rps:9.1f} ({rps_change:+6.1f}%) {flag}"
+        )
+    for mode, scenario, size, concurrency in skipped:
+        print(f"{mode:<10} {scenario:<22} size={size:<5} c={concurrency:<3} skipped: errors in one of the runs")
+    print(f"{len(regressions)} regression(s) over {args.threshold:g}% in {len(rows)} comparable results.")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        return run(args)
+    if args.command == "startup":
+        return startup(args)
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
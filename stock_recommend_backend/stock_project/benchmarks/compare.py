@@ -0,0 +1,47 @@
+"""
+Compares two benchmark result files and flags regressions.
+"""
+
+
+def result_key(result):
+    return (result["mode"], result["scenario"], result["size"], result["concurrency"])
+
+
+def failed_results(results):
+    """Records with any non-2xx/304 response: their timings measure error pages."""
+    return [result for result in results if result["errors"]]
+
+
+def compare_results(baseline, current, threshold=10.0):
+    """
+    Compare two result files' records by (mode, scenario, size, concurrency).
+    A regression is p95 latency up, or throughput down, by more than
+    `threshold` percent. Pairs where either record had errors are not
+    compared but returned in `skipped`. Returns (rows, regressions, skipped).
+    """
+    previous = {result_key(r): r for r in baseline["results"]}
+    rows, regressions, skipped = [], [], []
+    for result in current["results"]:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        if old["errors"] or result["errors"]:
+            skipped.append(result_key(result))
+            continue
+        p95_change = _percent_change(old["latency_ms"]["p95"], result["latency_ms"]["p95"])
+        rps_change = _percent_change(old["throughput_rps"], result["throughput_rps"])
+        row = {
+            "key": result_key(result),
+            "p95_ms": (old["latency_ms"]["p95"], result["latency_ms"]["p95"], p95_change),
+            "throughput_rps": (old["throughput_rps"], result["throughput_rps"], rps_change),
+        }
+        rows.append(row)
+        if p95_change > threshold or rps_change < -threshold:
+            regressions.append(row)
+    return rows, regressions, skipped
+
+
+def _percent_change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) / old * 100.0
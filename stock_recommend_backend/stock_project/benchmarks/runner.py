@@ -0,0 +1,254 @@
+"""
+Drives scenarios against a target (the Django test client in this
+process, or a local HTTP server) and collects latency, throughput and
+peak-RSS figures.
+"""
+import http.client
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+OK_STATUSES = (200, 304)
+
+
+def prepare_workdir(workdir, tickers=500, days=2520, seed=42):
+    """
+    Copy the database and data files the endpoints read into `workdir`,
+    migrate the copied database (the committed one may predate the app's
+    tables) and generate an OHLCV store of `tickers` x `days` for the
+    ticker scenarios. Must run after django.setup() with benchmarks.settings.
+    """
+    from django.core.management import call_command
+    from stock_project import settings as project_settings
+
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    sources = {
+        "db.sqlite3": project_settings.DATABASES["default"]["NAME"],
+        "stocks_output.csv": project_settings.STOCK_UNIVERSE_CSV,
+        "historical_stock_data.csv": project_settings.AI_HISTORICAL_CSV,
+        "headlines.txt": project_settings.AI_SENTIMENT["HEADLINES_FILE"],
+    }
+    for name, source in sources.items():
+        if os.path.exists(source):
+            shutil.copy(source, workdir / name)
+    call_command("migrate", interactive=False, verbosity=0)
+    call_command(
+        "generate_market_data", "--tickers", str(tickers), "--days", str(days), "--seed", str(seed),
+        "--output", str(workdir / "ohlcv"), stdout=open(os.devnull, "w"),
+    )
+
+
+def reset_peak_rss(pid="self"):
+    """Reset the kernel's peak-RSS counter (Linux clear_refs); False if unsupported."""
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb(pid="self"):
+    """Peak resident set size (VmHWM) in MiB, or None when it cannot be read."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    if pid == "self":
+        # Lifetime peak only (ru_maxrss is KiB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return None
+
+
+class InProcessTarget:
+    """Requests go through django.test.Client: the full stack minus the network."""
+
+    name = "in-process"
+    pid = "self"
+
+    def session(self):
+        from django.test import Client
+
+        client = Client()
+
+        def request(method, path, body):
+            return client.generic(method, path, data=body or b"", content_type="application/json").status_code
+
+        return request
+
+    def close(self):
+        pass
+
+
+class ServerTarget:
+    """
+    Requests go over HTTP to `url`. With `command` the server is started
+    here (and its peak RSS measured); `{port}` in the command is replaced
+    by a free port.
+
+    Each request opens a new connection unless `keep_alive` is set:
+    runserver writes headers and body separately without TCP_NODELAY, so
+    on a reused connection every response stalls ~40ms on delayed ACKs.
+    Use keep-alive with servers that disable Nagle (gunicorn, uvicorn).
+    """
+
+    name = "server"
+
+    def __init__(self, url=None, command=None, env=None, keep_alive=False, startup_timeout=60.0):
+        self.keep_alive = keep_alive
+        self.process = None
+        self.pid = None
+        if url is None:
+            port = _free_port()
+            url = f"http://127.0.0.1:{port}"
+            command = (command or f"{sys.executable} manage.py runserver --noreload 127.0.0.1:{{port}}").format(port=port)
+            self.process = subprocess.Popen(
+                command.split(), cwd=PROJECT_DIR, env={**os.environ, **(env or {})},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            self.pid = self.process.pid
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self._wait_until_up(startup_timeout)
+
+    def _wait_until_up(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process is not None and self.process.poll() is not None:
+                raise RuntimeError("Benchmark server exited during startup.")
+            try:
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=2)
+                connection.request("GET", "/ai/news/stats/")
+                connection.getresponse().read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f"Server at {self.host}:{self.port} did not come up in {timeout}s.")
+
+    def session(self):
+        state = {"connection": None}
+
+        def request(method, path, body):
+            for attempt in (0, 1):
+                if state["connection"] is None:
+                    state["connection"] = http.client.HTTPConnection(self.host, self.port, timeout=60)
+                try:
+                    headers = {"Content-Type": "application/json"} if body else {}
+                    state["connection"].request(method, path, body=body, headers=headers)
+                    response = state["connection"].getresponse()
+                    response.read()
+                    if not self.keep_alive or response.getheader("Connection", "").lower() == "close":
+                        state["connection"].close()
+                        state["connection"] = None
+                    return response.status
+                except (http.client.HTTPException, OSError):
+                    state["connection"].close()
+                    state["connection"] = None
+                    if attempt:
+                        raise
+
+        return request
+
+    def close(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_scenario(target, scenario, size=1, requests=200, concurrency=1, warmup=10, seed=0):
+    """
+    Send `requests` pre-built requests (after `warmup` unmeasured ones) at
+    the given concurrency and return one result record.
+    """
+    rng = np.random.default_rng(seed)
+    work = scenario.build(warmup + requests, size, rng)
+    warmup_work, work = work[:warmup], work[warmup:]
+
+    sessions = threading.local()
+
+    def send(item):
+        if not hasattr(sessions, "request"):
+            sessions.request = target.session()
+        path, body = item
+        started = time.perf_counter()
+        try:
+            status = sessions.request(scenario.method, path, body)
+        except Exception:
+            status = 0
+        return (time.perf_counter() - started) * 1000.0, status
+
+    def run_all(items):
+        if concurrency == 1:
+            return [send(item) for item in items]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(send, items))
+
+    run_all(warmup_work)
+    rss_reset = reset_peak_rss(target.pid)
+    wall_started = time.perf_counter()
+    outcomes = run_all(work)
+    wall_seconds = time.perf_counter() - wall_started
+
+    latencies = np.array([latency for latency, _ in outcomes])
+    statuses = [status for _, status in outcomes]
+    status_counts = {}
+    for status in statuses:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        "mode": target.name,
+        "scenario": scenario.name,
+        "size": size,
+        "concurrency": concurrency,
+        "requests": len(work),
+        "errors": sum(status not in OK_STATUSES for status in statuses),
+        "status_counts": status_counts,
+        "throughput_rps": len(work) / wall_seconds if wall_seconds else 0.0,
+        "latency_ms": {
+            "p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "mean": float(latencies.mean()) if len(latencies) else 0.0,
+            "max": float(latencies.max()) if len(latencies) else 0.0,
+        },
+        "peak_rss_mb": peak_rss_mb(target.pid) if target.pid else None,
+        "peak_rss_scope": "scenario" if rss_reset else "process lifetime",
+    }
+
+
+def run_metadata():
+    """Environment details stored next to the results for later comparison."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=PROJECT_DIR, capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
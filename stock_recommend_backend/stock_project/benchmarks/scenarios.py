@@ -0,0 +1,89 @@
+"""
+Benchmark scenarios: one per endpoint, each building its request bodies
+up front so generating payloads is never part of the measured time.
+"""
+import json
+
+import numpy as np
+
+from ai_analysis.synthetic import generate_applicants, ticker_symbols
+
+HEADLINE_WORDS = (
+    "stocks rally slump surge plunge record earnings beat miss guidance strong weak "
+    "investors cheer worry market bullish bearish outlook rates inflation growth slowdown"
+).split()
+
+
+class Scenario:
+    """
+    One endpoint under test. `build(n, size, rng)` returns n (path, body)
+    pairs; `sized` scenarios take a payload size (batch length, tickers...).
+    `writes` marks scenarios that modify server-side data.
+    """
+
+    def __init__(self, name, method, build, sized=False, writes=False):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.sized = sized
+        self.writes = writes
+
+
+def _json(payload):
+    return json.dumps(payload).encode()
+
+
+def _profiles(n, rng):
+    return [
+        {"age": int(age), "income": float(income), "investment_period": int(period)}
+        for age, income, period in zip(
+            rng.integers(18, 81, n), np.round(rng.lognormal(11, 0.6, n), 2), rng.integers(1, 31, n),
+        )
+    ]
+
+
+def _applicants(n, rng):
+    frame = generate_applicants(n, seed=int(rng.integers(2 ** 31)))
+    return [{k: (v.item() if hasattr(v, "item") else v) for k, v in row.items()} for row in frame.to_dict("records")]
+
+
+def _quotes(n, rng):
+    last = np.round(rng.lognormal(4.5, 0.8, n), 2)
+    spread = last * rng.uniform(0.002, 0.06, n)
+    return [
+        {"symbol": symbol, "lastPrice": f"{price:,.2f}", "high": f"{price + s / 2:,.2f}", "low": f"{price - s / 2:,.2f}"}
+        for symbol, price, s in zip(ticker_symbols(0, n), last, spread)
+    ]
+
+
+def _headlines(n, rng):
+    return [" ".join(rng.choice(HEADLINE_WORDS, 6)) for _ in range(n)]
+
+
+def _store_tickers(size, rng, universe):
+    return ",".join(rng.choice(universe, min(size, len(universe)), replace=False))
+
+
+def build_scenarios(store_tickers=()):
+    """All scenarios; `store_tickers` are the tickers in the benchmark OHLCV store."""
+    universe = np.asarray(store_tickers or ticker_symbols(0, 1))
+    return {s.name: s for s in [
+        Scenario("recommend", "POST", lambda n, size, rng: [
+            ("/api/recommend/", _json(p)) for p in _profiles(n, rng)]),
+        Scenario("recommend_batch", "POST", lambda n, size, rng: [
+            ("/api/recommend/batch/", _json({"profiles": _profiles(size, rng)})) for _ in range(n)], sized=True),
+        Scenario("convert_json_to_csv", "POST", lambda n, size, rng: [
+            ("/api/convert_json_to_csv/?mode=upsert", _json(_quotes(size, rng))) for _ in range(n)],
+            sized=True, writes=True),
+        Scenario("risk_predict", "POST", lambda n, size, rng: [
+            ("/risk/predict/", _json(a)) for a in _applicants(n, rng)]),
+        Scenario("risk_predict_batch", "POST", lambda n, size, rng: [
+            ("/risk/predict/batch/", _json({"applicants": _applicants(size, rng)})) for _ in range(n)], sized=True),
+        Scenario("ai_analyze", "GET", lambda n, size, rng: [("/ai/analyze/", None)] * n),
+        Scenario("ai_news", "GET", lambda n, size, rng: [("/ai/news/", None)] * n),
+        Scenario("ai_news_post", "POST", lambda n, size, rng: [
+            ("/ai/news/", _json({"headlines": _headlines(size, rng)})) for _ in range(n)], sized=True),
+        Scenario("ai_historical", "GET", lambda n, size, rng: [("/ai/historical/", None)] * n),
+        Scenario("ai_historical_tickers", "GET", lambda n, size, rng: [
+            (f"/ai/historical/?tickers={_store_tickers(size, rng, universe)}", None) for _ in range(n)], sized=True),
+    ]}
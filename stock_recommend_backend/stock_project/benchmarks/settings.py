@@ -0,0 +1,29 @@
+"""
+Project settings for benchmark runs: the database, data files and file
+caches all live in a scratch directory (BENCH_WORKDIR) prepared by
+`benchmarks.runner.prepare_workdir`.
+"""
+import os
+from pathlib import Path
+
+from stock_project.settings import *  # noqa: F401,F403
+from stock_project.settings import AI_SENTIMENT, AI_SNAPSHOT, CACHES, DATABASES
+
+WORKDIR = Path(os.environ["BENCH_WORKDIR"])
+
+# Measure the code, not the debug toolbar of Django itself (query logging etc.)
+DEBUG = False
+ALLOWED_HOSTS = ["localhost", "127.0.0.1", "testserver"]
+
+DATABASES = {"default": {**DATABASES["default"], "NAME": WORKDIR / "db.sqlite3"}}
+CACHES = {**CACHES, "sentiment": {**CACHES["sentiment"], "LOCATION": WORKDIR / "sentiment_cache"}}
+
+STOCK_UNIVERSE_CSV = WORKDIR / "stocks_output.csv"
+AI_HISTORICAL_CSV = WORKDIR / "historical_stock_data.csv"
+AI_INDICATOR_CHECKPOINT = WORKDIR / "indicator_state.json"
+AI_OHLCV_STORE = WORKDIR / "ohlcv"
+AI_SENTIMENT = {**AI_SENTIMENT, "HEADLINES_FILE": WORKDIR / "headlines.txt"}
+# Toggled per worker by the startup benchmark
+STARTUP_WARMUP = os.environ.get("BENCH_STARTUP_WARMUP") == "1"
+
+AI_SNAPSHOT = {**AI_SNAPSHOT, "PATH": WORKDIR / "analysis_snapshot.json", "REFRESH_INTERVAL": None}
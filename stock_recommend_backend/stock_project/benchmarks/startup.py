@@ -0,0 +1,115 @@
+"""
+Worker startup benchmark: boots Django and imports the URLconf in fresh
+interpreters, with and without STARTUP_WARMUP, then times the first
+request to each heavy endpoint. Shows what lazy imports save at boot and
+where that cost moves to.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from .runner import PROJECT_DIR
+
+# Modules whose presence after boot shows an eager heavy import
+HEAVY_MODULES = ("pandas", "textblob", "nltk", "scipy", "sklearn")
+
+FIRST_REQUESTS = {
+    "recommend": ("/api/recommend/", {"age": 35, "income": 60000, "investment_period": 10}),
+    "risk_predict": ("/risk/predict/", {
+        "age": 42, "gender": "Female", "height": 165, "weight": 70, "smoking_status": "No",
+        "cigarettes_per_day": 0, "alcohol_consumption": "Occasionally", "physical_activity": "Moderate",
+        "dietary_habits": "Balanced", "occupation": "Office Job",
+    }),
+    "ai_news": ("/ai/news/", None),  # body built per run so the sentiment cache misses
+}
+
+CHILD = """
+import json, os, sys, time, uuid
+started = time.perf_counter()
+import django
+django.setup()
+from importlib import import_module
+from django.conf import settings
+import_module(settings.ROOT_URLCONF)
+result = {"boot_ms": (time.perf_counter() - started) * 1000.0}
+result["modules"] = [m for m in json.loads(os.environ["BENCH_HEAVY_MODULES"]) if m in sys.modules]
+
+from django.test import Client
+client = Client()
+result["first_request_ms"] = {}
+result["status"] = {}
+for name, (path, body) in json.loads(os.environ["BENCH_FIRST_REQUESTS"]).items():
+    if body is None:
+        body = {"headlines": ["Startup probe " + uuid.uuid4().hex]}
+    t = time.perf_counter()
+    response = client.post(path, data=json.dumps(body), content_type="application/json")
+    result["first_request_ms"][name] = (time.perf_counter() - t) * 1000.0
+    result["status"][name] = response.status_code
+with open("/proc/self/status") as f:
+    result["peak_rss_mb"] = next((int(l.split()[1]) / 1024.0 for l in f if l.startswith("VmHWM:")), None)
+print(json.dumps(result))
+"""
+
+
+def run_child(warmup, env):
+    child_env = {
+        **os.environ, **env,
+        "DJANGO_SETTINGS_MODULE": "benchmarks.settings",
+        "BENCH_STARTUP_WARMUP": "1" if warmup else "0",
+        "BENCH_HEAVY_MODULES": json.dumps(HEAVY_MODULES),
+        "BENCH_FIRST_REQUESTS": json.dumps(FIRST_REQUESTS),
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=PROJECT_DIR, env=child_env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _record(scenario, samples, statuses=(), modules=None, rss=None):
+    samples = np.asarray(samples)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    record = {
+        "mode": "startup",
+        "scenario": scenario,
+        "size": 0,
+        "concurrency": 1,
+        "requests": len(samples),
+        "errors": sum(status != 200 for status in statuses),
+        "status_counts": {},
+        "throughput_rps": 0.0,
+        "latency_ms": {
+            "p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "mean": float(samples.mean()), "max": float(samples.max()),
+        },
+        "peak_rss_mb": rss,
+        "peak_rss_scope": "process lifetime",
+    }
+    if modules is not None:
+        record["heavy_modules"] = modules
+    return record
+
+
+def run_startup(repeat=5, env=None):
+    """
+    Boot `repeat` fresh workers per variant (lazy, warmup). Returns result
+    records: boot time (django.setup + URLconf import) and the first
+    request per endpoint, compatible with `compare_results`.
+    """
+    records = []
+    for variant, warmup in (("lazy", False), ("warmup", True)):
+        runs = [run_child(warmup, env or {}) for _ in range(repeat)]
+        records.append(_record(
+            f"{variant}:boot", [run["boot_ms"] for run in runs],
+            modules=runs[-1]["modules"], rss=max(run["peak_rss_mb"] or 0 for run in runs) or None,
+        ))
+        for name in FIRST_REQUESTS:
+            records.append(_record(
+                f"{variant}:first_request:{name}",
+                [run["first_request_ms"][name] for run in runs],
+                statuses=[run["status"][name] for run in runs],
+            ))
+    return records
@@ -0,0 +1,55 @@
+from django.test import SimpleTestCase
+
+from .compare import compare_results, failed_results
+from .runner import run_scenario
+from .scenarios import Scenario
+
+
+class FakeTarget:
+    name = "fake"
+    pid = None
+
+    def __init__(self, statuses):
+        self.statuses = iter(statuses)
+        self.paths = []
+
+    def session(self):
+        def request(method, path, body):
+            self.paths.append((method, path, body))
+            return next(self.statuses)
+
+        return request
+
+
+def echo_scenario(name="echo"):
+    return Scenario(name, "POST", lambda n, size, rng: [(f"/echo/{i}/", b"{}") for i in range(n)])
+
+
+def record(scenario, p95, rps, errors=0):
+    return {"mode": "in-process", "scenario": scenario, "size": 1, "concurrency": 1, "errors": errors,
+            "latency_ms": {"p95": p95}, "throughput_rps": rps}
+
+
+class RunScenarioTests(SimpleTestCase):
+    def test_warmup_is_not_measured_and_errors_are_counted(self):
+        target = FakeTarget([500] * 2 + [200, 304, 500, 0])
+        result = run_scenario(target, echo_scenario(), requests=4, warmup=2)
+        self.assertEqual(len(target.paths), 6)
+        self.assertEqual(result["requests"], 4)
+        self.assertEqual(result["errors"], 2)
+        self.assertEqual(result["status_counts"], {"200": 1, "304": 1, "500": 1, "0": 1})
+        self.assertEqual(failed_results([result]), [result])
+        self.assertLessEqual(result["latency_ms"]["p50"], result["latency_ms"]["max"])
+
+
+class CompareResultsTests(SimpleTestCase):
+    def test_flags_regressions_and_skips_failed_runs(self):
+        baseline = {"results": [record("fast", 10.0, 100.0), record("slow", 10.0, 100.0),
+                                record("broken", 10.0, 100.0), record("gone", 10.0, 100.0)]}
+        current = {"results": [record("fast", 10.5, 98.0), record("slow", 20.0, 50.0),
+                               record("broken", 1.0, 1000.0, errors=20), record("new", 1.0, 1.0)]}
+        rows, regressions, skipped = compare_results(baseline, current, threshold=10.0)
+        self.assertEqual([row["key"][1] for row in rows], ["fast", "slow"])
+        self.assertEqual([row["key"][1] for row in regressions], ["slow"])
+        self.assertEqual(regressions[0]["p95_ms"], (10.0, 20.0, 100.0))
+        self.assertEqual(skipped, [("in-process", "broken", 1, 1)])
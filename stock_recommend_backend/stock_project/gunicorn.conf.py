@@ -0,0 +1,28 @@
+# Pre-forking deployment: gunicorn -c gunicorn.conf.py stock_project.wsgi
+#
+# The master imports the project and loads every dataset once
+# (stock_project.preload); workers are forked from it and share those pages
+# copy-on-write. With SHARED_ARRAYS['ENABLED'] the risk model's trees also
+# live in shared memory; the OHLCV store and risk grid are memory-mapped
+# files. The stock universe and indicator state are shared only
+# copy-on-write. Check the per-worker unique memory with the
+# process_memory_uss_bytes gauge on /metrics.
+import os
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "stock_project.settings")
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+preload_app = True
+
+
+def when_ready(server):
+    from stock_project.preload import preload_master
+
+    preload_master()
+
+
+def post_fork(server, worker):
+    from stock_project.preload import after_fork
+
+    after_fork()
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class RiskpredictorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'riskpredictor'
+
+    def ready(self):
+        # Off by default so manage.py commands never unpickle the model
+        if getattr(settings, 'STARTUP_WARMUP', False) or getattr(settings, 'RISK_MODEL', {}).get('PRELOAD', False):
+            from .registry import get_registry
+            get_registry().warm_up()
@@ -0,0 +1,94 @@
+# riskpredictor/batching.py
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from stock_project.metrics import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one batched call.
+
+    Callers `submit()` a row and get a `concurrent.futures.Future`. A daemon
+    worker thread takes the first queued row, keeps collecting until it has
+    `max_batch_size` rows or `max_wait_ms` has passed since that row was
+    queued, then calls `predict_batch(rows)` once and fans the results (or
+    the exception) back out to every waiting future. Because the hand-off is
+    a plain Future, WSGI threads can block on it and ASGI views can await it
+    with `asyncio.wrap_future`.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=2.0):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, row):
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((row, future, time.perf_counter()))
+        return future
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so a pre-forked worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="risk-microbatcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Past the deadline: still take whatever is already queued
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for _row, _future, queued_at in batch:
+                self.queue_wait_ms.observe((started - queued_at) * 1000.0)
+
+            try:
+                results = self.predict_batch([row for row, _future, _queued_at in batch])
+            except Exception as e:
+                for _row, future, _queued_at in batch:
+                    future.set_exception(e)
+                continue
+            for (_row, future, _queued_at), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
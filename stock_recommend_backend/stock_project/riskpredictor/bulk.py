@@ -0,0 +1,123 @@
+# riskpredictor/bulk.py
+"""
+Chunked, offline scoring of applicant files for the `score_risk` command.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .features import (
+    CATEGORICAL_FIELDS, NUMERIC_FIELDS, REQUIRED_FIELDS, calculate_bmi_array, get_risk_bands,
+)
+from .registry import ModelRegistry
+
+OUTPUT_COLUMNS = ['bmi', 'risk_percentage', 'risk_band', 'error']
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+# Model loaded once per pool worker by `init_worker`
+_worker_model = None
+
+
+def init_worker(model_path, products_path, compile=True):
+    """Process-pool initializer: load the model once for this worker."""
+    global _worker_model
+    _worker_model = ModelRegistry(model_path, products_path, compile=compile, check_interval=None).load()
+
+
+def score_chunk(frame, loaded=None):
+    """
+    Score a DataFrame of applicants that uses the predict_risk payload keys
+    as column names. Applies the same validation, BMI calculation and risk
+    banding as the API, vectorized over the chunk. Returns the input columns
+    plus bmi, risk_percentage, risk_band and a per-row error.
+    """
+    loaded = loaded or _worker_model
+    n = len(frame)
+    errors = np.full(n, None, dtype=object)
+
+    # Lower-priority errors first so the more fundamental one wins
+    columns = {}
+    for field, column in NUMERIC_FIELDS.items():
+        raw = frame[field] if field in frame else pd.Series(np.nan, index=frame.index)
+        values = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=float)
+        if field == 'cigarettes_per_day':
+            values = np.where(raw.isna().to_numpy(), 0.0, values)
+        errors[~np.isfinite(values) & raw.notna().to_numpy()] = f'Invalid numeric value for {field}.'
+        columns[column] = values
+    errors[np.nan_to_num(columns['Height (cm)'], nan=1.0) <= 0] = 'Height must be greater than zero.'
+    for field, column in CATEGORICAL_FIELDS.items():
+        if field in frame:
+            columns[column] = frame[field].astype(str).to_numpy()
+
+    missing = [field for field in REQUIRED_FIELDS if field not in frame]
+    if missing:
+        errors[:] = 'Missing required input fields.'
+    else:
+        errors[frame[REQUIRED_FIELDS].isna().any(axis=1).to_numpy()] = 'Missing required input fields.'
+
+    valid = np.array([e is None for e in errors], dtype=bool)
+    bmi = np.full(n, np.nan)
+    risk = np.full(n, np.nan)
+    bands = np.full(n, None, dtype=object)
+    if valid.any():
+        bmi[valid] = calculate_bmi_array(columns['Weight (kg)'][valid], columns['Height (cm)'][valid])
+        model_columns = {column: values[valid] for column, values in columns.items()}
+        model_columns['BMI'] = bmi[valid]
+        risk[valid] = loaded.predict_columns(model_columns, int(valid.sum()))
+        bands[valid] = get_risk_bands(risk[valid])
+
+    result = frame.copy()
+    result['bmi'] = bmi
+    result['risk_percentage'] = risk
+    result['risk_band'] = bands
+    result['error'] = errors
+    return result
+
+
+def is_parquet(path):
+    return os.path.splitext(str(path))[1].lower() in PARQUET_EXTENSIONS
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError('Parquet files need the optional pyarrow package.') from e
+    return pyarrow
+
+
+def iter_chunks(path, chunk_size):
+    """Yield DataFrames of at most `chunk_size` rows from a CSV or Parquet file."""
+    if is_parquet(path):
+        pyarrow = _require_pyarrow()
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file as they arrive."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.parquet = is_parquet(path)
+        self._writer = None
+        self._started = False
+
+    def write(self, frame):
+        if self.parquet:
+            pyarrow = _require_pyarrow()
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            frame.to_csv(self.path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
@@ -0,0 +1,200 @@
+# riskpredictor/cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+from .features import FEATURE_COLUMNS
+
+
+def canonical_key(row):
+    """
+    Canonical cache key for a validated model row (BMI included): values in
+    model column order with numbers as floats, so 30 and 30.0 share an entry.
+    """
+    return tuple(
+        value if isinstance(value, str) else float(value)
+        for value in (row[column] for column in FEATURE_COLUMNS)
+    )
+
+
+def files_fingerprint(paths):
+    """Short digest of the mtime and size of every path (missing files included)."""
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            parts.append(f'{path}:{st.st_mtime_ns}:{st.st_size}')
+        except FileNotFoundError:
+            parts.append(f'{path}:missing')
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:12]
+
+
+class LocalLRUBackend:
+    """
+    In-process LRU with a per-entry TTL. Counts evictions (capacity) and
+    expirations (TTL) separately.
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self.expirations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys, namespace):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get((namespace, key))
+                if entry is None:
+                    continue
+                value, expires_at = entry
+                if expires_at <= now:
+                    del self._data[(namespace, key)]
+                    self.expirations += 1
+                    continue
+                self._data.move_to_end((namespace, key))
+                found[key] = value
+        return found
+
+    def set_many(self, mapping, namespace):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[(namespace, key)] = (value, expires_at)
+                self._data.move_to_end((namespace, key))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            'backend': 'local',
+            'size': len(self._data),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class DjangoCacheBackend:
+    """
+    Stores predictions in a Django cache (locmem, file-based, ...) from
+    CACHES so workers can share them. Keys are hashed and the namespace is
+    passed as the cache `version`, so a new fingerprint simply stops
+    matching old entries, which then age out through the TTL. Evictions
+    are up to the Django backend and are not counted here.
+    """
+
+    def __init__(self, alias, ttl=3600):
+        self.alias = alias
+        self.ttl = ttl
+
+    @staticmethod
+    def _hashed(key):
+        return 'risk:' + hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def get_many(self, keys, namespace):
+        hashed = {self._hashed(key): key for key in keys}
+        found = caches[self.alias].get_many(list(hashed), version=namespace)
+        return {hashed[h]: value for h, value in found.items()}
+
+    def set_many(self, mapping, namespace):
+        caches[self.alias].set_many(
+            {self._hashed(key): value for key, value in mapping.items()},
+            timeout=self.ttl, version=namespace,
+        )
+
+    def clear(self):
+        # Other entries may share this cache; a new namespace is enough
+        pass
+
+    def stats(self):
+        return {'backend': self.alias, 'evictions': None}
+
+
+class PredictionCache:
+    """
+    Memoizes risk predictions keyed on `canonical_key(row)`.
+
+    Every call names the namespace of the model version doing the
+    predicting (`LoadedModel.cache_namespace`, which covers model.pkl and
+    insurance_products.json). When the namespace moves on, the local backend
+    is cleared and shared backends stop matching old entries, so a model
+    swap invalidates the cache without a restart. Hit and miss counters are
+    kept per process.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._namespace = None
+        self._lock = threading.Lock()
+
+    def _use_namespace(self, namespace):
+        if namespace != self._namespace:
+            with self._lock:
+                if namespace != self._namespace:
+                    if self._namespace is not None:
+                        self.backend.clear()
+                    self._namespace = namespace
+
+    def get_many(self, rows, namespace):
+        """Return {position: prediction} for the rows already cached."""
+        self._use_namespace(namespace)
+        keys = [canonical_key(row) for row in rows]
+        found = self.backend.get_many(set(keys), namespace)
+        hits = {i: found[key] for i, key in enumerate(keys) if key in found}
+        with self._lock:
+            self.hits += len(hits)
+            self.misses += len(rows) - len(hits)
+        return hits
+
+    def set_many(self, rows, predictions, namespace):
+        # A late write from a replaced model must not land in the new namespace
+        if namespace != self._namespace:
+            return
+        self.backend.set_many(
+            {canonical_key(row): prediction for row, prediction in zip(rows, predictions)}, namespace
+        )
+
+    def get(self, row, namespace):
+        return self.get_many([row], namespace).get(0)
+
+    def set(self, row, prediction, namespace):
+        self.set_many([row], [prediction], namespace)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'namespace': self._namespace,
+            **self.backend.stats(),
+        }
+
+
+def build_prediction_cache(config):
+    """Build a PredictionCache from a RISK_PREDICTION_CACHE settings dict (None if disabled)."""
+    if not config.get('ENABLED', False):
+        return None
+    backend_name = config.get('BACKEND', 'local')
+    ttl = config.get('TTL', 3600)
+    if backend_name == 'local':
+        backend = LocalLRUBackend(max_entries=config.get('MAX_ENTRIES', 10000), ttl=ttl)
+    else:
+        backend = DjangoCacheBackend(backend_name, ttl=ttl)
+    return PredictionCache(backend)
@@ -0,0 +1,184 @@
+# riskpredictor/compiled.py
+import numpy as np
+
+
+class NotCompilable(Exception):
+    """Raised when an estimator uses parts the compiled path does not cover."""
+
+
+class CompiledRiskModel:
+    """
+    Pandas-free evaluation of the pickled risk pipeline.
+
+    The fitted estimator is inspected once: the StandardScaler becomes a pair
+    of mean/scale arrays, each OneHotEncoder becomes a value -> column lookup,
+    and the tree ensemble is flattened into padded (n_trees, n_nodes) arrays
+    walked for every tree and row at once with NumPy. Supported shape:
+
+        Pipeline([ColumnTransformer([StandardScaler | OneHotEncoder | 'drop', ...]),
+                  RandomForestRegressor | ExtraTreesRegressor | DecisionTreeRegressor])
+
+    Anything else raises NotCompilable so callers can keep the pandas path.
+    """
+
+    def __init__(self, estimator):
+        steps = getattr(estimator, 'steps', None)
+        if not steps or len(steps) != 2:
+            raise NotCompilable('Expected a two-step Pipeline.')
+        self.n_features = self._compile_preprocessor(steps[0][1])
+        self.columns = [c[0] for c in self.numeric] + [c[0] for c in self.categorical]
+        self._compile_trees(steps[1][1])
+
+    def _compile_preprocessor(self, transformer):
+        from sklearn.compose import ColumnTransformer
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        if type(transformer) is not ColumnTransformer:
+            raise NotCompilable('Expected a ColumnTransformer preprocessor.')
+
+        self.numeric = []      # (column, output index, mean, scale)
+        self.categorical = []  # (column, {category: output index}, handle_unknown)
+        n_features = 0
+        for name, trans, columns in transformer.transformers_:
+            if trans == 'drop' or (name == 'remainder' and not len(columns)):
+                continue
+            if not all(isinstance(c, str) for c in columns):
+                raise NotCompilable('Transformer columns must be selected by name.')
+            out = transformer.output_indices_[name]
+
+            if type(trans) is StandardScaler:
+                means = trans.mean_ if trans.with_mean else np.zeros(len(columns))
+                scales = trans.scale_ if trans.with_std else np.ones(len(columns))
+                for i, column in enumerate(columns):
+                    self.numeric.append((column, out.start + i, float(means[i]), float(scales[i])))
+            elif type(trans) is OneHotEncoder:
+                if trans.drop is not None or getattr(trans, '_infrequent_enabled', False):
+                    raise NotCompilable('OneHotEncoder drop/infrequent categories are not supported.')
+                offset = out.start
+                for column, categories in zip(columns, trans.categories_):
+                    lookup = {category: offset + j for j, category in enumerate(categories.tolist())}
+                    self.categorical.append((column, lookup, trans.handle_unknown))
+                    offset += len(categories)
+            else:
+                raise NotCompilable(f'Unsupported transformer: {type(trans).__name__}')
+            n_features = max(n_features, out.stop)
+        return n_features
+
+    def _compile_trees(self, regressor):
+        from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+        from sklearn.tree import DecisionTreeRegressor
+
+        if type(regressor) in (RandomForestRegressor, ExtraTreesRegressor):
+            trees = [e.tree_ for e in regressor.estimators_]
+        elif type(regressor) is DecisionTreeRegressor:
+            trees = [regressor.tree_]
+        else:
+            raise NotCompilable(f'Unsupported regressor: {type(regressor).__name__}')
+        if regressor.n_outputs_ != 1 or regressor.n_features_in_ != self.n_features:
+            raise NotCompilable('Expected a single-output regressor over the preprocessed features.')
+
+        n_nodes = max(tree.node_count for tree in trees)
+        shape = (len(trees), n_nodes)
+        self.left = np.zeros(shape, dtype=np.intp)
+        self.right = np.zeros(shape, dtype=np.intp)
+        self.feature = np.zeros(shape, dtype=np.intp)
+        self.threshold = np.zeros(shape, dtype=np.float64)
+        self.value = np.zeros(shape, dtype=np.float64)
+        for t, tree in enumerate(trees):
+            n = tree.node_count
+            nodes = np.arange(n)
+            leaf = tree.children_left[:n] == -1
+            # Leaves point at themselves so extra walk steps are no-ops
+            self.left[t, :n] = np.where(leaf, nodes, tree.children_left[:n])
+            self.right[t, :n] = np.where(leaf, nodes, tree.children_right[:n])
+            self.feature[t, :n] = np.where(leaf, 0, tree.feature[:n])
+            self.threshold[t, :n] = tree.threshold[:n]
+            self.value[t, :n] = tree.value[:n, 0, 0]
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self.tree_index = np.arange(len(trees))
+
+    ARRAYS = ('left', 'right', 'feature', 'threshold', 'value')
+
+    def to_arrays(self):
+        """
+        Split the model into its large tree arrays and small JSON-serializable
+        metadata, for publishing to shared memory (see `from_arrays`).
+        """
+        meta = {
+            'n_features': self.n_features,
+            'max_depth': self.max_depth,
+            'numeric': [list(entry) for entry in self.numeric],
+            'categorical': [[column, list(lookup.items()), handle_unknown]
+                            for column, lookup, handle_unknown in self.categorical],
+        }
+        return {name: getattr(self, name) for name in self.ARRAYS}, meta
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        """
+        Rebuild a model from `to_arrays` output without the estimator. The
+        arrays are used as given, so read-only memmaps stay shared.
+        """
+        model = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(model, name, arrays[name])
+        model.n_features = meta['n_features']
+        model.max_depth = meta['max_depth']
+        model.numeric = [tuple(entry) for entry in meta['numeric']]
+        model.categorical = [(column, dict(map(tuple, lookup)), handle_unknown)
+                             for column, lookup, handle_unknown in meta['categorical']]
+        model.columns = [c[0] for c in model.numeric] + [c[0] for c in model.categorical]
+        model.tree_index = np.arange(len(model.value))
+        return model
+
+    def transform(self, rows):
+        """Encode rows (dicts keyed by model column) into the model's feature matrix."""
+        columns = {column: [row[column] for row in rows] for column in self.columns}
+        return self.transform_columns(columns, len(rows))
+
+    def transform_columns(self, columns, n_rows):
+        """Encode a mapping of model column -> sequence of values into the feature matrix."""
+        X = np.zeros((n_rows, self.n_features), dtype=np.float64)
+        for column, index, mean, scale in self.numeric:
+            X[:, index] = (np.asarray(columns[column], dtype=np.float64) - mean) / scale
+        for column, lookup, handle_unknown in self.categorical:
+            indices = np.fromiter((lookup.get(value, -1) for value in columns[column]), dtype=np.intp, count=n_rows)
+            known = indices >= 0
+            if handle_unknown == 'error' and not known.all():
+                value = list(columns[column])[int(np.argmin(known))]
+                raise ValueError(f"Found unknown category {value!r} in column {column!r}.")
+            X[np.flatnonzero(known), indices[known]] = 1.0
+        return X
+
+    def predict(self, rows):
+        """Predict for a list of row dicts; matches the estimator's `predict`."""
+        return self.predict_features(self.transform(rows))
+
+    def predict_columns(self, columns, n_rows):
+        """Predict for a mapping of model column -> sequence of values."""
+        return self.predict_features(self.transform_columns(columns, n_rows))
+
+    def predict_features(self, X, block_size=4096):
+        if len(X) > block_size:
+            # Bound the (rows x trees) walk arrays for very large inputs
+            return np.concatenate([
+                self.predict_features(X[start:start + block_size], block_size)
+                for start in range(0, len(X), block_size)
+            ])
+        # Trees compare float32 features, exactly as sklearn does
+        X = X.astype(np.float32).astype(np.float64)
+        row_index = np.arange(len(X))[:, None]
+        node = np.zeros((len(X), len(self.tree_index)), dtype=np.intp)
+        for _ in range(self.max_depth):
+            feature = self.feature[self.tree_index, node]
+            go_left = X[row_index, feature] <= self.threshold[self.tree_index, node]
+            node = np.where(go_left, self.left[self.tree_index, node], self.right[self.tree_index, node])
+        return self.value[self.tree_index, node].mean(axis=1)
+
+
+def compile_model(estimator):
+    """Return a CompiledRiskModel for `estimator`, or None if it cannot be compiled."""
+    try:
+        return CompiledRiskModel(estimator)
+    except NotCompilable:
+        return None
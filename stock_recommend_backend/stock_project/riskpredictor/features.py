@@ -0,0 +1,77 @@
+# riskpredictor/features.py
+import numpy as np
+
+from stock_project.schemas import Field, Schema, SchemaError
+
+# Column order the pickled pipeline was trained on
+FEATURE_COLUMNS = [
+    'Age', 'Gender', 'Height (cm)', 'Weight (kg)', 'Smoking Status',
+    'Cigarettes per day', 'Alcohol Consumption', 'Physical Activity Level',
+    'Dietary Habits', 'Occupation', 'BMI',
+]
+
+# Request payload key -> model column, for the fields the client sends
+NUMERIC_FIELDS = {
+    'age': 'Age',
+    'height': 'Height (cm)',
+    'weight': 'Weight (kg)',
+    'cigarettes_per_day': 'Cigarettes per day',
+}
+CATEGORICAL_FIELDS = {
+    'gender': 'Gender',
+    'smoking_status': 'Smoking Status',
+    'alcohol_consumption': 'Alcohol Consumption',
+    'physical_activity': 'Physical Activity Level',
+    'dietary_habits': 'Dietary Habits',
+    'occupation': 'Occupation',
+}
+REQUIRED_FIELDS = [
+    'age', 'gender', 'height', 'weight', 'smoking_status',
+    'alcohol_consumption', 'physical_activity', 'dietary_habits', 'occupation',
+]
+
+
+class ApplicantError(SchemaError):
+    """Raised when an applicant payload is missing fields or has bad values."""
+
+
+# Numbers must be JSON numbers and categories strings, so a batch of parsed
+# rows can always go through the model together
+APPLICANT_SCHEMA = Schema(
+    [
+        Field(field, 'number', key=column, required=field in REQUIRED_FIELDS, default=0,
+              error='Invalid numeric value for {name}.',
+              gt=0 if field == 'height' else None, limit_error='Height must be greater than zero.')
+        for field, column in NUMERIC_FIELDS.items()
+    ] + [
+        Field(field, 'string', key=column, error='Invalid value for {name}. Expected a string.')
+        for field, column in CATEGORICAL_FIELDS.items()
+    ],
+    object_error='Invalid applicant. Expected an object.',
+    missing_error='Missing required input fields.',
+    error=ApplicantError,
+)
+
+
+def parse_applicant(data):
+    """
+    Validate one applicant payload and return a dict keyed by model column
+    (without BMI). Raises ApplicantError.
+    """
+    return APPLICANT_SCHEMA(data)
+
+
+def calculate_bmi_array(weight, height):
+    """Vectorized `views.calculate_bmi` over arrays of kg and cm."""
+    height_m = np.asarray(height, dtype=float) / 100.0
+    return np.round(np.asarray(weight, dtype=float) / height_m ** 2, 2)
+
+
+def get_risk_bands(risk_percentage):
+    """Vectorized `views.get_risk_band`."""
+    risk_percentage = np.asarray(risk_percentage, dtype=float)
+    return np.select(
+        [risk_percentage <= 30, risk_percentage <= 70],
+        ['low', 'medium'],
+        default='high',
+    )
@@ -0,0 +1,273 @@
+# riskpredictor/grid.py
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .cache import files_fingerprint
+from .compiled import compile_model
+from .features import FEATURE_COLUMNS, calculate_bmi_array
+
+MANIFEST = 'manifest.json'
+GRID_FORMAT = 1
+
+# Numeric axes as (start, stop, points); BMI is derived from height and weight
+DEFAULT_AXES = {
+    'Age': (18, 90, 9),
+    'Height (cm)': (140, 215, 6),
+    'Weight (kg)': (40, 152, 8),
+    'Cigarettes per day': (0, 40, 5),
+}
+
+
+class GridError(Exception):
+    """Raised when a lookup grid cannot be built or opened."""
+
+
+def get_grid_config():
+    return getattr(settings, 'RISK_GRID', {})
+
+
+def get_grid_path():
+    """Return the directory of the precomputed risk grid."""
+    return str(get_grid_config().get('PATH') or os.path.join(settings.BASE_DIR, 'data', 'risk_grid'))
+
+
+class RiskGrid:
+    """
+    Model predictions precomputed over every combination of the categorical
+    inputs and a discretized box of the numeric ones.
+
+    `values` has shape (n_combinations, *numeric axis lengths); a row's
+    categories pick the combination and its numbers are interpolated
+    multilinearly between the surrounding grid points. `errors` holds,
+    per combination, the largest |grid - model| measured on random
+    off-grid points when the grid was built (infinite when it was not
+    measured); `lookup` only answers for combinations whose error was
+    measured and is within `tolerance`, for numbers inside the
+    box and for known categories. Every other row is reported as not
+    served and must go to the live model. The error is a sampled estimate,
+    not a bound.
+    """
+
+    def __init__(self, values, errors, meta, tolerance=0.0):
+        self.values = values
+        self.errors = errors
+        self.model_version = meta['model_version']
+        self.categorical = [(column, {category: i for i, category in enumerate(categories)})
+                            for column, categories in meta['categorical']]
+        self.numeric = [(column, np.asarray(axis, dtype=np.float64)) for column, axis in meta['numeric']]
+        self.shape = tuple(len(lookup) for _, lookup in self.categorical)
+        self.meta = meta
+        self.tolerance = tolerance
+        errors = np.asarray(errors)
+        self.servable = np.isfinite(errors) & (errors <= tolerance)
+        # Cells are gathered from the flattened array: each of the 2**d
+        # corners of a cell is a fixed offset from its lower corner
+        mesh_shape = values.shape[1:]
+        self.flat_values = values.reshape(-1)
+        self.strides = np.array([int(np.prod(mesh_shape[k + 1:])) for k in range(len(mesh_shape))], dtype=np.intp)
+        self.combination_stride = int(np.prod(mesh_shape))
+        d = len(self.numeric)
+        self.corners = np.array(np.meshgrid(*[[0, 1]] * d, indexing='ij')).reshape(d, -1).T.astype(bool)
+        self.corner_offsets = self.corners @ self.strides
+
+    @classmethod
+    def open(cls, path, tolerance=0.0):
+        try:
+            with open(os.path.join(path, MANIFEST)) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise GridError(f'No risk grid at {path}. Run build_risk_grid first.')
+        if meta.get('format') != GRID_FORMAT:
+            raise GridError('Unsupported risk grid format.')
+        values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r')
+        errors = np.load(os.path.join(path, 'errors.npy'))
+        return cls(values, errors, meta, tolerance)
+
+    def lookup(self, rows):
+        """Grid answers for row dicts keyed by model column (see `lookup_columns`)."""
+        columns = {column: [row[column] for row in rows] for column, _ in self.categorical + self.numeric}
+        return self.lookup_columns(columns, len(rows))
+
+    def lookup_columns(self, columns, n_rows):
+        """
+        Return (predictions, served): a float array and a boolean mask of
+        the rows the grid answered. Predictions of unserved rows are NaN.
+        """
+        served = np.ones(n_rows, dtype=bool)
+        combination = np.zeros(n_rows, dtype=np.intp)
+        for (column, lookup), size in zip(self.categorical, self.shape):
+            code = np.fromiter((lookup.get(value, -1) for value in columns[column]), dtype=np.intp, count=n_rows)
+            served &= code >= 0
+            combination = combination * size + np.maximum(code, 0)
+        served &= self.servable[combination]
+
+        flat = combination * self.combination_stride
+        fraction = np.empty((n_rows, len(self.numeric)))
+        for k, (column, axis) in enumerate(self.numeric):
+            x = np.asarray(columns[column], dtype=np.float64)
+            served &= (x >= axis[0]) & (x <= axis[-1])
+            position = np.interp(x, axis, np.arange(len(axis)))
+            lower = np.minimum(position.astype(np.intp), len(axis) - 2)
+            flat += lower * self.strides[k]
+            fraction[:, k] = position - lower
+
+        predictions = np.full(n_rows, np.nan)
+        rows = np.flatnonzero(served)
+        if len(rows):
+            # (rows, corners) cell values weighted by the product of per-axis weights
+            fraction = fraction[rows, None, :]
+            weights = np.where(self.corners, fraction, 1.0 - fraction).prod(axis=2)
+            cells = self.flat_values[flat[rows, None] + self.corner_offsets]
+            predictions[rows] = (weights * cells).sum(axis=1)
+        return predictions, served
+
+    def describe(self):
+        return {
+            'model_version': self.model_version,
+            'tolerance': self.tolerance,
+            'combinations': len(self.errors),
+            'servable_combinations': int(self.servable.sum()),
+            'max_error': self.meta['max_error'],
+            'numeric_axes': {column: axis.tolist() for column, axis in self.numeric},
+        }
+
+
+def build_grid(loaded, path, axes=None, samples=64, seed=0, block_rows=65536):
+    """
+    Precompute `loaded`'s predictions over `axes` ({column: (start, stop,
+    points)}, default DEFAULT_AXES) for every category combination the
+    model knows, measure the interpolation error of each combination on
+    `samples` random in-box points and write the grid to `path`. With
+    `samples=0` nothing is measured and every row falls back to the model
+    until the grid is rebuilt with samples. Returns
+    the RiskGrid. The directory is swapped in whole, so readers see either
+    the old or the new grid.
+    """
+    compiled = loaded.compiled or compile_model(loaded.estimator)
+    if compiled is None:
+        raise GridError('The risk grid needs a model the compiled path supports.')
+    axes = {**DEFAULT_AXES, **(axes or {})}
+    numeric = [(column, np.linspace(*map(float, axes[column][:2]), int(axes[column][2])).tolist())
+               for column in DEFAULT_AXES]
+    if any(len(axis) < 2 for _, axis in numeric):
+        raise GridError('Every numeric axis needs at least two points.')
+    categorical = [(column, list(lookup)) for column, lookup, _ in compiled.categorical]
+    shape = tuple(len(values) for _, values in categorical)
+    n_combinations = int(np.prod(shape))
+    mesh = [m.reshape(-1) for m in np.meshgrid(*[axis for _, axis in numeric], indexing='ij')]
+    mesh_shape = tuple(len(axis) for _, axis in numeric)
+
+    def predict(combinations, numbers):
+        # Model predictions for each combination paired with each numeric row
+        n = len(numbers[0])
+        columns = {}
+        for (column, categories), codes in zip(categorical, np.unravel_index(combinations, shape)):
+            columns[column] = np.asarray(categories, dtype=object)[np.repeat(codes, n)]
+        for (column, _), values in zip(numeric, numbers):
+            columns[column] = np.tile(values, len(combinations))
+        columns['BMI'] = calculate_bmi_array(columns['Weight (kg)'], columns['Height (cm)'])
+        if loaded.estimator is not None:
+            # sklearn walks large batches faster than the compiled path
+            import pandas as pd
+
+            frame = pd.DataFrame({column: columns[column] for column in FEATURE_COLUMNS})
+            return np.asarray(loaded.estimator.predict(frame), dtype=np.float64)
+        return np.asarray(loaded.predict_columns(columns, n * len(combinations)), dtype=np.float64)
+
+    path = os.path.abspath(str(path))
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.risk-grid-')
+    try:
+        values = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, 'values.npy'), mode='w+', dtype=np.float32, shape=(n_combinations,) + mesh_shape,
+        )
+        step = max(1, block_rows // len(mesh[0]))
+        for start in range(0, n_combinations, step):
+            block = np.arange(start, min(start + step, n_combinations))
+            values[block] = predict(block, mesh).reshape((len(block),) + mesh_shape)
+        values.flush()
+
+        meta = {
+            'format': GRID_FORMAT, 'model_version': loaded.version,
+            'categorical': categorical, 'numeric': numeric, 'samples': samples, 'max_error': None,
+        }
+        grid = RiskGrid(values, np.zeros(n_combinations), meta, tolerance=np.inf)
+        rng = np.random.default_rng(seed)
+        # Unmeasured combinations must never pass the tolerance gate
+        errors = np.zeros(n_combinations) if samples else np.full(n_combinations, np.inf)
+        step = max(1, block_rows // max(samples, 1))
+        for start in range(0, n_combinations if samples else 0, step):
+            block = np.arange(start, min(start + step, n_combinations))
+            numbers = [rng.uniform(axis[0], axis[-1], samples) for _, axis in numeric]
+            expected = predict(block, numbers)
+            columns = {column: np.tile(x, len(block)) for (column, _), x in zip(numeric, numbers)}
+            for (column, categories), codes in zip(categorical, np.unravel_index(block, shape)):
+                columns[column] = np.asarray(categories, dtype=object)[np.repeat(codes, samples)]
+            actual, _ = grid.lookup_columns(columns, len(expected))
+            errors[block] = np.abs(actual - expected).reshape(len(block), samples).max(axis=1)
+        np.save(os.path.join(tmp_dir, 'errors.npy'), errors)
+        meta['max_error'] = float(errors.max()) if samples else None
+        with open(os.path.join(tmp_dir, MANIFEST), 'w') as f:
+            json.dump(meta, f)
+        del values, grid
+
+        old_dir = None
+        if os.path.exists(path):
+            old_dir = tempfile.mkdtemp(dir=parent, prefix='.risk-grid-old-')
+            os.replace(path, os.path.join(old_dir, 'grid'))
+        os.replace(tmp_dir, path)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return RiskGrid.open(path)
+
+
+_grid = None
+_grid_signature = None
+_grid_checked_at = None
+_grid_lock = threading.Lock()
+
+
+def get_risk_grid():
+    """
+    Return the process-wide RiskGrid, or None when RISK_GRID is off or no
+    grid has been built. The grid directory is checked for a rebuild at
+    most every RISK_GRID['CHECK_INTERVAL'] seconds (None: only on first
+    use), so predictions do not stat the manifest on every call.
+    """
+    global _grid, _grid_signature, _grid_checked_at
+    config = get_grid_config()
+    if not config.get('ENABLED', False):
+        return None
+    interval = config.get('CHECK_INTERVAL', 5.0)
+    checked_at = _grid_checked_at
+    if checked_at is not None and (interval is None or time.monotonic() - checked_at < interval):
+        return _grid
+    with _grid_lock:
+        path = get_grid_path()
+        signature = files_fingerprint([os.path.join(path, MANIFEST)])
+        if signature != _grid_signature:
+            try:
+                _grid = RiskGrid.open(path, tolerance=config.get('TOLERANCE', 0.0))
+            except GridError:
+                _grid = None
+            _grid_signature = signature
+        _grid_checked_at = time.monotonic()
+    return _grid
+
+
+def reset_risk_grid():
+    """Forget the opened grid so settings changes take effect (tests)."""
+    global _grid, _grid_signature, _grid_checked_at
+    with _grid_lock:
+        _grid = _grid_signature = _grid_checked_at = None
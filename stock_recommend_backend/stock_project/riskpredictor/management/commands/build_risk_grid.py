@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from riskpredictor.grid import DEFAULT_AXES, GridError, build_grid, get_grid_config, get_grid_path
+from riskpredictor.registry import get_registry
+
+
+def parse_axis(value):
+    """COLUMN=START:STOP:POINTS -> (column, (start, stop, points))."""
+    try:
+        column, spec = value.split('=', 1)
+        start, stop, points = spec.split(':')
+        return column, (float(start), float(stop), int(points))
+    except ValueError:
+        raise CommandError(f'Invalid --axis {value!r}; expected COLUMN=START:STOP:POINTS.')
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the live risk model over every category combination and a grid of the "
+        "numeric inputs, measuring each combination's interpolation error (see RISK_GRID)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Grid directory (defaults to RISK_GRID PATH).')
+        parser.add_argument(
+            '--axis', action='append', default=[], metavar='COLUMN=START:STOP:POINTS',
+            help=f"Numeric axis override, repeatable. Columns: {', '.join(DEFAULT_AXES)}.",
+        )
+        parser.add_argument('--samples', type=int, default=64,
+                            help='Random points per combination used to measure the error (default 64). '
+                                 'With 0 the grid serves nothing until rebuilt with samples.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        axes = dict(get_grid_config().get('AXES') or {})
+        axes.update(parse_axis(value) for value in options['axis'])
+        unknown = set(axes) - set(DEFAULT_AXES)
+        if unknown:
+            raise CommandError(f"Unknown grid axes: {', '.join(sorted(unknown))}.")
+        if options['samples'] < 0:
+            raise CommandError('--samples must not be negative.')
+
+        output = options['output'] or get_grid_path()
+        loaded = get_registry().current()
+        started = time.perf_counter()
+        try:
+            grid = build_grid(loaded, output, axes, samples=options['samples'], seed=options['seed'])
+        except GridError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        tolerance = get_grid_config().get('TOLERANCE', 0.0)
+        self.stdout.write(self.style.SUCCESS(
+            f"Built a {grid.values.size:,}-cell grid for model {loaded.version} in {elapsed:.1f}s -> {output}"
+        ))
+        if not options['samples']:
+            self.stdout.write(self.style.WARNING(
+                'No samples: the error is unmeasured, so every request uses the model.'
+            ))
+        else:
+            within = int((grid.errors <= tolerance).sum())
+            self.stdout.write(
+                f"Max error {grid.errors.max():.3f}; {within}/{len(grid.errors)} combinations "
+                f"within TOLERANCE {tolerance}."
+            )
@@ -0,0 +1,316 @@
+# riskpredictor/registry.py
+import hashlib
+import json
+import logging
+import pickle
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from stock_project.shared import get_shared_arrays, shared_arrays_enabled
+from stock_project.timing import span
+
+from .cache import files_fingerprint
+from .compiled import CompiledRiskModel, compile_model
+from .features import FEATURE_COLUMNS
+from .grid import get_risk_grid
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parent
+
+# SharedArrays set holding the compiled trees of the live model
+SHARED_MODEL = 'risk-model'
+
+# Representative applicants pushed through every model before it goes live
+WARMUP_ROWS = [
+    {'Age': 42, 'Gender': 'Female', 'Height (cm)': 165.0, 'Weight (kg)': 70.0, 'Smoking Status': 'No',
+     'Cigarettes per day': 0, 'Alcohol Consumption': 'Occasionally', 'Physical Activity Level': 'Moderate',
+     'Dietary Habits': 'Balanced', 'Occupation': 'Office Job', 'BMI': 25.71},
+    {'Age': 61, 'Gender': 'Male', 'Height (cm)': 178.0, 'Weight (kg)': 98.0, 'Smoking Status': 'Yes',
+     'Cigarettes per day': 20, 'Alcohol Consumption': 'Daily', 'Physical Activity Level': 'Sedentary',
+     'Dietary Habits': 'Junk Food Regularly', 'Occupation': 'Heavy Labor', 'BMI': 30.93},
+]
+
+
+class ModelLoadError(Exception):
+    """Raised when a model artifact cannot be loaded or fails warm-up."""
+
+
+class LoadedModel:
+    """
+    One immutable, warmed-up model version: the estimator, its compiled
+    fast path (if any) and the insurance products that go with it. A model
+    attached from shared memory has only the compiled path (`estimator` is
+    None) and records its `shared_generation`.
+    """
+
+    def __init__(self, estimator, products, model_path, products_path, version, products_version,
+                 fingerprint, compile=True, compiled=None, shared_generation=None):
+        self.estimator = estimator
+        self.products = products
+        self.model_path = str(model_path)
+        self.products_path = str(products_path)
+        self.version = version
+        self.products_version = products_version
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        if compiled is None and compile and estimator is not None:
+            compiled = compile_model(estimator)
+        self.compiled = compiled
+        self.shared_generation = shared_generation
+
+    @property
+    def cache_namespace(self):
+        """Prediction-cache namespace: changes with the model or the products file."""
+        return f'{self.version}:{self.products_version}'
+
+    def predict(self, rows):
+        """
+        Predict for parsed applicant rows (BMI included) in one call. Rows
+        the precomputed grid (RISK_GRID) can answer within its tolerance are
+        looked up; the rest go through the model, on the compiled NumPy path
+        when the estimator could be compiled.
+        """
+        grid = get_risk_grid()
+        if grid is None or grid.model_version != self.version:
+            return self.predict_model(rows)
+        with span('grid'):
+            predictions, served = grid.lookup(rows)
+        missing = np.flatnonzero(~served)
+        if len(missing):
+            predictions[missing] = self.predict_model([rows[i] for i in missing])
+        return predictions.tolist()
+
+    def predict_model(self, rows):
+        """Predict for parsed applicant rows with the live model, bypassing the grid."""
+        if self.compiled is not None:
+            with span('estimator'):
+                return self.compiled.predict(rows).tolist()
+        # Only estimators the compiled path cannot handle need pandas
+        import pandas as pd
+
+        with span('frame'):
+            input_data = pd.DataFrame.from_records(rows, columns=FEATURE_COLUMNS)
+        with span('estimator'):
+            return self.estimator.predict(input_data).tolist()
+
+    def predict_columns(self, columns, n_rows):
+        """Predict for a mapping of model column -> sequence of values (BMI included)."""
+        if self.compiled is not None:
+            with span('estimator'):
+                return self.compiled.predict_columns(columns, n_rows)
+        import pandas as pd
+
+        with span('frame'):
+            input_data = pd.DataFrame({column: columns[column] for column in FEATURE_COLUMNS})
+        with span('estimator'):
+            return self.estimator.predict(input_data)
+
+    def warm_up(self):
+        """
+        Run the warm-up rows through the model. The compiled path must agree
+        with the estimator; if it does not, it is dropped in favour of pandas.
+        """
+        predictions = self.predict_model(WARMUP_ROWS)
+        if not np.all(np.isfinite(predictions)):
+            raise ModelLoadError(f'Model {self.version} produced non-finite warm-up predictions.')
+        if self.compiled is not None and self.estimator is not None:
+            compiled, self.compiled = self.compiled, None
+            reference = self.predict_model(WARMUP_ROWS)
+            if np.allclose(predictions, reference, rtol=0, atol=1e-9):
+                self.compiled = compiled
+            else:
+                logger.warning('Compiled path for model %s disagrees with predict(); using pandas.', self.version)
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'model_path': self.model_path,
+            'products_path': self.products_path,
+            'loaded_at': self.loaded_at,
+            'compiled': self.compiled is not None,
+            'shared_generation': self.shared_generation,
+        }
+
+
+class ModelRegistry:
+    """
+    Holds the live risk model and swaps in new versions atomically.
+
+    Nothing is loaded until the first `current()` call (or an explicit
+    `warm_up()`). A new artifact is fully unpickled, compiled and warmed up
+    before the single reference assignment that makes it live, so in-flight
+    requests finish on the version they started with and no request ever
+    sees a half-loaded model. When the watched files change on disk the
+    reload happens on a background thread while the old version keeps
+    serving.
+
+    With SHARED_ARRAYS enabled the compiled trees are published to shared
+    memory by whichever process loads a version first; every other worker
+    whose files match attaches to them instead of unpickling the model, so
+    N workers hold one copy of the trees.
+    """
+
+    def __init__(self, model_path, products_path, compile=True, check_interval=5.0, history_size=5):
+        self.model_path = str(model_path)
+        self.products_path = str(products_path)
+        self.compile = compile
+        self.check_interval = check_interval
+        self.history = []
+        self.history_size = history_size
+        self._current = None
+        self._checked_at = 0.0
+        self._failed_fingerprint = None
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    def load(self, model_path=None, products_path=None):
+        """Load, compile and warm up a model version without making it live."""
+        model_path = str(model_path or self.model_path)
+        products_path = str(products_path or self.products_path)
+        fingerprint = files_fingerprint([model_path, products_path])
+        shared = get_shared_arrays(SHARED_MODEL) if self.compile and shared_arrays_enabled() else None
+        if shared is not None:
+            attached = shared.attach()
+            if attached is not None and attached.source == fingerprint:
+                return self._load_shared(attached, model_path, products_path)
+        try:
+            with open(model_path, 'rb') as f:
+                payload = f.read()
+            estimator = pickle.loads(payload)
+            with open(products_path, 'rb') as f:
+                products_payload = f.read()
+            products = json.loads(products_payload)
+        except (OSError, pickle.UnpicklingError, ValueError) as e:
+            raise ModelLoadError(f'Could not load model from {model_path}: {e}') from e
+
+        loaded = LoadedModel(
+            estimator, products, model_path, products_path,
+            version=hashlib.sha256(payload).hexdigest()[:12],
+            products_version=hashlib.sha256(products_payload).hexdigest()[:8],
+            fingerprint=fingerprint,
+            compile=self.compile,
+        )
+        loaded.warm_up()
+        if shared is not None and loaded.compiled is not None:
+            self._publish(shared, loaded)
+        return loaded
+
+    def _load_shared(self, attached, model_path, products_path):
+        meta = attached.meta
+        loaded = LoadedModel(
+            None, meta['products'], model_path, products_path,
+            version=meta['version'], products_version=meta['products_version'],
+            fingerprint=attached.source,
+            compiled=CompiledRiskModel.from_arrays(attached.arrays, meta['compiled']),
+            shared_generation=attached.generation,
+        )
+        loaded.warm_up()
+        return loaded
+
+    def _publish(self, shared, loaded):
+        """Publish the compiled trees and switch `loaded` over to the shared copy."""
+        arrays, compiled_meta = loaded.compiled.to_arrays()
+        meta = {
+            'version': loaded.version, 'products_version': loaded.products_version,
+            'products': loaded.products, 'compiled': compiled_meta,
+        }
+        try:
+            shared.publish(arrays, meta, loaded.fingerprint)
+        except OSError:
+            logger.warning('Could not publish risk model %s to shared memory.', loaded.version, exc_info=True)
+            return
+        attached = shared.attach()
+        if attached is not None and attached.source == loaded.fingerprint:
+            loaded.compiled = CompiledRiskModel.from_arrays(attached.arrays, attached.meta['compiled'])
+            loaded.shared_generation = attached.generation
+
+    def swap(self, model_path=None, products_path=None):
+        """
+        Make a new model version live. It is loaded and warmed up first;
+        if that fails the current version stays in place and the error is raised.
+        """
+        loaded = self.load(model_path, products_path)
+        with self._lock:
+            if model_path:
+                self.model_path = str(model_path)
+            if products_path:
+                self.products_path = str(products_path)
+            self._activate(loaded)
+        logger.info('Risk model %s is live.', loaded.version)
+        return loaded
+
+    def _activate(self, loaded):
+        if self._current is not None:
+            self.history.append(self._current.describe())
+            del self.history[:-self.history_size]
+        self._current = loaded
+        self._checked_at = time.monotonic()
+        self._failed_fingerprint = None
+
+    def current(self):
+        """Return the live LoadedModel, loading it on first use."""
+        loaded = self._current
+        if loaded is None:
+            with self._lock:
+                if self._current is None:
+                    self._activate(self.load())
+                return self._current
+        if self.check_interval is not None and time.monotonic() - self._checked_at >= self.check_interval:
+            self._check_for_changes(loaded)
+        return loaded
+
+    def warm_up(self):
+        """Explicit warm-up hook for server start (see RISK_MODEL['PRELOAD'])."""
+        return self.current()
+
+    def _check_for_changes(self, loaded):
+        self._checked_at = time.monotonic()
+        fingerprint = files_fingerprint([self.model_path, self.products_path])
+        if fingerprint in (loaded.fingerprint, self._failed_fingerprint):
+            return
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, args=(fingerprint,), name='risk-model-reload', daemon=True).start()
+
+    def _reload(self, fingerprint):
+        try:
+            self.swap()
+        except Exception:
+            logger.exception('Reloading the risk model failed; keeping version %s.', self._current.version)
+            self._failed_fingerprint = fingerprint
+        finally:
+            self._reloading = False
+
+    def describe(self):
+        current = self._current
+        return {
+            'current': current.describe() if current is not None else None,
+            'history': list(self.history),
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide ModelRegistry configured from RISK_MODEL."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                config = getattr(settings, 'RISK_MODEL', {})
+                _registry = ModelRegistry(
+                    config.get('MODEL_PATH', APP_DIR / 'model.pkl'),
+                    config.get('PRODUCTS_PATH', APP_DIR / 'insurance_products.json'),
+                    compile=getattr(settings, 'RISK_COMPILED_INFERENCE', True),
+                    check_interval=config.get('CHECK_INTERVAL', 5.0),
+                )
+    return _registry
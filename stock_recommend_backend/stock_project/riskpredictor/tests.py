@@ -1,3 +1,752 @@
-from django.test import TestCase
+import io
+import json
+import os
+import pickle
+import pstats
+import random
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from stock_project import codec, profiling
+from stock_project.admission import ConcurrencyLimiter, get_admission_controller, reset_admission_controller
+from stock_project.codec import DecodeError, JsonResponse, dumps, loads
+from stock_project.metrics import process_memory
+from stock_project.profiling import make_profile_token
+from stock_project.shared import SharedArrays, reset_shared_arrays
+from stock_project.timing import reset_timing_registry, span
+
+from . import views
+from .batching import MicroBatcher
+from .cache import DjangoCacheBackend, LocalLRUBackend, PredictionCache, canonical_key
+from .compiled import CompiledRiskModel, NotCompilable, compile_model
+from .features import FEATURE_COLUMNS, ApplicantError, calculate_bmi_array, get_risk_bands, parse_applicant
+from .grid import RiskGrid, get_risk_grid, reset_risk_grid
+from .registry import ModelLoadError, ModelRegistry, get_registry
+from .views import calculate_bmi, get_risk_band
+
+APPLICANT = {
+    "age": 42,
+    "gender": "Female",
+    "height": 165,
+    "weight": 70,
+    "smoking_status": "No",
+    "cigarettes_per_day": 0,
+    "alcohol_consumption": "Occasionally",
+    "physical_activity": "Moderate",
+    "dietary_habits": "Balanced",
+    "occupation": "Office Job",
+}
+
+SMOKER = dict(APPLICANT, age=61, gender="Male", weight=98, smoking_status="Yes", cigarettes_per_day=20,
+              alcohol_consumption="Daily", physical_activity="Sedentary", dietary_habits="Junk Food Regularly",
+              occupation="Heavy Labor")
+
+
+class RiskPredictorTestCase(TestCase):
+    def post_json(self, name, payload):
+        return self.client.post(reverse(name), data=json.dumps(payload), content_type="application/json")
+
+
+class PredictRiskTests(RiskPredictorTestCase):
+    def test_predict_risk(self):
+        response = self.post_json("predict_risk", APPLICANT)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["bmi"], calculate_bmi(70, 165))
+        self.assertEqual(data["risk_band"], get_risk_band(data["risk_percentage"]))
+        self.assertEqual(data["model_version"], get_registry().current().version)
+
+    def test_missing_fields(self):
+        response = self.post_json("predict_risk", {"age": 30})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Missing required input fields.")
+
+    def test_get_not_allowed(self):
+        self.assertEqual(self.client.get(reverse("predict_risk")).status_code, 405)
+
+
+class PredictRiskBatchTests(RiskPredictorTestCase):
+    def test_batch_matches_single_predictions(self):
+        applicants = [APPLICANT, {"age": 30}, SMOKER, dict(APPLICANT, height=0)]
+        response = self.post_json("predict_risk_batch", {"applicants": applicants})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[1], {"error": "Missing required input fields."})
+        self.assertEqual(results[3], {"error": "Height must be greater than zero."})
+        for i in (0, 2):
+            single = self.post_json("predict_risk", applicants[i]).json()
+            self.assertEqual(results[i]["bmi"], single["bmi"])
+            self.assertEqual(results[i]["risk_band"], single["risk_band"])
+            self.assertAlmostEqual(results[i]["risk_percentage"], single["risk_percentage"])
+
+    def test_rejects_non_list(self):
+        response = self.post_json("predict_risk_batch", {"applicants": APPLICANT})
+        self.assertEqual(response.status_code, 400)
+
+    def test_vectorized_helpers_match_scalar_versions(self):
+        weights, heights = [70, 98.5, 55], [165, 181, 150.5]
+        self.assertEqual(
+            calculate_bmi_array(weights, heights).tolist(),
+            [calculate_bmi(w, h) for w, h in zip(weights, heights)],
+        )
+        risks = [0, 30, 30.01, 70, 70.5, 100]
+        self.assertEqual(get_risk_bands(risks).tolist(), [get_risk_band(r) for r in risks])
+
+
+def server_timing(response):
+    """Server-Timing header as {phase: milliseconds}."""
+    entries = (entry.split(";dur=") for entry in response["Server-Timing"].split(", "))
+    return {name: float(duration) for name, duration in entries}
+
+
+@override_settings(
+    RISK_PREDICTION_CACHE={"ENABLED": False},
+    REQUEST_TIMING={"ENABLED": True, "SAMPLE_RATE": 1.0, "SERVER_TIMING_HEADER": True},
+)
+class RequestTimingTests(RiskPredictorTestCase):
+    def setUp(self):
+        reset_timing_registry()
+        self.addCleanup(reset_timing_registry)
+
+    def test_phases_are_reported_and_exported(self):
+        response = self.post_json("predict_risk", APPLICANT)
+        self.assertEqual(response.status_code, 200)
+        phases = server_timing(response)
+        self.assertTrue({"parse", "cache", "model", "estimator", "render", "total"} <= set(phases))
+        self.assertGreaterEqual(phases["total"], phases["model"])
+
+        metrics = self.client.get("/metrics")
+        self.assertEqual(metrics.status_code, 200)
+        text = metrics.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+        self.assertIn('http_request_duration_seconds_count{method="POST",endpoint="/risk/predict/"} 1', text)
+        self.assertIn(
+            'http_request_phase_duration_seconds_bucket{method="POST",endpoint="/risk/predict/",'
+            'phase="model",le="+Inf"} 1',
+            text,
+        )
+
+    @override_settings(REQUEST_TIMING={"ENABLED": True, "SAMPLE_RATE": 0.0})
+    def test_unsampled_requests_are_not_recorded(self):
+        response = self.post_json("predict_risk", APPLICANT)
+        self.assertNotIn("Server-Timing", response)
+        self.assertNotIn("/risk/predict/", self.client.get("/metrics").content.decode())
+
+    @override_settings(REQUEST_TIMING={"ENABLED": False})
+    def test_disabled_instrumentation_is_a_no_op(self):
+        response = self.post_json("predict_risk", APPLICANT)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+        self.assertIs(span("model"), span("parse"))
+
+
+RISK_ONLY = {
+    "ENABLED": True,
+    "RETRY_AFTER": 3,
+    "CLASSES": {"risk": {"PATHS": ["/risk/predict/"], "MAX_CONCURRENCY": 1, "MAX_QUEUE": 0}},
+}
+
+
+class AdmissionControlTests(RiskPredictorTestCase):
+    def setUp(self):
+        reset_admission_controller()
+        self.addCleanup(reset_admission_controller)
+
+    def test_waiters_get_released_slots_in_order_and_overflow_is_shed(self):
+        limiter = ConcurrencyLimiter("test", max_concurrency=1, max_queue=1, queue_timeout=5)
+        self.assertTrue(limiter.acquire())
+        admitted = []
+        waiter = threading.Thread(target=lambda: admitted.append(limiter.acquire()))
+        waiter.start()
+        while limiter.stats()["queued"] == 0:
+            time.sleep(0.001)
+        self.assertFalse(limiter.acquire())  # queue full
+        limiter.release()
+        waiter.join()
+        self.assertEqual(admitted, [True])
+        self.assertEqual(limiter.stats()["in_flight"], 1)
+        self.assertEqual(limiter.stats()["shed"], {"queue_full": 1, "timeout": 0})
+
+    def test_queued_requests_time_out(self):
+        limiter = ConcurrencyLimiter("test", max_concurrency=1, max_queue=4, queue_timeout=0.01)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire())
+        self.assertFalse(async_to_sync(limiter.aacquire)())
+        self.assertEqual(limiter.stats()["shed"]["timeout"], 2)
+        self.assertEqual(limiter.stats()["queued"], 0)
+
+    def test_async_waiters_share_the_queue(self):
+        limiter = ConcurrencyLimiter("test", max_concurrency=1, max_queue=1, queue_timeout=5)
+        self.assertTrue(limiter.acquire())
+        threading.Timer(0.01, limiter.release).start()
+        self.assertTrue(async_to_sync(limiter.aacquire)())
+        self.assertEqual(limiter.stats()["in_flight"], 1)
+
+    def test_limit_adapts_to_the_latency_slo(self):
+        limiter = ConcurrencyLimiter("test", max_concurrency=8, slo=0.1, window=4)
+        for latencies, limit in (([1.0] * 4, 6), ([1.0] * 4, 4), ([0.01] * 4, 5)):
+            for latency in latencies:
+                limiter.acquire()
+                limiter.release(latency)
+            self.assertEqual(limiter.limit, limit)
+
+    @override_settings(ADMISSION_CONTROL=RISK_ONLY)
+    def test_saturated_class_sheds_with_retry_after(self):
+        limiter = get_admission_controller().limiters["risk"]
+        self.assertTrue(limiter.acquire())
+        response = self.post_json("predict_risk", APPLICANT)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "3")
+        self.assertIn("error", response.json())
+
+        # Other endpoints keep flowing
+        metrics = self.client.get("/metrics")
+        self.assertEqual(metrics.status_code, 200)
+        self.assertIn('admission_shed_total{class="risk",reason="queue_full"} 1', metrics.content.decode())
+
+        limiter.release()
+        response = self.post_json("predict_risk", APPLICANT)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+
+
+class RequestProfilingTests(RiskPredictorTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def profiling(self, **config):
+        return override_settings(REQUEST_PROFILING={
+            "ENABLED": True, "SAMPLE_RATE": 0.0, "APPS": ["riskpredictor"], "PATH": self.tmpdir, **config,
+        })
+
+    def test_signed_header_profiles_the_view(self):
+        with self.profiling():
+            response = self.client.post(
+                reverse("predict_risk"), data=json.dumps(APPLICANT), content_type="application/json",
+                HTTP_X_PROFILE=make_profile_token(),
+            )
+        self.assertEqual(response.status_code, 200)
+        stem = response["X-Profile-Id"]
+        stats = pstats.Stats(os.path.join(self.tmpdir, stem + ".prof"))
+        self.assertTrue(any(name == "predict_risk" for _, _, name in stats.stats))
+        with open(os.path.join(self.tmpdir, stem + ".collapsed")) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, micros = line.rsplit(" ", 1)
+            self.assertGreater(int(micros), 0)
+        self.assertTrue(any("predict_risk (views.py" in line for line in lines))
+
+    def test_only_sampled_requests_to_listed_apps_are_profiled(self):
+        with self.profiling():
+            response = self.post_json("predict_risk", APPLICANT)
+            self.assertNotIn("X-Profile-Id", response)
+            response = self.client.post(
+                reverse("predict_risk"), data=json.dumps(APPLICANT), content_type="application/json",
+                HTTP_X_PROFILE=make_profile_token() + "x",
+            )
+            self.assertNotIn("X-Profile-Id", response)
+        with self.profiling(SAMPLE_RATE=1.0):
+            self.client = self.client_class()  # rebuilds the middleware chain
+            self.assertIn("X-Profile-Id", self.post_json("predict_risk", APPLICANT))
+            self.assertNotIn("X-Profile-Id", self.client.get("/metrics"))
+        self.assertEqual(len(os.listdir(self.tmpdir)), 2)
+
+    def test_overlapping_or_failing_profiles_do_not_fail_requests(self):
+        with self.profiling(SAMPLE_RATE=1.0):
+            # Another request holds the profiler: this one is served unprofiled
+            with profiling._active:
+                response = self.post_json("predict_risk", APPLICANT)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("X-Profile-Id", response)
+            # Python >= 3.12 refuses a second active profiler
+            with mock.patch("cProfile.Profile.enable", side_effect=ValueError("Another profiling tool is already active")):
+                with self.assertLogs("stock_project.profiling", "WARNING"):
+                    response = self.post_json("predict_risk", APPLICANT)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("X-Profile-Id", response)
+            self.assertIn("X-Profile-Id", self.post_json("predict_risk", APPLICANT))
+        self.assertFalse(profiling._active.locked())
+
+    def test_only_the_newest_profiles_are_kept(self):
+        with self.profiling(SAMPLE_RATE=1.0, MAX_FILES=2):
+            stems = [self.post_json("predict_risk", APPLICANT)["X-Profile-Id"] for _ in range(3)]
+        self.assertEqual(sorted(os.listdir(self.tmpdir)),
+                         sorted(stem + suffix for stem in stems[1:] for suffix in (".collapsed", ".prof")))
+
+
+class RequestCodecTests(RiskPredictorTestCase):
+    def test_numpy_values_are_encoded(self):
+        payload = {"risk": np.float64(12.5), "count": np.int64(3), "scores": np.array([0.5, 1.0]), "flag": np.bool_(True)}
+        self.assertEqual(loads(dumps(payload)), {"risk": 12.5, "count": 3, "scores": [0.5, 1.0], "flag": True})
+        self.assertEqual(json.loads(JsonResponse(payload).content)["scores"], [0.5, 1.0])
+
+    def test_backends_agree_and_encode_non_finite_as_null(self):
+        backends = [(codec._json_loads, codec._json_dumps)]
+        if codec.orjson is not None:
+            backends.append((codec._orjson_loads, codec._orjson_dumps))
+        payload = {"nan": float("nan"), "inf": [np.float64("inf"), 1.5], "array": np.array([np.nan, 2.0]),
+                   "nested": {"low": (float("-inf"),)}, "count": np.int64(3)}
+        expected = {"nan": None, "inf": [None, 1.5], "array": [None, 2.0], "nested": {"low": [None]}, "count": 3}
+        for backend_loads, backend_dumps in backends:
+            with self.subTest(backend=backend_dumps.__name__):
+                encoded = backend_dumps(payload)
+                self.assertEqual(json.loads(encoded), expected)  # strict JSON: no bare NaN
+                self.assertEqual(backend_loads(encoded), expected)
+                self.assertEqual(backend_dumps({"ok": [1, 2.5]}), b'{"ok":[1,2.5]}')
+                with self.assertRaises(DecodeError):
+                    backend_loads(b'{"bad": NaN')
+                with self.assertRaises(DecodeError):
+                    backend_loads(b"\xff")
+
+    def test_applicant_schema(self):
+        row = parse_applicant(dict(APPLICANT, cigarettes_per_day=None))
+        self.assertEqual(set(row), set(FEATURE_COLUMNS) - {"BMI"})
+        self.assertEqual(row["Cigarettes per day"], 0)
+        cases = {
+            "Invalid applicant. Expected an object.": [APPLICANT],
+            "Missing required input fields.": dict(APPLICANT, occupation=None),
+            "Invalid numeric value for age.": dict(APPLICANT, age=True),
+            "Invalid numeric value for weight.": dict(APPLICANT, weight="70"),
+            "Invalid value for gender. Expected a string.": dict(APPLICANT, gender=1),
+            "Height must be greater than zero.": dict(APPLICANT, height=-1),
+        }
+        for message, payload in cases.items():
+            with self.assertRaisesMessage(ApplicantError, message):
+                parse_applicant(payload)
+
+    def test_malformed_bodies_get_consistent_400s(self):
+        for name in ("predict_risk", "predict_risk_batch"):
+            response = self.client.post(reverse(name), data=b"\xff{", content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"error": "Invalid JSON input."})
+        response = self.post_json("predict_risk_batch", {"applicants": [APPLICANT] * (views.MAX_BATCH_APPLICANTS + 1)})
+        self.assertEqual(response.json(), {"error": f"Too many applicants. Maximum is {views.MAX_BATCH_APPLICANTS}."})
+
+
+class MicroBatcherTests(TestCase):
+    def test_concurrent_submits_share_a_batch(self):
+        calls = []
+        release = threading.Event()
+
+        def predict_batch(rows):
+            calls.append(len(rows))
+            release.wait(1)
+            return [row * 2 for row in rows]
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=8, max_wait_ms=50)
+        # Everything is queued within the wait window (or while a batch is running)
+        first = batcher.submit(0)
+        futures = [batcher.submit(i) for i in range(1, 8)]
+        release.set()
+        self.assertEqual(first.result(1), 0)
+        self.assertEqual([f.result(1) for f in futures], [i * 2 for i in range(1, 8)])
+        self.assertEqual(sum(calls), 8)
+        self.assertLess(len(calls), 8)
+        self.assertEqual(batcher.stats()["batch_size"]["count"], len(calls))
+        self.assertEqual(batcher.stats()["queue_wait_ms"]["count"], 8)
+
+    def test_errors_fan_out_to_every_caller(self):
+        def predict_batch(rows):
+            raise ValueError("boom")
+
+        batcher = MicroBatcher(predict_batch, max_wait_ms=1)
+        with self.assertRaisesMessage(ValueError, "boom"):
+            batcher.submit(1).result(1)
+
+
+@override_settings(
+    RISK_MICROBATCH={"ENABLED": True, "MAX_BATCH_SIZE": 16, "MAX_WAIT_MS": 1},
+    RISK_PREDICTION_CACHE={"ENABLED": False},
+)
+class MicroBatchedPredictRiskTests(RiskPredictorTestCase):
+    def setUp(self):
+        views._batcher = None
+        self.addCleanup(setattr, views, "_batcher", None)
+
+    def test_batched_predictions_match_direct_model_calls(self):
+        expected = views.predict_rows([dict(views.parse_applicant(APPLICANT), BMI=calculate_bmi(70, 165))])[0][0]
+        response = self.post_json("predict_risk", APPLICANT)
+        self.assertAlmostEqual(response.json()["risk_percentage"], expected)
+        self.assertEqual(self.client.get(reverse("batching_stats")).json()["batch_size"]["count"], 1)
+
+    def test_async_view_uses_the_batcher(self):
+        request = RequestFactory().post("/risk/predict/", data=json.dumps(SMOKER), content_type="application/json")
+        response = async_to_sync(views.predict_risk_async)(request)
+        self.assertEqual(response.status_code, 200)
+        single = self.post_json("predict_risk", SMOKER).json()
+        self.assertEqual(json.loads(response.content), single)
+
+
+def random_rows(n, seed=0):
+    """Random model rows covering every known category plus unseen ones."""
+    encoder = get_registry().current().estimator.steps[0][1].named_transformers_["cat"]
+    columns = ["Gender", "Smoking Status", "Alcohol Consumption", "Physical Activity Level",
+               "Dietary Habits", "Occupation"]
+    choices = {column: list(categories) + ["Unseen"] for column, categories in zip(columns, encoder.categories_)}
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        row = {
+            "Age": rng.randint(18, 90),
+            "Height (cm)": rng.uniform(140, 210),
+            "Weight (kg)": rng.uniform(40, 150),
+            "Cigarettes per day": rng.choice([0, 0, rng.randint(1, 40)]),
+        }
+        for column, values in choices.items():
+            row[column] = rng.choice(values)
+        row["BMI"] = calculate_bmi(row["Weight (kg)"], row["Height (cm)"])
+        rows.append(row)
+    return rows
+
+
+class CompiledModelParityTests(TestCase):
+    def setUp(self):
+        self.model = get_registry().current().estimator
+
+    def test_compiled_matches_model_predict_on_random_inputs(self):
+        compiled = CompiledRiskModel(self.model)
+        for seed in range(3):
+            rows = random_rows(500, seed)
+            expected = self.model.predict(pd.DataFrame.from_records(rows, columns=FEATURE_COLUMNS))
+            np.testing.assert_allclose(compiled.predict(rows), expected, rtol=0, atol=1e-9)
+
+    def test_single_rows_match(self):
+        compiled = CompiledRiskModel(self.model)
+        for row in random_rows(20, seed=42):
+            expected = self.model.predict(pd.DataFrame.from_records([row], columns=FEATURE_COLUMNS))
+            self.assertAlmostEqual(compiled.predict([row])[0], expected[0], places=9)
+
+    def test_unsupported_estimators_are_not_compiled(self):
+        from sklearn.linear_model import LinearRegression
+        from sklearn.pipeline import Pipeline
+
+        estimator = Pipeline([("preprocessor", self.model.steps[0][1]), ("regressor", LinearRegression())])
+        with self.assertRaises(NotCompilable):
+            CompiledRiskModel(estimator)
+        self.assertIsNone(compile_model(LinearRegression()))
+
+    def test_uncompiled_model_uses_pandas(self):
+        registry = get_registry()
+        rows = random_rows(5, seed=7)
+        compiled = registry.current()
+        uncompiled = ModelRegistry(registry.model_path, registry.products_path, compile=False).load()
+        self.assertIsNotNone(compiled.compiled)
+        self.assertIsNone(uncompiled.compiled)
+        np.testing.assert_allclose(uncompiled.predict(rows), compiled.predict(rows), rtol=0, atol=1e-9)
+
+
+class PredictionCacheTests(TestCase):
+    def setUp(self):
+        self.row = dict(views.parse_applicant(APPLICANT), BMI=calculate_bmi(70, 165))
+
+    def test_canonical_key_ignores_int_float_spelling(self):
+        self.assertEqual(canonical_key(self.row), canonical_key(dict(self.row, Age=42.0)))
+        self.assertNotEqual(canonical_key(self.row), canonical_key(dict(self.row, Gender="Male")))
+
+    def test_lru_evicts_least_recently_used(self):
+        backend = LocalLRUBackend(max_entries=2)
+        backend.set_many({"a": 1, "b": 2}, "ns")
+        backend.get_many(["a"], "ns")
+        backend.set_many({"c": 3}, "ns")
+        self.assertEqual(backend.get_many(["a", "b", "c"], "ns"), {"a": 1, "c": 3})
+        self.assertEqual(backend.stats()["evictions"], 1)
+
+    def test_ttl_expires_entries(self):
+        backend = LocalLRUBackend(ttl=0.01)
+        backend.set_many({"a": 1}, "ns")
+        time.sleep(0.02)
+        self.assertEqual(backend.get_many(["a"], "ns"), {})
+        self.assertEqual(backend.stats()["expirations"], 1)
+
+    def test_hits_misses_and_invalidation_on_new_model_version(self):
+        cache = PredictionCache(LocalLRUBackend())
+        self.assertIsNone(cache.get(self.row, "v1"))
+        cache.set(self.row, 12.5, "v1")
+        self.assertEqual(cache.get(self.row, "v1"), 12.5)
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+        self.assertIsNone(cache.get(self.row, "v2"))
+        # A late write from the old version is dropped
+        cache.set(self.row, 12.5, "v1")
+        self.assertIsNone(cache.get(self.row, "v2"))
+
+    def test_django_cache_backend(self):
+        cache = PredictionCache(DjangoCacheBackend("default", ttl=60))
+        cache.get(self.row, "v1")
+        cache.set_many([self.row], [33.0], "v1")
+        self.assertEqual(cache.get_many([self.row, dict(self.row, Age=43)], "v1"), {0: 33.0})
+        self.assertIsNone(cache.get(self.row, "v2"))
+
+
+class ModelRegistryTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        source = get_registry()
+        self.model_path = os.path.join(self.tmpdir, "model.pkl")
+        self.products_path = os.path.join(self.tmpdir, "insurance_products.json")
+        shutil.copy(source.model_path, self.model_path)
+        shutil.copy(source.products_path, self.products_path)
+        self.estimator = source.current().estimator
+
+    def write_model(self, protocol):
+        # Same estimator, different bytes -> a new version
+        tmp = self.model_path + ".new"
+        with open(tmp, "wb") as f:
+            pickle.dump(self.estimator, f, protocol=protocol)
+        os.replace(tmp, self.model_path)
+
+    def test_loads_lazily(self):
+        registry = ModelRegistry(self.model_path, self.products_path)
+        self.assertIsNone(registry.describe()["current"])
+        self.assertEqual(registry.current().version, registry.describe()["current"]["version"])
+
+    def test_swap_keeps_history(self):
+        registry = ModelRegistry(self.model_path, self.products_path, check_interval=None)
+        first = registry.current()
+        self.write_model(protocol=2)
+        second = registry.swap()
+        self.assertNotEqual(first.version, second.version)
+        self.assertIs(registry.current(), second)
+        self.assertEqual(registry.describe()["history"][-1]["version"], first.version)
+
+    def test_broken_artifact_never_goes_live(self):
+        registry = ModelRegistry(self.model_path, self.products_path, check_interval=None)
+        first = registry.current()
+        with open(self.model_path, "wb") as f:
+            f.write(b"not a pickle")
+        with self.assertRaises(ModelLoadError):
+            registry.swap()
+        self.assertIs(registry.current(), first)
+
+    def test_file_change_is_picked_up_in_the_background(self):
+        registry = ModelRegistry(self.model_path, self.products_path, check_interval=0)
+        first = registry.current()
+        self.write_model(protocol=2)
+        deadline = time.monotonic() + 10
+        while registry.current() is first and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertNotEqual(registry.current().version, first.version)
+
+
+class SharedArraysTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_generations_round_trip_and_old_ones_are_removed(self):
+        shared = SharedArrays(self.tmpdir, "grid", keep_generations=1)
+        self.assertIsNone(shared.attach())
+        self.assertEqual(shared.publish({"a": np.arange(5)}, {"n": 5}, source="v1"), 1)
+        # Publishing the same source again keeps the generation
+        self.assertEqual(shared.publish({"a": np.arange(5)}, {"n": 5}, source="v1"), 1)
+        first = shared.attach()
+        self.assertIsInstance(first.arrays["a"], np.memmap)
+        self.assertFalse(first.arrays["a"].flags.writeable)
+        self.assertEqual(first.meta, {"n": 5})
+
+        self.assertEqual(shared.publish({"a": np.ones(3)}, {"n": 3}, source="v2"), 2)
+        second = shared.attach()
+        self.assertEqual((second.generation, second.source), (2, "v2"))
+        np.testing.assert_array_equal(second.arrays["a"], np.ones(3))
+        # Still mapped by `first`, but no longer on disk
+        np.testing.assert_array_equal(first.arrays["a"], np.arange(5))
+        self.assertEqual(sorted(e for e in os.listdir(shared.path) if e.startswith("gen-")), ["gen-2"])
+
+    def test_process_memory(self):
+        memory = process_memory()
+        if memory is None:
+            self.skipTest("smaps_rollup is not available")
+        self.assertGreater(memory["rss"], 0)
+        self.assertLessEqual(memory["uss"], memory["pss"])
+        self.assertLessEqual(memory["pss"], memory["rss"])
+
+
+class SharedModelTests(ModelRegistryTests):
+    def setUp(self):
+        super().setUp()
+        shared_dir = os.path.join(self.tmpdir, "shared")
+        settings_override = override_settings(SHARED_ARRAYS={"ENABLED": True, "PATH": shared_dir, "KEEP_GENERATIONS": 1})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_shared_arrays()
+        self.addCleanup(reset_shared_arrays)
+
+    def test_workers_attach_instead_of_unpickling(self):
+        rows = random_rows(200)
+        publisher = ModelRegistry(self.model_path, self.products_path, check_interval=None).current()
+        self.assertEqual(publisher.shared_generation, 1)
+        self.assertIsInstance(publisher.compiled.value, np.memmap)
+
+        reset_shared_arrays()  # as in a separately started worker
+        with mock.patch("riskpredictor.registry.pickle.loads", side_effect=AssertionError("unpickled")):
+            worker = ModelRegistry(self.model_path, self.products_path, check_interval=None).current()
+        self.assertIsNone(worker.estimator)
+        self.assertEqual((worker.version, worker.products), (publisher.version, publisher.products))
+        np.testing.assert_array_equal(worker.compiled.predict(rows), self.estimator.predict(pd.DataFrame(rows)))
+        self.assertEqual(worker.describe()["shared_generation"], 1)
+
+    def test_changed_files_publish_a_new_generation(self):
+        registry = ModelRegistry(self.model_path, self.products_path, check_interval=None)
+        registry.current()
+        self.write_model(protocol=2)
+        self.assertEqual(registry.swap().shared_generation, 2)
+
+        metrics = self.client.get("/metrics").content.decode()
+        self.assertIn('shared_arrays_generation{name="risk-model"} 2', metrics)
+        if process_memory() is not None:
+            self.assertIn(f'process_memory_uss_bytes{{pid="{os.getpid()}"}}', metrics)
+
+
+@override_settings(RISK_PREDICTION_CACHE={"ENABLED": False})
+class RiskGridTests(RiskPredictorTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.grid_path = os.path.join(cls.tmpdir, "grid")
+        axes = ["Age=18:90:3", "Height (cm)=140:200:2", "Weight (kg)=40:120:2", "Cigarettes per day=0:40:2"]
+        call_command("build_risk_grid", "--output", cls.grid_path, "--samples", "4",
+                     *[arg for axis in axes for arg in ("--axis", axis)], stdout=io.StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+        super().tearDownClass()
+
+    def use_grid(self, tolerance):
+        override = override_settings(RISK_GRID={"ENABLED": True, "PATH": self.grid_path, "TOLERANCE": tolerance})
+        override.enable()
+        self.addCleanup(override.disable)
+        reset_risk_grid()
+        self.addCleanup(reset_risk_grid)
+        return get_risk_grid()
+
+    def model_row(self, **values):
+        row = parse_applicant(dict(APPLICANT, **values))
+        row["BMI"] = calculate_bmi(row["Weight (kg)"], row["Height (cm)"])
+        return row
+
+    def test_grid_points_reproduce_the_model(self):
+        grid = self.use_grid(tolerance=float("inf"))
+        loaded = get_registry().current()
+        rows = [self.model_row(age=age, height=height, weight=weight)
+                for age in (18, 54, 90) for height in (140, 200) for weight in (40, 120)]
+        predictions, served = grid.lookup(rows)
+        self.assertTrue(served.all())
+        np.testing.assert_allclose(predictions, loaded.predict_model(rows), atol=1e-4)
+
+    def test_rows_outside_the_grid_fall_back_to_the_model(self):
+        grid = self.use_grid(tolerance=float("inf"))
+        loaded = get_registry().current()
+        inside = self.model_row(age=30.5, height=171, weight=77.7)
+        outside = [self.model_row(age=95), self.model_row(occupation="Astronaut")]
+        predictions = loaded.predict([inside] + outside)
+        self.assertEqual(predictions[0], grid.lookup([inside])[0][0])
+        self.assertEqual(predictions[1:], loaded.predict_model(outside))
+
+        response = self.post_json("predict_risk", dict(APPLICANT, age=30.5, height=171, weight=77.7))
+        self.assertAlmostEqual(response.json()["risk_percentage"], predictions[0])
+        info = self.client.get(reverse("model_info")).json()["grid"]
+        self.assertEqual(info["model_version"], loaded.version)
+
+    def test_tolerance_gates_each_combination(self):
+        grid = self.use_grid(tolerance=0.0)
+        loaded = get_registry().current()
+        row = self.model_row(age=30.5, height=171, weight=77.7)
+        self.assertFalse(grid.lookup([row])[1][0])
+        self.assertEqual(loaded.predict([row]), loaded.predict_model([row]))
+        np.testing.assert_array_equal(grid.servable, grid.errors <= 0.0)
+
+    def test_grid_directory_is_checked_at_most_every_interval(self):
+        self.use_grid(tolerance=float("inf"))
+        loaded = get_registry().current()
+        row = self.model_row(age=30.5, height=171, weight=77.7)
+        with mock.patch("riskpredictor.grid.files_fingerprint") as fingerprint:
+            for _ in range(3):
+                loaded.predict([row])
+        fingerprint.assert_not_called()
+
+    def test_unsampled_grid_serves_nothing(self):
+        path = os.path.join(self.tmpdir, "unsampled")
+        out = io.StringIO()
+        call_command("build_risk_grid", "--output", path, "--samples", "0",
+                     "--axis", "Age=18:90:2", "--axis", "Height (cm)=140:200:2",
+                     "--axis", "Weight (kg)=40:120:2", "--axis", "Cigarettes per day=0:40:2", stdout=out)
+        self.assertIn("No samples", out.getvalue())
+        grid = RiskGrid.open(path, tolerance=float("inf"))
+        self.assertTrue(np.isinf(grid.errors).all())
+        self.assertFalse(grid.servable.any())
+        row = self.model_row(age=30.5, height=171, weight=77.7)
+        self.assertFalse(grid.lookup([row])[1][0])
+
+    def test_grid_of_another_model_version_is_ignored(self):
+        grid = self.use_grid(tolerance=float("inf"))
+        loaded = get_registry().current()
+        row = self.model_row(age=30.5, height=171, weight=77.7)
+        with mock.patch.object(grid, "model_version", "other"):
+            self.assertEqual(loaded.predict([row]), loaded.predict_model([row]))
+
+
+@override_settings(RISK_PREDICTION_CACHE={"ENABLED": True, "BACKEND": "local", "MAX_ENTRIES": 100, "TTL": 60})
+class CachedPredictRiskTests(RiskPredictorTestCase):
+    def setUp(self):
+        views._prediction_cache = None
+        self.addCleanup(setattr, views, "_prediction_cache", None)
+
+    def test_repeat_submissions_hit_the_cache(self):
+        first = self.post_json("predict_risk", APPLICANT).json()
+        second = self.post_json("predict_risk", APPLICANT).json()
+        self.assertEqual(first, second)
+        batch = self.post_json("predict_risk_batch", {"applicants": [APPLICANT, SMOKER]}).json()["results"]
+        self.assertEqual(batch[0]["risk_percentage"], first["risk_percentage"])
+        stats = self.client.get(reverse("cache_stats")).json()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+
+
+class ScoreRiskCommandTests(RiskPredictorTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.input = os.path.join(self.tmpdir, "book.csv")
+        applicants = [APPLICANT, SMOKER, dict(APPLICANT, height=0), dict(APPLICANT, age=None)] * 5
+        pd.DataFrame(applicants).to_csv(self.input, index=False)
+        self.expected = self.post_json("predict_risk_batch", {"applicants": applicants}).json()["results"]
+
+    def score(self, workers):
+        output = os.path.join(self.tmpdir, f"scored_{workers}.csv")
+        out = io.StringIO()
+        call_command("score_risk", self.input, output, "--chunk-size", "3", "--workers", str(workers), stdout=out)
+        self.assertIn("rows/sec", out.getvalue())
+        return pd.read_csv(output)
+
+    def assert_matches_api(self, scored):
+        self.assertEqual(len(scored), len(self.expected))
+        for (_, row), expected in zip(scored.iterrows(), self.expected):
+            if "error" in expected:
+                self.assertEqual(row["error"], expected["error"])
+            else:
+                self.assertTrue(pd.isna(row["error"]))
+                self.assertEqual(row["bmi"], expected["bmi"])
+                self.assertEqual(row["risk_band"], expected["risk_band"])
+                self.assertAlmostEqual(row["risk_percentage"], expected["risk_percentage"])
+
+    def test_in_process_scoring_matches_api(self):
+        self.assert_matches_api(self.score(workers=0))
+
+    def test_process_pool_scoring_matches_api(self):
+        self.assert_matches_api(self.score(workers=2))
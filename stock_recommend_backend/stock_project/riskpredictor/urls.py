@@ -1,6 +1,14 @@
+from django.conf import settings
 from django.urls import path
-from .views import predict_risk
+from .views import batching_stats, cache_stats, model_info, predict_risk, predict_risk_async, predict_risk_batch
+
+# Under ASGI, sync views share one thread, so route the async twin instead
+predict_view = predict_risk_async if settings.SERVER_INTERFACE == 'asgi' else predict_risk
 
 urlpatterns = [
-    path('predict/', predict_risk, name='predict_risk'),
+    path('predict/', predict_view, name='predict_risk'),
+    path('predict/batch/', predict_risk_batch, name='predict_risk_batch'),
+    path('batching/', batching_stats, name='batching_stats'),
+    path('cache/', cache_stats, name='cache_stats'),
+    path('model/', model_info, name='model_info'),
 ]
\ No newline at end of file
@@ -1,20 +1,28 @@
 # riskpredictor/views.py
-import os
-import pickle
-import json
-import pandas as pd
-from django.http import JsonResponse
+import asyncio
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 
-# Load the pre-trained ML model (model.pkl should be in the same directory as views.py)
-MODEL_PATH = os.path.join(os.path.dirname(__file__), 'model.pkl')
-with open(MODEL_PATH, 'rb') as f:
-    model = pickle.load(f)
+from stock_project.codec import DecodeError, JsonResponse, error_response, load_body
+from stock_project.schemas import Field, Schema, SchemaError
+from stock_project.timing import span
 
-# Load the insurance product suggestions from JSON file
-PRODUCTS_PATH = os.path.join(os.path.dirname(__file__), 'insurance_products.json')
-with open(PRODUCTS_PATH, 'r') as f:
-    INSURANCE_PRODUCTS = json.load(f)
+from .batching import MicroBatcher
+from .cache import build_prediction_cache
+from .features import ApplicantError, calculate_bmi_array, get_risk_bands, parse_applicant
+from .grid import get_risk_grid
+from .registry import get_registry
+
+# Upper bound on applicants accepted by a single batch request
+MAX_BATCH_APPLICANTS = 10000
+
+BATCH_SCHEMA = Schema(
+    [Field('applicants', 'list', error='Invalid data format. Expected a list of applicants.',
+           max_items=MAX_BATCH_APPLICANTS, limit_error='Too many applicants. Maximum is {max_items}.')],
+    object_error='Invalid data format. Expected a list of applicants.',
+)
 
 def calculate_bmi(weight, height):
     """
@@ -26,6 +34,106 @@ def calculate_bmi(weight, height):
     bmi = weight / (height_m ** 2)
     return round(bmi, 2)
 
+def predict_rows(rows):
+    """
+    Run the live ML model over parsed applicant rows (BMI included) in one
+    call. Returns the predictions and the LoadedModel that made them.
+    """
+    loaded = get_registry().current()
+    return loaded.predict(rows), loaded
+
+def _predict_batch(rows):
+    # Micro-batcher callback: every row reports the model version that served it
+    predictions, loaded = predict_rows(rows)
+    return [(prediction, loaded) for prediction in predictions]
+
+_prediction_cache = None
+_prediction_cache_lock = threading.Lock()
+
+def get_prediction_cache():
+    """
+    Return the process-wide PredictionCache, or None when RISK_PREDICTION_CACHE
+    is off. Entries are namespaced by model version, so a model swap
+    invalidates them.
+    """
+    global _prediction_cache
+    config = getattr(settings, 'RISK_PREDICTION_CACHE', {})
+    if not config.get('ENABLED', False):
+        return None
+    if _prediction_cache is None:
+        with _prediction_cache_lock:
+            if _prediction_cache is None:
+                _prediction_cache = build_prediction_cache(config)
+    return _prediction_cache
+
+def predict_rows_cached(rows):
+    """
+    `predict_rows` behind the prediction cache: only the rows not already
+    cached go to the model, in a single call.
+    """
+    cache = get_prediction_cache()
+    loaded = get_registry().current()
+    if cache is None:
+        return loaded.predict(rows), loaded
+
+    predictions = cache.get_many(rows, loaded.cache_namespace)
+    missing = [i for i in range(len(rows)) if i not in predictions]
+    if missing:
+        missing_rows = [rows[i] for i in missing]
+        fresh = loaded.predict(missing_rows)
+        cache.set_many(missing_rows, fresh, loaded.cache_namespace)
+        predictions.update(zip(missing, fresh))
+    return [predictions[i] for i in range(len(rows))], loaded
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_batcher():
+    """
+    Return the process-wide MicroBatcher, or None when RISK_MICROBATCH is off.
+    """
+    global _batcher
+    config = getattr(settings, 'RISK_MICROBATCH', {})
+    if not config.get('ENABLED', False):
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    _predict_batch,
+                    max_batch_size=config.get('MAX_BATCH_SIZE', 32),
+                    max_wait_ms=config.get('MAX_WAIT_MS', 2.0),
+                )
+    return _batcher
+
+def _parse_single(request):
+    """
+    Parse a predict_risk request body into a model row and its BMI.
+    """
+    data = load_body(request)
+    row = parse_applicant(data)
+
+    # Calculate BMI
+    bmi = calculate_bmi(row['Weight (kg)'], row['Height (cm)'])
+    row['BMI'] = bmi
+    return row, bmi
+
+def _risk_response(bmi, risk_percentage, loaded):
+    risk_band = get_risk_band(risk_percentage)
+
+    # Fetch the recommended insurance products from the loaded JSON based on the risk band
+    recommended_products = loaded.products.get(risk_band, [])
+
+    # Build and return the JSON response
+    response = {
+        'bmi': bmi,
+        'risk_percentage': risk_percentage,
+        'risk_band': risk_band,
+        'model_version': loaded.version,
+    }
+    with span('render'):
+        return JsonResponse(response, status=200)
+
 def get_risk_band(risk_percentage):
     """
     Determine the risk band based on the predicted risk percentage.
@@ -57,58 +165,146 @@ def predict_risk(request):
     }
     """
     if request.method != 'POST':
-        return JsonResponse({'error': 'Invalid HTTP method. Use POST.'}, status=405)
+        return error_response('Invalid HTTP method. Use POST.', status=405)
 
     try:
-        # Parse incoming JSON payload
-        data = json.loads(request.body.decode('utf-8'))
-        age = data.get('age')
-        gender = data.get('gender')
-        height = data.get('height')
-        weight = data.get('weight')
-        smoking_status = data.get('smoking_status')
-        cigarettes_per_day = data.get('cigarettes_per_day', 0)
-        alcohol_consumption = data.get('alcohol_consumption')
-        physical_activity = data.get('physical_activity')
-        dietary_habits = data.get('dietary_habits')
-        occupation = data.get('occupation')
-
-        # Validate required fields
-        if None in [age, gender, height, weight, smoking_status, alcohol_consumption, physical_activity, dietary_habits, occupation]:
-            return JsonResponse({'error': 'Missing required input fields.'}, status=400)
-
-        # Calculate BMI
-        bmi = calculate_bmi(weight, height)
-
-        # Prepare the input data for the ML model
-        input_data = pd.DataFrame({
-            'Age': [age],
-            'Gender': [gender],
-            'Height (cm)': [height],
-            'Weight (kg)': [weight],
-            'Smoking Status': [smoking_status],
-            'Cigarettes per day': [cigarettes_per_day],
-            'Alcohol Consumption': [alcohol_consumption],
-            'Physical Activity Level': [physical_activity],
-            'Dietary Habits': [dietary_habits],
-            'Occupation': [occupation],
-            'BMI': [bmi]
-        })
-
-        # Predict risk percentage using the ML model
-        risk_percentage = model.predict(input_data)[0]
-        risk_band = get_risk_band(risk_percentage)
-
-        # Fetch the recommended insurance products from the loaded JSON based on the risk band
-        recommended_products = INSURANCE_PRODUCTS.get(risk_band, [])
-
-        # Build and return the JSON response
-        response = {
-            'bmi': bmi,
-            'risk_percentage': risk_percentage,
-            'risk_band': risk_band
-        }
-        return JsonResponse(response, status=200)
+        with span('parse'):
+            row, bmi = _parse_single(request)
+
+        # Repeated submissions are answered from the prediction cache
+        loaded = get_registry().current()
+        cache = get_prediction_cache()
+        with span('cache'):
+            risk_percentage = cache.get(row, loaded.cache_namespace) if cache is not None else None
+
+        if risk_percentage is None:
+            # Predict risk percentage using the ML model, coalesced with
+            # concurrent requests when micro-batching is enabled
+            batcher = get_batcher()
+            with span('model'):
+                if batcher is not None:
+                    risk_percentage, loaded = batcher.submit(row).result()
+                else:
+                    risk_percentage = loaded.predict([row])[0]
+            if cache is not None:
+                with span('cache'):
+                    cache.set(row, risk_percentage, loaded.cache_namespace)
+
+        return _risk_response(bmi, risk_percentage, loaded)
+
+    except Exception as e:
+        return error_response(e)
+
+@csrf_exempt
+async def predict_risk_async(request):
+    """
+    Async twin of `predict_risk`, routed instead of it when the project is
+    served through asgi.py. Django runs sync views on a single thread under
+    ASGI, so concurrent requests could never meet in the micro-batcher; this
+    view awaits the batcher's future on the event loop instead.
+    """
+    if request.method != 'POST':
+        return error_response('Invalid HTTP method. Use POST.', status=405)
+
+    try:
+        with span('parse'):
+            row, bmi = _parse_single(request)
+
+        loaded = get_registry().current()
+        cache = get_prediction_cache()
+        with span('cache'):
+            risk_percentage = cache.get(row, loaded.cache_namespace) if cache is not None else None
+
+        if risk_percentage is None:
+            batcher = get_batcher()
+            with span('model'):
+                if batcher is not None:
+                    risk_percentage, loaded = await asyncio.wrap_future(batcher.submit(row))
+                else:
+                    risk_percentage = (await sync_to_async(loaded.predict, thread_sensitive=False)([row]))[0]
+            if cache is not None:
+                with span('cache'):
+                    cache.set(row, risk_percentage, loaded.cache_namespace)
+
+        return _risk_response(bmi, risk_percentage, loaded)
 
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+        return error_response(e)
+
+def batching_stats(request):
+    """
+    Report the micro-batcher's batch-size and queue-wait histograms.
+    """
+    batcher = get_batcher()
+    if batcher is None:
+        return JsonResponse({'enabled': False})
+    return JsonResponse({'enabled': True, **batcher.stats()})
+
+def model_info(request):
+    """
+    Report the live risk model version, the versions it replaced and the
+    precomputed lookup grid in use, if any.
+    """
+    grid = get_risk_grid()
+    return JsonResponse({**get_registry().describe(), 'grid': grid.describe() if grid is not None else None})
+
+def cache_stats(request):
+    """
+    Report the prediction cache's hit/miss/eviction counters.
+    """
+    cache = get_prediction_cache()
+    if cache is None:
+        return JsonResponse({'enabled': False})
+    return JsonResponse({'enabled': True, **cache.stats()})
+
+@csrf_exempt
+def predict_risk_batch(request):
+    """
+    API Endpoint to predict insurance risk for a whole cohort in one model call.
+
+    Expected JSON Payload:
+    {
+        "applicants": [ {same fields as predict_risk}, ... ]
+    }
+    Returns {"results": [...], "model_version": str} with results aligned
+    with `applicants`; each entry holds bmi/risk_percentage/risk_band or a
+    per-row `error`.
+    """
+    if request.method != 'POST':
+        return error_response('Invalid HTTP method. Use POST.', status=405)
+
+    try:
+        with span('parse'):
+            applicants = BATCH_SCHEMA(load_body(request))['applicants']
+    except (DecodeError, SchemaError) as e:
+        return error_response(e)
+
+    # Validate every row first; only the valid ones go to the model
+    results = [None] * len(applicants)
+    valid_rows, valid_positions = [], []
+    with span('validate'):
+        for i, applicant in enumerate(applicants):
+            try:
+                valid_rows.append(parse_applicant(applicant))
+                valid_positions.append(i)
+            except ApplicantError as e:
+                results[i] = {'error': str(e)}
+
+    loaded = None
+    if valid_rows:
+        with span('validate'):
+            bmis = calculate_bmi_array(
+                [row['Weight (kg)'] for row in valid_rows], [row['Height (cm)'] for row in valid_rows]
+            ).tolist()
+            for row, bmi in zip(valid_rows, bmis):
+                row['BMI'] = bmi
+        with span('model'):
+            risk_percentages, loaded = predict_rows_cached(valid_rows)
+        risk_bands = get_risk_bands(risk_percentages)
+        for i, bmi, risk_percentage, risk_band in zip(valid_positions, bmis, risk_percentages, risk_bands.tolist()):
+            results[i] = {'bmi': bmi, 'risk_percentage': risk_percentage, 'risk_band': risk_band}
+
+    if loaded is None:
+        loaded = get_registry().current()
+    with span('render'):
+        return JsonResponse({'results': results, 'model_version': loaded.version}, status=200)
@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Stock
+
+
+@admin.register(Stock)
+class StockAdmin(admin.ModelAdmin):
+    list_display = ("ticker", "company_name", "volatility", "range_pct", "updated_at")
+    list_filter = ("volatility",)
+    search_fields = ("ticker", "company_name")
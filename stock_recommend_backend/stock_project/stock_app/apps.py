@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class StockAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stock_app'
+
+    def ready(self):
+        # The universe index is left to the first request: building it
+        # queries the database, which must not happen in ready()
+        if getattr(settings, 'STARTUP_WARMUP', False):
+            from .ingest import warm_up
+            warm_up()
@@ -0,0 +1,295 @@
+import codecs
+import csv
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+from django.db import transaction
+
+from .models import Stock
+from .universe import invalidate_universe
+
+CSV_FIELDS = ["ticker", "company_name", "volatility", "range_pct"]
+
+# Rows classified per vectorized pass
+CHUNK_SIZE = 5000
+
+# Serializes ingests (and CSV exports) within this process
+_write_lock = threading.Lock()
+
+
+class IngestError(ValueError):
+    """Raised when the posted feed is not a JSON array of quote objects."""
+
+
+def iter_json_array(stream, read_size=65536):
+    """
+    Yield the elements of a top-level JSON array read from a file-like
+    `stream` without loading the whole document into memory.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = stream.read(read_size)
+        if not chunk:
+            eof = True
+            buf = buf[pos:] + utf8.decode(b"", final=True)
+        else:
+            buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+
+    def next_char():
+        # Skip whitespace and return the next significant character ("" at EOF)
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                return ""
+            fill()
+
+    first = next_char()
+    if first != "[":
+        if not first:
+            raise IngestError("Invalid JSON input.")
+        # Not an array; tell "valid JSON of the wrong shape" apart from garbage
+        while not eof:
+            fill()
+        try:
+            json.loads(buf[pos:])
+        except json.JSONDecodeError:
+            raise IngestError("Invalid JSON input.")
+        raise IngestError("Invalid data format. Expected a list of objects.")
+    pos += 1
+
+    if next_char() == "]":
+        pos += 1
+    else:
+        while True:
+            next_char()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise IngestError("Invalid JSON input.")
+                    fill()
+                    continue
+                # A scalar cut at the buffer edge may still be incomplete
+                if end == len(buf) and not eof:
+                    fill()
+                    continue
+                break
+            pos = end
+            yield value
+
+            sep = next_char()
+            pos += 1
+            if sep == "]":
+                break
+            if sep != ",":
+                raise IngestError("Invalid JSON input.")
+
+    if next_char():
+        raise IngestError("Invalid JSON input.")
+
+
+def _to_numeric(values):
+    """Vectorized equivalent of `views.parse_number` over a list of raw fields."""
+    # Deferred so importing the URLconf does not load pandas
+    import pandas as pd
+
+    series = pd.Series(values, dtype=object).astype("string")
+    series = series.str.replace(",", "", regex=False).str.strip()
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _is_blank(value):
+    # Fields parse_number treated as absent rather than malformed
+    return value is None or (isinstance(value, str) and not value.replace(",", "").strip())
+
+
+def _numeric_field(records, field):
+    """
+    Parse one price field of a chunk. Missing or blank values become NaN
+    (an undefined range); anything else that is not a finite number, such
+    as "abc", a list or an object, rejects the feed.
+    """
+    values = [record.get(field) for record in records]
+    numbers = _to_numeric(values)
+    for i in np.flatnonzero(~np.isfinite(numbers)):
+        if not _is_blank(values[i]):
+            raise IngestError(f"Invalid numeric value for {field}.")
+    return numbers
+
+
+def warm_up():
+    """Load pandas ahead of the first ingest (see STARTUP_WARMUP)."""
+    _to_numeric(["1,000.00"])
+
+
+def range_percent(last_price, high, low):
+    """Intraday range as a percentage of last price; NaN where it is undefined."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = (high - low) / last_price * 100
+    percent[last_price == 0] = np.nan
+    return percent
+
+
+def classify_volatility(percent):
+    """
+    Bucket an array of intraday range percentages: below 1.5% is Low, below
+    3% is Mid, anything else High. Undefined ranges (a missing field or a
+    zero last price) are Low.
+    """
+    labels = np.full(len(percent), "High", dtype=object)
+    labels[percent < 3] = "Mid"
+    labels[np.isnan(percent) | (percent < 1.5)] = "Low"
+    return labels
+
+
+def _classify_chunk(records, placeholder):
+    tickers, companies = [], []
+    for record in records:
+        if not isinstance(record, dict):
+            raise IngestError("Invalid data format. Expected a list of objects.")
+        symbol = record.get("symbol") or ""
+        if not isinstance(symbol, str):
+            raise IngestError("Invalid value for symbol. Expected a string.")
+        symbol = symbol.strip()
+        if not symbol:
+            # Replace dummy with a real company
+            ticker, company_name = placeholder()
+        else:
+            ticker = company_name = symbol
+        tickers.append(ticker)
+        companies.append(company_name)
+
+    percent = range_percent(
+        _numeric_field(records, "lastPrice"),
+        _numeric_field(records, "high"),
+        _numeric_field(records, "low"),
+    )
+    labels = classify_volatility(percent)
+    # Keep the raw range for scoring; blank when it is undefined
+    ranges = ["" if np.isnan(p) else round(float(p), 4) for p in percent]
+    return list(zip(tickers, companies, labels, ranges))
+
+
+def classify_stream(records, placeholder, chunk_size=CHUNK_SIZE):
+    """Yield (ticker, company_name, volatility, range_pct) rows, classifying `chunk_size` quotes at a time."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield from _classify_chunk(chunk, placeholder)
+            chunk = []
+    if chunk:
+        yield from _classify_chunk(chunk, placeholder)
+
+
+def write_rows_atomic(path, rows):
+    """
+    Write (ticker, company_name, volatility, range_pct) rows to `path`
+    through a temp file in the same directory and `os.replace` it into
+    place, so readers only ever see the old file or the complete new one.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".stocks_", suffix=".csv.tmp")
+    try:
+        with os.fdopen(fd, "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(CSV_FIELDS)
+            writer.writerows(rows)
+        # mkstemp creates the file 0600; the export is read by other users
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def upsert_stocks(chunk):
+    """
+    Insert or update (ticker, company_name, volatility, range_pct) rows with one
+    `bulk_create` call. The last row wins when a ticker repeats.
+    """
+    stocks = {}
+    for ticker, company_name, volatility, range_pct in chunk:
+        stocks[ticker] = Stock(
+            ticker=ticker,
+            company_name=company_name,
+            volatility=volatility,
+            range_pct=None if range_pct == "" else range_pct,
+        )
+    Stock.objects.bulk_create(
+        stocks.values(),
+        update_conflicts=True,
+        unique_fields=["ticker"],
+        update_fields=["company_name", "volatility", "range_pct", "updated_at"],
+    )
+    return len(stocks)
+
+
+def export_csv(path):
+    """Write the whole Stock table to `path` as the legacy universe CSV, atomically."""
+    rows = Stock.objects.order_by("id").values_list("ticker", "company_name", "volatility", "range_pct")
+    write_rows_atomic(path, (
+        (ticker, company_name, volatility, "" if range_pct is None else range_pct)
+        for ticker, company_name, volatility, range_pct in rows.iterator(chunk_size=CHUNK_SIZE)
+    ))
+
+
+def ingest_feed(stream, placeholder, mode="overwrite", chunk_size=CHUNK_SIZE, export_path=None):
+    """
+    Classify the quote feed in `stream` and upsert it into the Stock table
+    with chunked `bulk_create(update_conflicts=True)`.
+
+    `mode="upsert"` only touches the tickers in the feed; `mode="overwrite"`
+    also deletes every stock the feed did not mention. The whole ingest runs
+    in one transaction, so a bad feed changes nothing. When `export_path` is
+    given the table is also written there as CSV. Returns the number of
+    distinct tickers ingested.
+    """
+    if mode not in ("overwrite", "upsert"):
+        raise IngestError(f"Unknown ingest mode: {mode}")
+
+    rows = classify_stream(iter_json_array(stream), placeholder, chunk_size)
+    with _write_lock, transaction.atomic():
+        written = set()
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                upsert_stocks(chunk)
+                written.update(ticker for ticker, _, _, _ in chunk)
+                chunk = []
+        if chunk:
+            upsert_stocks(chunk)
+            written.update(ticker for ticker, _, _, _ in chunk)
+
+        if mode == "overwrite":
+            # Decided by ticker, not by timestamps, so clock skew or a
+            # concurrent upsert cannot make us drop rows we did not replace
+            stale = [t for t in Stock.objects.values_list("ticker", flat=True).iterator() if t not in written]
+            for start in range(0, len(stale), chunk_size):
+                Stock.objects.filter(ticker__in=stale[start:start + chunk_size]).delete()
+
+        if export_path:
+            export_csv(export_path)
+
+    invalidate_universe()
+    return len(written)
@@ -0,0 +1,36 @@
+import csv
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from stock_app.ingest import CHUNK_SIZE, upsert_stocks
+from stock_app.universe import get_universe_path, invalidate_universe
+
+
+class Command(BaseCommand):
+    help = "Load the legacy stock universe CSV into the Stock table (upserting by ticker)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="CSV to import (defaults to STOCK_UNIVERSE_CSV).")
+
+    def handle(self, *args, **options):
+        path = options["path"] or get_universe_path()
+
+        count = 0
+        chunk = []
+        with open(path, newline="") as csvfile, transaction.atomic():
+            for row in csv.DictReader(csvfile):
+                try:
+                    range_pct = float(row.get("range_pct") or "")
+                except ValueError:
+                    range_pct = ""
+                volatility = str(row.get("volatility")).strip().title()
+                chunk.append((row["ticker"], row["company_name"], volatility, range_pct))
+                if len(chunk) >= CHUNK_SIZE:
+                    count += upsert_stocks(chunk)
+                    chunk = []
+            if chunk:
+                count += upsert_stocks(chunk)
+        invalidate_universe()
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {count} stocks from {path}"))
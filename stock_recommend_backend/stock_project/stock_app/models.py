@@ -1,3 +1,23 @@
 from django.db import models
 
-# Create your models here.
+
+class Stock(models.Model):
+    """
+    One row of the stock universe, keyed on ticker.
+
+    `volatility` is stored normalized (Low/Mid/High) and indexed so each
+    bucket can be read without scanning the table. `range_pct` is the
+    intraday range (% of last price) from the latest quote, if known.
+    """
+
+    ticker = models.CharField(max_length=32, unique=True)
+    company_name = models.CharField(max_length=255)
+    volatility = models.CharField(max_length=8, db_index=True)
+    range_pct = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.ticker} ({self.volatility})"
@@ -0,0 +1,50 @@
+from stock_project.schemas import Field, Schema, SchemaError
+
+BASKET_SIZE = 5
+
+# Volatility mix of a basket for each age band
+AGE_BAND_DISTRIBUTIONS = {
+    "50+": {"Low": 5},              # 100% low volatility
+    "40s": {"Low": 4, "Mid": 1},    # 80% low, 20% mid
+    "30s": {"Low": 3, "Mid": 2},    # 60% low, 40% mid
+    "20s": {"Mid": 4, "High": 1},   # 80% mid, 20% high (also the default for under 20)
+}
+
+
+class ProfileError(SchemaError):
+    """Raised when an investor profile is missing fields or has bad types."""
+
+
+PROFILE_SCHEMA = Schema(
+    [
+        Field("age", "int", error="Invalid data types provided."),
+        Field("income", "float", error="Invalid data types provided."),
+        Field("investment_period", "int", error="Invalid data types provided."),
+    ],
+    object_error="Invalid profile. Expected an object.",
+    missing_error="Missing required fields: age, income, and investment_period.",
+    error=ProfileError,
+    output="tuple",
+)
+
+
+def parse_profile(data):
+    """
+    Validate an investor profile dict and return (age, income, investment_period).
+    """
+    return PROFILE_SCHEMA(data)
+
+
+def get_age_band(age):
+    if age >= 50:
+        return "50+"
+    elif age >= 40:
+        return "40s"
+    elif age >= 30:
+        return "30s"
+    return "20s"
+
+
+def get_distribution(age):
+    """Return the desired {volatility: count} mix for an investor's age."""
+    return AGE_BAND_DISTRIBUTIONS[get_age_band(age)]
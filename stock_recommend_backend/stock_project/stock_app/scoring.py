@@ -0,0 +1,122 @@
+import math
+import zlib
+
+import numpy as np
+
+from .recommend import BASKET_SIZE, ProfileError, get_distribution, parse_profile
+
+# Intraday range (% of last price) spanned by each volatility bucket
+BUCKET_RANGES = {"Low": (0.0, 1.5), "Mid": (1.5, 3.0), "High": (3.0, 6.0)}
+
+# Horizon (years) and income at which risk appetite saturates
+MAX_HORIZON_YEARS = 20
+INCOME_FLOOR, INCOME_CEILING = 10_000, 1_000_000
+
+# Weight of the tiebreak offset; far below any meaningful score gap
+TIEBREAK_WEIGHT = 1e-6
+
+
+def profile_seed(age, income, investment_period):
+    """A seed that is stable across processes and differs between profiles."""
+    return zlib.crc32(f"{age}:{float(income)!r}:{investment_period}".encode())
+
+
+def risk_appetite(income, investment_period):
+    """
+    Map income and horizon to a risk appetite in [0, 1].
+
+    Longer horizons count for more than income: 60% comes from the horizon
+    (linear up to MAX_HORIZON_YEARS) and 40% from income on a log scale
+    between INCOME_FLOOR and INCOME_CEILING.
+    """
+    horizon = min(max(investment_period, 0), MAX_HORIZON_YEARS) / MAX_HORIZON_YEARS
+    income = min(max(income, INCOME_FLOOR), INCOME_CEILING)
+    wealth = math.log(income / INCOME_FLOOR) / math.log(INCOME_CEILING / INCOME_FLOOR)
+    return 0.6 * horizon + 0.4 * wealth
+
+
+def score_bucket(range_pct, volatility, appetite):
+    """
+    Score every stock in a bucket for a profile.
+
+    The profile's appetite picks a target point inside the bucket's range
+    (low appetite -> calm end, high appetite -> lively end) and each stock
+    scores by closeness to it. Scores fall in [0, 1].
+    """
+    low, high = BUCKET_RANGES.get(volatility, (0.0, 6.0))
+    width = high - low
+    target = low + appetite * width
+    return 1.0 - np.minimum(np.abs(range_pct - target) / width, 1.0)
+
+
+def top_k(scores, k):
+    """
+    Return the positions of the `k` highest scores, best first.
+
+    Uses argpartition so only the k winners are sorted, which keeps large
+    buckets at O(n) instead of O(n log n).
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def rank_stocks(universe, age, income, investment_period):
+    """
+    Return the top-scoring stocks for a profile as response dicts.
+
+    The age band fixes how many picks come from each volatility bucket;
+    income and horizon decide which stocks inside a bucket fit best.
+    Stocks that score alike (every stock ingested without a range_pct gets
+    its bucket's default) are ordered by a random offset seeded from the
+    profile, so a given profile always gets the same picks while other
+    profiles in the same age band get different ones.
+    """
+    distribution = get_distribution(age)
+    appetite = risk_appetite(income, investment_period)
+    rng = np.random.default_rng(profile_seed(age, income, investment_period))
+
+    recommendations = []
+    for vol, count in distribution.items():
+        range_pct = universe.range_pct.get(vol)
+        if range_pct is None or not len(range_pct):
+            continue
+        scores = score_bucket(range_pct, vol, appetite)
+        scores = scores + TIEBREAK_WEIGHT * rng.random(len(scores))
+        recommendations.extend(universe.records(vol, top_k(scores, count).tolist()))
+    return recommendations
+
+
+def recommend_batch(profiles, universe, padding, seed=None):
+    """
+    Recommend a basket for every profile in `profiles`.
+
+    Each profile is ranked by `rank_stocks`, so it gets the picks the single
+    endpoint gives it; repeated profiles are ranked once. Baskets short of
+    BASKET_SIZE are topped up from `padding`, a sequence of (ticker,
+    company_name) pairs tagged as Mid volatility, drawn with `seed`.
+    Returns a list aligned with `profiles` holding either
+    {"recommended_stocks": [...]} or {"error": "..."} for invalid entries.
+    """
+    rng = np.random.default_rng(seed)
+    ranked = {}
+    results = []
+    for data in profiles:
+        try:
+            profile = parse_profile(data)
+        except ProfileError as e:
+            results.append({"error": str(e)})
+            continue
+        if profile not in ranked:
+            ranked[profile] = rank_stocks(universe, *profile)
+        basket = ranked[profile][:BASKET_SIZE]
+        for i in rng.integers(0, len(padding), size=BASKET_SIZE - len(basket)).tolist():
+            ticker, company_name = padding[i]
+            basket.append({"ticker": ticker, "company_name": company_name, "volatility": "Mid"})
+        results.append({"recommended_stocks": basket})
+    return results
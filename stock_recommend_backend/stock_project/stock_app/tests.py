@@ -1,3 +1,294 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+import numpy as np
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import views
+from .ingest import iter_json_array
+from .models import Stock
+from .recommend import ProfileError, parse_profile
+from .scoring import rank_stocks, risk_appetite, top_k
+from .universe import VOLATILITY_BUCKETS, UniverseIndex, get_universe, invalidate_universe
+
+UNIVERSE_CSV = """ticker,company_name,volatility
+AAA,Alpha,Low
+BBB,Beta, low
+CCC,Gamma,Low
+DDD,Delta,Mid
+EEE,Epsilon,mid
+FFF,Phi,High
+"""
+
+
+class StockUniverseTestCase(TestCase):
+    """Base class that points the stock universe at a throwaway CSV."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, "stocks_output.csv")
+        with open(self.csv_path, "w") as f:
+            f.write(UNIVERSE_CSV)
+        override = override_settings(STOCK_UNIVERSE_CSV=self.csv_path, STOCK_UNIVERSE_REFRESH_SECONDS=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.addCleanup(invalidate_universe)
+        invalidate_universe()
+
+    def post_json(self, name, payload):
+        return self.client.post(reverse(name), data=json.dumps(payload), content_type="application/json")
+
+
+class UniverseIndexTests(StockUniverseTestCase):
+    def test_buckets_are_normalized(self):
+        universe = get_universe()
+        self.assertEqual(universe.count("Low"), 3)
+        self.assertEqual(universe.count("Mid"), 2)
+        self.assertEqual(universe.count("High"), 1)
+
+    def test_index_is_reused_until_file_changes(self):
+        first = get_universe()
+        self.assertIs(get_universe(), first)
+
+        with open(self.csv_path, "a") as f:
+            f.write("GGG,Gamma Two,High\n")
+        second = get_universe()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.count("High"), 2)
+
+
+class RecommendStocksTests(StockUniverseTestCase):
+    def test_recommend_returns_five_stocks(self):
+        response = self.post_json("recommend_stocks", {"age": 45, "income": 50000, "investment_period": 5})
+        self.assertEqual(response.status_code, 200)
+        stocks = response.json()["recommended_stocks"]
+        self.assertEqual(len(stocks), 5)
+        self.assertEqual(set(stocks[0]), {"ticker", "company_name", "volatility"})
+        self.assertEqual([s["volatility"] for s in stocks].count("Low"), 3)
+
+    def test_recommend_missing_fields(self):
+        response = self.post_json("recommend_stocks", {"age": 45})
+        self.assertEqual(response.status_code, 400)
+
+    def test_async_twin_offloads_the_view(self):
+        request = RequestFactory().post(
+            "/api/recommend/", data=json.dumps({"age": 45, "income": 50000, "investment_period": 5}),
+            content_type="application/json",
+        )
+        response = async_to_sync(views.recommend_stocks_async)(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["recommended_stocks"]), 5)
+
+    @override_settings(REQUEST_TIMING={"ENABLED": True, "SAMPLE_RATE": 1.0, "SERVER_TIMING_HEADER": True})
+    def test_server_timing_breaks_down_the_request(self):
+        response = self.post_json("recommend_stocks", {"age": 45, "income": 50000, "investment_period": 5})
+        phases = [entry.split(";")[0] for entry in response["Server-Timing"].split(", ")]
+        self.assertEqual(phases, ["parse", "universe", "universe_reload", "rank", "render", "total"])
+
+
+class JsonToCsvTests(StockUniverseTestCase):
+    QUOTES = [
+        {"symbol": "AAA", "lastPrice": "1,000.00", "high": "1,010", "low": "1,000"},
+        {"symbol": "XYZ", "lastPrice": "100", "high": "102", "low": "100"},
+        {"symbol": "QQQ", "lastPrice": "100", "high": "110", "low": "100"},
+        {"symbol": "ZER", "lastPrice": "0", "high": "1", "low": "0"},
+    ]
+
+    def read_rows(self):
+        with open(self.csv_path) as f:
+            return {row["ticker"]: row for row in csv.DictReader(f)}
+
+    def test_overwrite_classifies_quotes(self):
+        response = self.post_json("json_to_csv", self.QUOTES)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rows"], 4)
+        rows = self.read_rows()
+        self.assertEqual(set(rows), {"AAA", "XYZ", "QQQ", "ZER"})
+        self.assertEqual(rows["AAA"]["volatility"], "Low")
+        self.assertEqual(rows["XYZ"]["volatility"], "Mid")
+        self.assertEqual(rows["QQQ"]["volatility"], "High")
+        self.assertEqual(rows["ZER"]["volatility"], "Low")
+        self.assertEqual(float(rows["XYZ"]["range_pct"]), 2.0)
+        self.assertEqual(rows["ZER"]["range_pct"], "")
+        self.assertEqual(os.stat(self.csv_path).st_mode & 0o777, 0o644)
+
+    def test_upsert_merges_by_ticker(self):
+        call_command("import_stock_universe", stdout=io.StringIO())
+        self.assertEqual(Stock.objects.count(), 6)
+        response = self.client.post(
+            reverse("json_to_csv") + "?mode=upsert",
+            data=json.dumps(self.QUOTES[1:3]),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rows"], 2)
+        rows = self.read_rows()
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows["FFF"]["volatility"], "High")
+        self.assertEqual(rows["QQQ"]["volatility"], "High")
+        self.assertEqual(get_universe().count("High"), 2)
+
+    def test_overwrite_replaces_stock_table(self):
+        self.post_json("json_to_csv", self.QUOTES)
+        self.post_json("json_to_csv", self.QUOTES[:2])
+        self.assertEqual(sorted(Stock.objects.values_list("ticker", flat=True)), ["AAA", "XYZ"])
+        self.assertEqual(Stock.objects.get(ticker="XYZ").range_pct, 2.0)
+        self.assertEqual(len(get_universe()), 2)
+
+    def test_overwrite_deletes_by_ticker_not_timestamp(self):
+        Stock.objects.create(ticker="OLD", company_name="Old", volatility="Low")
+        # A row stamped ahead of this clock (skew between writers) is still replaced
+        Stock.objects.update(updated_at=timezone.now() + datetime.timedelta(hours=1))
+        response = self.post_json("json_to_csv", self.QUOTES[:2])
+        self.assertEqual(response.json()["rows"], 2)
+        self.assertEqual(sorted(Stock.objects.values_list("ticker", flat=True)), ["AAA", "XYZ"])
+
+    @override_settings(STOCK_UNIVERSE_EXPORT_CSV=False)
+    def test_csv_export_is_optional(self):
+        response = self.post_json("json_to_csv", self.QUOTES)
+        self.assertEqual(response.json()["message"], "Stocks saved successfully.")
+        self.assertEqual(Stock.objects.count(), 4)
+        with open(self.csv_path) as f:
+            self.assertEqual(f.read(), UNIVERSE_CSV)
+
+    def test_invalid_payloads_leave_csv_untouched(self):
+        response = self.client.post(reverse("json_to_csv"), data="[{\"symbol\": ", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = self.post_json("json_to_csv", {"symbol": "AAA"})
+        self.assertEqual(response.json()["error"], "Invalid data format. Expected a list of objects.")
+        with open(self.csv_path) as f:
+            self.assertEqual(f.read(), UNIVERSE_CSV)
+        self.assertFalse(Stock.objects.exists())
+
+    def test_malformed_fields_reject_the_feed(self):
+        cases = [
+            ({"symbol": 123}, "Invalid value for symbol. Expected a string."),
+            ({"symbol": ["AAA"]}, "Invalid value for symbol. Expected a string."),
+            ({"lastPrice": "abc"}, "Invalid numeric value for lastPrice."),
+            ({"high": [101]}, "Invalid numeric value for high."),
+            ({"low": {"value": 99}}, "Invalid numeric value for low."),
+            ({"low": True}, "Invalid numeric value for low."),
+            ({"high": "inf"}, "Invalid numeric value for high."),
+        ]
+        for override, message in cases:
+            quotes = self.QUOTES[:1] + [dict(self.QUOTES[1], **override)]
+            response = self.post_json("json_to_csv", quotes)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["error"], message)
+        self.assertFalse(Stock.objects.exists())
+        # Missing or blank prices are still an undefined (Low) range
+        response = self.post_json("json_to_csv", [{"symbol": "NUL", "lastPrice": None, "high": " ", "low": 5}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.read_rows()["NUL"]["volatility"], "Low")
+
+
+class IterJsonArrayTests(TestCase):
+    def test_small_reads_yield_every_element(self):
+        items = [{"symbol": f"S{i}", "lastPrice": i} for i in range(50)] + [12345, "tail"]
+        stream = io.BytesIO(json.dumps(items).encode())
+        self.assertEqual(list(iter_json_array(stream, read_size=7)), items)
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array(io.BytesIO(b" [ ] "))), [])
+
+
+class RecommendBatchTests(StockUniverseTestCase):
+    PROFILES = [
+        {"age": 55, "income": 80000, "investment_period": 10},
+        {"age": 25, "income": 30000, "investment_period": 3},
+        {"age": 35},
+        {"age": 45, "income": 60000, "investment_period": 5},
+    ]
+
+    def test_batch_returns_per_profile_results(self):
+        response = self.post_json("recommend_stocks_batch", {"profiles": self.PROFILES, "seed": 7})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(len(results), 4)
+        self.assertIn("error", results[2])
+        for i in (0, 1, 3):
+            self.assertEqual(len(results[i]["recommended_stocks"]), 5)
+        self.assertEqual({s["volatility"] for s in results[1]["recommended_stocks"]}, {"Mid", "High"})
+
+    def test_seed_is_reproducible(self):
+        payload = {"profiles": self.PROFILES * 10, "seed": 123}
+        first = self.post_json("recommend_stocks_batch", payload).json()
+        second = self.post_json("recommend_stocks_batch", payload).json()
+        self.assertEqual(first, second)
+
+    def test_batch_ranks_like_the_single_endpoint(self):
+        results = self.post_json("recommend_stocks_batch", {"profiles": self.PROFILES}).json()["results"]
+        for i in (0, 1, 3):
+            ranked = rank_stocks(get_universe(), *parse_profile(self.PROFILES[i]))
+            self.assertEqual(results[i]["recommended_stocks"][:len(ranked)], ranked)
+
+    def test_rejects_non_list_profiles(self):
+        response = self.post_json("recommend_stocks_batch", {"profiles": {"age": 30}})
+        self.assertEqual(response.status_code, 400)
+
+    def test_envelope_errors(self):
+        cases = {
+            "Invalid data format. Expected a list of profiles.": [self.PROFILES],
+            "Invalid seed. Expected a non-negative integer.": {"profiles": self.PROFILES, "seed": True},
+            f"Too many profiles. Maximum is {views.MAX_BATCH_PROFILES}.":
+                {"profiles": self.PROFILES * views.MAX_BATCH_PROFILES},
+        }
+        for message, payload in cases.items():
+            response = self.post_json("recommend_stocks_batch", payload)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"error": message})
+
+    def test_profile_schema_coerces_like_before(self):
+        self.assertEqual(parse_profile({"age": "45", "income": 5e4, "investment_period": 5.9}), (45, 50000.0, 5))
+        with self.assertRaisesMessage(ProfileError, "Invalid data types provided."):
+            parse_profile({"age": "old", "income": 1, "investment_period": 1})
+
+
+class ScoringTests(TestCase):
+    def test_top_k_orders_best_first(self):
+        scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+        self.assertEqual(top_k(scores, 3).tolist(), [1, 3, 2])
+        self.assertEqual(top_k(scores, 10).tolist(), [1, 3, 2, 4, 0])
+
+    def test_risk_appetite_grows_with_income_and_horizon(self):
+        self.assertEqual(risk_appetite(0, 0), 0.0)
+        self.assertEqual(risk_appetite(10**7, 50), 1.0)
+        self.assertLess(risk_appetite(30000, 2), risk_appetite(30000, 15))
+        self.assertLess(risk_appetite(30000, 5), risk_appetite(300000, 5))
+
+    def test_rank_stocks_prefers_calmer_stocks_for_short_horizons(self):
+        universe = UniverseIndex(
+            {"Low": (("CALM", "Calm"), ("MILD", "Mild"), ("EDGY", "Edgy"))},
+            None,
+            {"Low": np.array([0.1, 0.7, 1.4])},
+        )
+        cautious = rank_stocks(universe, 60, 10000, 0)
+        self.assertEqual([s["ticker"] for s in cautious], ["CALM", "MILD", "EDGY"])
+        bold = rank_stocks(universe, 60, 10**6, 20)
+        self.assertEqual(bold[0]["ticker"], "EDGY")
+
+    def test_tied_stocks_are_ordered_per_profile(self):
+        # No range_pct: every stock in a bucket scores the same
+        universe = UniverseIndex.from_rows(
+            (vol, f"{vol}{i}", f"{vol} {i}", None) for vol in VOLATILITY_BUCKETS for i in range(40)
+        )
+
+        def tickers(*profile):
+            return [s["ticker"] for s in rank_stocks(universe, *profile)]
+
+        self.assertEqual(tickers(30, 50000, 5), tickers(30, 50000, 5))
+        # Same age band, so the same bucket mix, but different picks
+        self.assertNotEqual(tickers(30, 50000, 5), tickers(30, 60000, 5))
+        self.assertNotEqual(tickers(30, 50000, 5), tickers(35, 50000, 5))
+        self.assertEqual(len({tuple(tickers(30, income, 5)) for income in range(40000, 50000, 1000)}), 10)
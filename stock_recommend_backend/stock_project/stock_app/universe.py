@@ -0,0 +1,159 @@
+import csv
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from stock_project.timing import span
+
+from .models import Stock
+
+VOLATILITY_BUCKETS = ("Low", "Mid", "High")
+
+# Intraday range (% of last price) assumed for stocks ingested without one
+DEFAULT_RANGE_PCT = {"Low": 0.75, "Mid": 2.25, "High": 4.5}
+
+
+def get_universe_path():
+    """Return the path of the legacy stock universe CSV."""
+    return str(getattr(
+        settings, "STOCK_UNIVERSE_CSV",
+        os.path.join(settings.BASE_DIR, "stock_project", "data", "stocks_output.csv"),
+    ))
+
+
+class UniverseIndex:
+    """
+    Immutable snapshot of the stock universe, bucketed by volatility.
+
+    Each bucket holds a tuple of (ticker, company_name) pairs with the
+    volatility label already normalized, so sampling never touches the CSV.
+    `range_pct` holds a parallel float array per bucket used for scoring.
+    """
+
+    def __init__(self, buckets, signature, range_pct=None):
+        self.buckets = buckets
+        self.signature = signature
+        if range_pct is None:
+            range_pct = {
+                vol: np.full(len(rows), DEFAULT_RANGE_PCT.get(vol, np.nan))
+                for vol, rows in buckets.items()
+            }
+        self.range_pct = range_pct
+
+    @classmethod
+    def from_rows(cls, rows, signature=None):
+        """Build an index from (volatility, ticker, company_name, range_pct) tuples."""
+        buckets = {}
+        range_pct = {}
+        for vol, ticker, company_name, pct in rows:
+            buckets.setdefault(vol, []).append((ticker, company_name))
+            range_pct.setdefault(vol, []).append(np.nan if pct is None else pct)
+
+        arrays = {}
+        for vol, values in range_pct.items():
+            values = np.array(values, dtype=float)
+            values[np.isnan(values)] = DEFAULT_RANGE_PCT.get(vol, np.nan)
+            arrays[vol] = values
+        return cls({vol: tuple(rows) for vol, rows in buckets.items()}, signature, arrays)
+
+    @classmethod
+    def from_csv(cls, path, signature=None):
+        def rows():
+            with open(path, newline="") as csvfile:
+                for row in csv.DictReader(csvfile):
+                    # Same normalization recommend_stocks used to do with pandas
+                    vol = str(row.get("volatility")).strip().title()
+                    try:
+                        pct = float(row.get("range_pct") or "nan")
+                    except ValueError:
+                        pct = None
+                    yield vol, row.get("ticker"), row.get("company_name"), pct
+        return cls.from_rows(rows(), signature)
+
+    @classmethod
+    def from_db(cls, signature=None):
+        # One indexed read per bucket, in insertion order
+        def rows():
+            for vol in VOLATILITY_BUCKETS:
+                stocks = Stock.objects.filter(volatility=vol).order_by("id")
+                for ticker, company_name, pct in stocks.values_list("ticker", "company_name", "range_pct"):
+                    yield vol, ticker, company_name, pct
+        return cls.from_rows(rows(), signature)
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.buckets.values())
+
+    def count(self, volatility):
+        return len(self.buckets.get(volatility, ()))
+
+    def records(self, volatility, indices):
+        """Return response dicts for the given row positions of a bucket."""
+        rows = self.buckets.get(volatility, ())
+        return [
+            {"ticker": rows[i][0], "company_name": rows[i][1], "volatility": volatility}
+            for i in indices
+        ]
+
+
+_index = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _current_signature():
+    """
+    Identify the current universe contents cheaply. The Stock table wins
+    when it has rows; otherwise the legacy CSV is used.
+    """
+    stats = Stock.objects.aggregate(count=Count("id"), latest=Max("updated_at"))
+    if stats["count"]:
+        return ("db", stats["count"], stats["latest"])
+    path = get_universe_path()
+    return ("csv", path) + _file_signature(path)
+
+
+def get_universe():
+    """
+    Return the process-wide UniverseIndex, rebuilding it only when the
+    Stock table (or, while that is empty, the CSV) has changed. The check
+    runs at most once per STOCK_UNIVERSE_REFRESH_SECONDS. The new index is
+    built before the reference is swapped, so concurrent readers always see
+    a complete snapshot.
+    """
+    global _index, _checked_at
+    index = _index
+    refresh = getattr(settings, "STOCK_UNIVERSE_REFRESH_SECONDS", 1.0)
+    if index is not None and time.monotonic() - _checked_at < refresh:
+        return index
+
+    signature = _current_signature()
+    if index is not None and index.signature == signature:
+        _checked_at = time.monotonic()
+        return index
+
+    with _lock:
+        # Another thread may have finished the rebuild while we waited
+        if _index is None or _index.signature != signature:
+            with span("universe_reload"):
+                if signature[0] == "db":
+                    _index = UniverseIndex.from_db(signature)
+                else:
+                    _index = UniverseIndex.from_csv(signature[1], signature)
+        _checked_at = time.monotonic()
+        return _index
+
+
+def invalidate_universe():
+    """Drop the cached index so the next request reloads it."""
+    global _index
+    with _lock:
+        _index = None
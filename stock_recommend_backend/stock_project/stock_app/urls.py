@@ -1,7 +1,12 @@
+from django.conf import settings
 from django.urls import path
-from .views import recommend_stocks, json_to_csv
+from . import views
+
+# Under ASGI, sync views share one thread, so route the async twins instead
+ASGI = settings.SERVER_INTERFACE == 'asgi'
 
 urlpatterns = [
-    path('recommend/', recommend_stocks, name='recommend_stocks'),
-     path('convert_json_to_csv/', json_to_csv, name='json_to_csv'),
+    path('recommend/', views.recommend_stocks_async if ASGI else views.recommend_stocks, name='recommend_stocks'),
+    path('recommend/batch/', views.recommend_stocks_batch_async if ASGI else views.recommend_stocks_batch, name='recommend_stocks_batch'),
+     path('convert_json_to_csv/', views.json_to_csv_async if ASGI else views.json_to_csv, name='json_to_csv'),
 ]
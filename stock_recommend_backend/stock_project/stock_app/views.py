@@ -1,15 +1,19 @@
-import os
-import json
-import csv
 import random
 import string
 
-import pandas as pd
-
 from django.conf import settings
-from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
+from stock_project.codec import DecodeError, JsonResponse, error_response, load_body
+from stock_project.executors import offload_view
+from stock_project.schemas import Field, Schema, SchemaError
+from stock_project.timing import span
+
+from .ingest import IngestError, ingest_feed
+from .recommend import ProfileError, parse_profile
+from .scoring import rank_stocks, recommend_batch
+from .universe import get_universe, get_universe_path
+
 # ✅ Real company names for replacing dummy data
 REAL_COMPANIES = [
     ("AAPL", "Apple Inc."), ("GOOGL", "Alphabet Inc."), ("MSFT", "Microsoft Corp."),
@@ -22,6 +26,20 @@ REAL_COMPANIES = [
     ("IBM", "IBM Corp."), ("BA", "Boeing Co."), ("NKE", "Nike Inc."),
 ]
 
+INGEST_MODES = ("overwrite", "upsert")
+
+# Upper bound on profiles accepted by a single batch recommendation request
+MAX_BATCH_PROFILES = 1000
+
+BATCH_SCHEMA = Schema(
+    [
+        Field("profiles", "list", error="Invalid data format. Expected a list of profiles.",
+              max_items=MAX_BATCH_PROFILES, limit_error="Too many profiles. Maximum is {max_items}."),
+        Field("seed", "count", required=False, error="Invalid seed. Expected a non-negative integer."),
+    ],
+    object_error="Invalid data format. Expected a list of profiles.",
+)
+
 def parse_number(s):
     """Convert a string to a float after removing commas and spaces."""
     if not s:
@@ -39,67 +57,34 @@ def get_random_real_company():
 @csrf_exempt
 def json_to_csv(request):
     """
-    POST API endpoint that accepts JSON data, converts it to CSV format,
-    and saves it in the `data/` folder in the Django backend.
+    POST API endpoint that accepts JSON quote data, classifies each quote's
+    volatility and stores the result in the Stock table.
+
+    The body is parsed incrementally and classified in vectorized chunks.
+    Pass `?mode=upsert` to merge the quotes into the existing universe by
+    ticker instead of replacing it. When STOCK_UNIVERSE_EXPORT_CSV is on the
+    table is also exported to the `data/` CSV, swapped in atomically.
     """
     if request.method != "POST":
-        return JsonResponse({"error": "Only POST method allowed."}, status=405)
+        return error_response("Only POST method allowed.", status=405)
+
+    mode = request.GET.get("mode", "overwrite")
+    if mode not in INGEST_MODES:
+        return error_response(f"Invalid mode. Expected one of: {', '.join(INGEST_MODES)}.")
+
+    csv_file_path = get_universe_path() if getattr(settings, "STOCK_UNIVERSE_EXPORT_CSV", True) else None
 
     try:
-        data = json.loads(request.body)
-    except json.JSONDecodeError:
-        return JsonResponse({"error": "Invalid JSON input."}, status=400)
-
-    if not isinstance(data, list):
-        return JsonResponse({"error": "Invalid data format. Expected a list of objects."}, status=400)
-
-    output_rows = []
-
-    for record in data:
-        symbol = record.get("symbol", "").strip()
-        if not symbol:
-            # Replace dummy with a real company
-            ticker, company_name = get_random_real_company()
-        else:
-            ticker = symbol
-            company_name = symbol  # Use the provided symbol as company name
-
-        last_price = parse_number(record.get("lastPrice", ""))
-        high = parse_number(record.get("high", ""))
-        low = parse_number(record.get("low", ""))
-
-        if last_price is None or high is None or low is None or last_price == 0:
-            volatility = "Low"
-        else:
-            diff = high - low
-            percent = (diff / last_price) * 100
-            if percent < 1.5:
-                volatility = "Low"
-            elif percent < 3:
-                volatility = "Mid"
-            else:
-                volatility = "High"
-
-        output_rows.append({
-            "ticker": ticker,
-            "company_name": company_name,
-            "volatility": volatility
-        })
-
-    # Define CSV file path inside `data/` folder
-    csv_dir = os.path.join(settings.BASE_DIR, "stock_project", "data")
-    os.makedirs(csv_dir, exist_ok=True)  # Ensure directory exists
-    csv_file_path = os.path.join(csv_dir, "stocks_output.csv")
-
-    # Write to CSV file
-    with open(csv_file_path, "w", newline="") as csvfile:
-        fieldnames = ["ticker", "company_name", "volatility"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in output_rows:
-            writer.writerow(row)
-
-    return JsonResponse({"message": f"CSV file saved successfully at {csv_file_path}"})
+        with span("ingest"):
+            rows = ingest_feed(request, get_random_real_company, mode=mode, export_path=csv_file_path)
+    except IngestError as e:
+        return error_response(e)
+
+    if csv_file_path:
+        message = f"CSV file saved successfully at {csv_file_path}"
+    else:
+        message = "Stocks saved successfully."
+    return JsonResponse({"message": message, "mode": mode, "rows": rows})
 
 @csrf_exempt
 def recommend_stocks(request):
@@ -109,67 +94,29 @@ def recommend_stocks(request):
       - income
       - investment_period
     and returns a JSON response with the top 5 recommended stocks.
+    Stocks are ranked by `scoring.rank_stocks` rather than picked at random.
     """
     if request.method != "POST":
-        return JsonResponse({"error": "Only POST method allowed."}, status=405)
-    
-    try:
-        data = json.loads(request.body)
-    except json.JSONDecodeError:
-        return JsonResponse({"error": "Invalid JSON input."}, status=400)
+        return error_response("Only POST method allowed.", status=405)
     
     # Retrieve and validate inputs
-    age = data.get("age")
-    income = data.get("income")
-    investment_period = data.get("investment_period")
-    
-    if age is None or income is None or investment_period is None:
-        return JsonResponse({"error": "Missing required fields: age, income, and investment_period."}, status=400)
-    
     try:
-        age = int(age)
-        income = float(income)
-        investment_period = int(investment_period)
-    except (ValueError, TypeError):
-        return JsonResponse({"error": "Invalid data types provided."}, status=400)
+        with span("parse"):
+            age, income, investment_period = parse_profile(load_body(request))
+    except (DecodeError, ProfileError) as e:
+        return error_response(e)
     
-    # Determine the desired distribution based on age:
-    if age >= 50:
-        distribution = {"Low": 5}  # 100% low volatility
-    elif 40 <= age < 50:
-        distribution = {"Low": 4, "Mid": 1}  # 80% low, 20% mid
-    elif 30 <= age < 40:
-        distribution = {"Low": 3, "Mid": 2}  # 50% low, 50% mid
-    elif 20 <= age < 30:
-        distribution = {"Mid": 4, "High": 1}  # 80% mid, 20% high
-    else:
-        distribution = {"Mid": 4, "High": 1}  # Default to 20s logic
-
-    # Correct CSV file path based on actual location
-    csv_path = os.path.join(settings.BASE_DIR, "stock_project", "data", "stocks_output.csv")
-
+    # Serve from the in-memory universe index; it reloads only when the CSV changes
     try:
-        df = pd.read_csv(csv_path)
+        with span("universe"):
+            universe = get_universe()
     except Exception as e:
-        return JsonResponse({"error": f"Error loading CSV file: {str(e)}"}, status=500)
-    
-    # Normalize the volatility column for consistency
-    df["volatility"] = df["volatility"].astype(str).str.strip().str.title()
-    
-    recommendations = []
-
-    # Fetch required stocks based on distribution
-    for vol, count in distribution.items():
-        df_cat = df[df["volatility"] == vol]
-        available = len(df_cat)
-        if available == 0:
-            continue
-        if available >= count:
-            sampled = df_cat.sample(n=count)
-        else:
-            sampled = df_cat
-        recommendations.extend(sampled.to_dict(orient="records"))
-    
+        return error_response(f"Error loading CSV file: {e}", status=500)
+
+    # Rank each volatility bucket for this profile and keep the top picks
+    with span("rank"):
+        recommendations = rank_stocks(universe, age, income, investment_period)
+
     # Fill up to 5 if needed, replacing dummy data with real companies
     while len(recommendations) < 5:
         ticker, company_name = get_random_real_company()
@@ -177,4 +124,51 @@ def recommend_stocks(request):
 
     recommendations = recommendations[:5]
 
-    return JsonResponse({"recommended_stocks": recommendations}, safe=False)
+    with span("render"):
+        return JsonResponse({"recommended_stocks": recommendations}, safe=False)
+
+@csrf_exempt
+def recommend_stocks_batch(request):
+    """
+    POST endpoint that recommends stocks for many investor profiles at once.
+
+    Expected JSON payload:
+    {
+        "profiles": [{"age": int, "income": float, "investment_period": int}, ...],
+        "seed": int   # optional, makes the padding of short baskets reproducible
+    }
+    Every profile is ranked like a single `recommend_stocks` request.
+    Returns {"results": [...]} aligned with `profiles`; each entry holds either
+    `recommended_stocks` or a per-profile `error`.
+    """
+    if request.method != "POST":
+        return error_response("Only POST method allowed.", status=405)
+
+    try:
+        with span("parse"):
+            data = BATCH_SCHEMA(load_body(request))
+    except (DecodeError, SchemaError) as e:
+        return error_response(e)
+    profiles, seed = data["profiles"], data["seed"]
+
+    try:
+        with span("universe"):
+            universe = get_universe()
+    except Exception as e:
+        return error_response(f"Error loading CSV file: {e}", status=500)
+
+    with span("rank"):
+        results = recommend_batch(profiles, universe, REAL_COMPANIES, seed=seed)
+    with span("render"):
+        return JsonResponse({"results": results})
+
+
+# Async twins for ASGI (see urls.py): each blocking view (CSV/database I/O)
+# runs on the shared I/O thread pool so one worker can serve many at once
+json_to_csv_async = csrf_exempt(offload_view(json_to_csv))
+recommend_stocks_async = csrf_exempt(offload_view(
+    recommend_stocks, timeout=getattr(settings, "STOCK_VIEW_TIMEOUT", None),
+))
+recommend_stocks_batch_async = csrf_exempt(offload_view(
+    recommend_stocks_batch, timeout=getattr(settings, "STOCK_VIEW_TIMEOUT", None),
+))
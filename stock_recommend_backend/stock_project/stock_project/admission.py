@@ -0,0 +1,299 @@
+"""
+Admission control for the expensive endpoints.
+
+Requests whose path falls in one of ADMISSION_CONTROL['CLASSES'] must take
+one of that class's concurrency slots before reaching the view. When all
+slots are busy they wait in a bounded FIFO queue for at most QUEUE_TIMEOUT
+seconds; a full queue or a timed-out wait sheds the request with a 503 and
+a Retry-After header, so a spike is turned away early instead of queueing
+behind CPU-bound work. Paths outside every class are never held back.
+
+With an SLO (seconds) a class also adapts its limit: after every WINDOW
+completed requests the SLO_PERCENTILE latency (queue wait included) is
+compared with the SLO; a breach cuts the limit by a quarter (down to
+MIN_CONCURRENCY), otherwise it grows back by one slot up to
+MAX_CONCURRENCY. Limits are per worker process.
+"""
+import asyncio
+import collections
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .codec import error_response
+
+BUSY = "Server is busy. Please retry later."
+
+# Multiplicative decrease applied to the limit when the SLO is breached
+BACKOFF = 0.75
+
+
+class _Waiter:
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(self, loop=None):
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class ConcurrencyLimiter:
+    """
+    Slots and a bounded wait queue for one endpoint class. A released slot
+    is handed straight to the oldest waiter, so queued requests are
+    admitted in arrival order. Sync and async callers share one queue.
+    """
+
+    def __init__(self, name, max_concurrency, max_queue=0, queue_timeout=1.0, slo=None,
+                 slo_percentile=95, window=50, min_concurrency=1, retry_after=1):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.limit = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.slo = slo
+        self.slo_percentile = slo_percentile
+        self.window = window
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "timeout": 0}
+        self._waiters = collections.deque()
+        self._latencies = []
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, waiter):
+        # Under the lock: take a free slot, queue `waiter`, or shed
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.shed["queue_full"] += 1
+            return False
+        self._waiters.append(waiter)
+        return None
+
+    def _leave(self, waiter, reason=None):
+        # Give up waiting; returns True if the slot was granted meanwhile
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            if reason:
+                self.shed[reason] += 1
+            return False
+
+    def acquire(self):
+        """Take a slot, waiting up to queue_timeout. Returns False when shed."""
+        waiter = _Waiter()
+        with self._lock:
+            admitted = self._try_acquire(waiter)
+        if admitted is not None:
+            return admitted
+        if waiter.event.wait(self.queue_timeout):
+            return True
+        return self._leave(waiter, "timeout")
+
+    async def aacquire(self):
+        """`acquire` for coroutines: waits on the event loop, not a thread."""
+        waiter = _Waiter(asyncio.get_running_loop())
+        with self._lock:
+            admitted = self._try_acquire(waiter)
+        if admitted is not None:
+            return admitted
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._leave(waiter, "timeout")
+        except asyncio.CancelledError:
+            # The client went away while queued: do not strand a granted slot
+            if self._leave(waiter):
+                self.release()
+            raise
+
+    def release(self, latency=None):
+        """Free a slot and record the request's latency (seconds) for the SLO."""
+        with self._lock:
+            self.in_flight -= 1
+            if latency is not None and self.slo is not None:
+                self._record(latency)
+            self._grant()
+
+    def _grant(self):
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self.in_flight += 1
+            self.admitted += 1
+            waiter.wake()
+
+    def _record(self, latency):
+        self._latencies.append(latency)
+        if len(self._latencies) < self.window:
+            return
+        latencies = sorted(self._latencies)
+        self._latencies = []
+        observed = latencies[min(len(latencies) - 1, int(len(latencies) * self.slo_percentile / 100))]
+        if observed > self.slo:
+            self.limit = max(self.min_concurrency, int(self.limit * BACKOFF))
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "queued": len(self._waiters),
+                "limit": self.limit,
+                "max_concurrency": self.max_concurrency,
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+            }
+
+
+class AdmissionController:
+    """The ConcurrencyLimiter of each endpoint class, matched by path prefix."""
+
+    def __init__(self, classes, retry_after=1):
+        self.limiters = {}
+        self._prefixes = []
+        for name, config in classes.items():
+            self.limiters[name] = ConcurrencyLimiter(
+                name,
+                max_concurrency=config["MAX_CONCURRENCY"],
+                max_queue=config.get("MAX_QUEUE", 0),
+                queue_timeout=config.get("QUEUE_TIMEOUT", 1.0),
+                slo=config.get("SLO"),
+                slo_percentile=config.get("SLO_PERCENTILE", 95),
+                window=config.get("WINDOW", 50),
+                min_concurrency=config.get("MIN_CONCURRENCY", 1),
+                retry_after=config.get("RETRY_AFTER", retry_after),
+            )
+            self._prefixes += [(prefix, self.limiters[name]) for prefix in config["PATHS"]]
+        # Longest prefix wins
+        self._prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+
+    def limiter_for(self, path):
+        for prefix, limiter in self._prefixes:
+            if path.startswith(prefix):
+                return limiter
+        return None
+
+    def render(self):
+        """Per-class gauges and shed counters in the Prometheus text format."""
+        stats = {name: limiter.stats() for name, limiter in sorted(self.limiters.items())}
+        lines = []
+        for metric, key, help_text in (
+            ("admission_in_flight", "in_flight", "Requests holding a slot."),
+            ("admission_queued", "queued", "Requests waiting for a slot."),
+            ("admission_limit", "limit", "Current concurrency limit (adapted to the SLO)."),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            lines += [f'{metric}{{class="{name}"}} {s[key]}' for name, s in stats.items()]
+        lines += ["# HELP admission_shed_total Requests rejected with 503.", "# TYPE admission_shed_total counter"]
+        for name, s in stats.items():
+            lines += [f'admission_shed_total{{class="{name}",reason="{reason}"}} {count}'
+                      for reason, count in s["shed"].items()]
+        return "".join(line + "\n" for line in lines)
+
+
+def get_admission_config():
+    return getattr(settings, "ADMISSION_CONTROL", {})
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """Return the process-wide AdmissionController, or None when it is off."""
+    global _controller
+    config = get_admission_config()
+    if not config.get("ENABLED", False):
+        return None
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(config.get("CLASSES", {}), config.get("RETRY_AFTER", 1))
+    return _controller
+
+
+def reset_admission_controller():
+    """Drop all limiters so settings changes take effect (tests)."""
+    global _controller
+    with _controller_lock:
+        _controller = None
+
+
+def shed_response(limiter):
+    response = error_response(BUSY, status=503)
+    response["Retry-After"] = str(limiter.retry_after)
+    # Shed requests are counted on /metrics; skip django.request's per-503 error log
+    response._has_been_logged = True
+    return response
+
+
+class AdmissionMiddleware:
+    """
+    Applies the AdmissionController to every request. Works under WSGI and
+    ASGI; place it after CorsMiddleware so 503s still carry CORS headers.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if get_admission_controller() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _limiter(self, request):
+        controller = get_admission_controller()
+        return controller.limiter_for(request.path_info) if controller is not None else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        limiter = self._limiter(request)
+        if limiter is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        if not limiter.acquire():
+            return shed_response(limiter)
+        try:
+            return self.get_response(request)
+        finally:
+            limiter.release(time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        limiter = self._limiter(request)
+        if limiter is None:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        if not await limiter.aacquire():
+            return shed_response(limiter)
+        try:
+            return await self.get_response(request)
+        finally:
+            limiter.release(time.perf_counter() - started)
@@ -0,0 +1,118 @@
+"""
+Shared JSON codec for the API views.
+
+Uses orjson when it is installed (several times faster than the stdlib on
+large batch bodies, and it serializes NumPy scalars and arrays natively),
+otherwise falls back to `json` with an encoder that converts NumPy values.
+Either way `loads` raises DecodeError, NaN and infinities are encoded as
+null and `JsonResponse` produces the same payloads, so views do not depend
+on which backend is active. orjson is listed in requirements-optional.txt.
+"""
+import json
+
+import numpy as np
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+INVALID_JSON = "Invalid JSON input."
+
+
+class DecodeError(ValueError):
+    """Raised when a request body is not valid UTF-8 JSON."""
+
+    def __init__(self, message=INVALID_JSON):
+        super().__init__(message)
+
+
+class NumpyJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder that also converts NumPy scalars and arrays."""
+
+    def default(self, o):
+        if isinstance(o, np.generic):
+            return o.item()
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        return super().default(o)
+
+
+_fallback_encoder = NumpyJSONEncoder()
+
+
+def _finite(obj):
+    """Copy of `obj` with NaN and infinities (NumPy ones included) replaced by None."""
+    if isinstance(obj, np.ndarray):
+        obj = obj.tolist()
+    elif isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float):
+        return obj if np.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def _json_loads(data):
+    """Decode JSON from bytes or str. Raises DecodeError."""
+    try:
+        return json.loads(data)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise DecodeError()
+
+
+def _json_dumps(obj):
+    """Encode to UTF-8 JSON bytes; NaN and infinities become null."""
+    try:
+        encoded = json.dumps(obj, cls=NumpyJSONEncoder, separators=(",", ":"), allow_nan=False)
+    except ValueError:
+        # Only payloads holding NaN or an infinity pay for the rewrite
+        encoded = json.dumps(_finite(obj), cls=NumpyJSONEncoder, separators=(",", ":"), allow_nan=False)
+    return encoded.encode()
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _orjson_loads(data):
+        """Decode JSON from bytes or str. Raises DecodeError."""
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            raise DecodeError()
+
+    def _orjson_dumps(obj):
+        """Encode to UTF-8 JSON bytes; NaN and infinities become null."""
+        return orjson.dumps(obj, default=_fallback_encoder.default, option=_OPTIONS)
+
+    loads, dumps = _orjson_loads, _orjson_dumps
+else:
+    loads, dumps = _json_loads, _json_dumps
+
+
+def load_body(request):
+    """Decode a request's JSON body. Raises DecodeError."""
+    return loads(request.body)
+
+
+class JsonResponse(HttpResponse):
+    """
+    Drop-in for django.http.JsonResponse that encodes with `dumps`. As
+    there, only dicts are accepted unless `safe` is False.
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
+
+
+def error_response(error, status=400):
+    """The {"error": message} body every API view uses for client errors."""
+    return JsonResponse({"error": str(error)}, status=status)
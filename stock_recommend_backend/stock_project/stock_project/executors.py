@@ -0,0 +1,117 @@
+"""
+Shared executors for the async (ASGI) views.
+
+Under ASGI Django runs every sync view on one shared thread, so a view
+blocked on file or database I/O holds up all the others. The async views
+instead hand blocking work to a bounded thread pool (I/O) or a process
+pool (CPU-bound work such as TextBlob), each leg with its own timeout.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from .codec import error_response
+
+_io_executor = None
+_cpu_executor = None
+_lock = threading.Lock()
+
+
+def _config():
+    return getattr(settings, "ASYNC_EXECUTORS", {})
+
+
+def get_io_executor():
+    """Process-wide thread pool for blocking I/O (ASYNC_EXECUTORS['IO_THREADS'])."""
+    global _io_executor
+    if _io_executor is None:
+        with _lock:
+            if _io_executor is None:
+                _io_executor = ThreadPoolExecutor(
+                    max_workers=_config().get("IO_THREADS", 32), thread_name_prefix="async-io",
+                )
+    return _io_executor
+
+
+def get_cpu_executor():
+    """
+    Process-wide process pool for CPU-bound work, or None when
+    ASYNC_EXECUTORS['CPU_WORKERS'] is 0 (work then stays on the I/O pool).
+    """
+    global _cpu_executor
+    workers = _config().get("CPU_WORKERS", 0)
+    if not workers:
+        return None
+    if _cpu_executor is None:
+        with _lock:
+            if _cpu_executor is None:
+                _cpu_executor = ProcessPoolExecutor(max_workers=workers)
+    return _cpu_executor
+
+
+def _with_fresh_connections(func, *args, **kwargs):
+    # Pool threads outlive requests, so apply the request-cycle connection rules here
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_io(func, *args, timeout=None, **kwargs):
+    """
+    Run a blocking call on the I/O pool, in a copy of the caller's context
+    (so request-scoped state such as timing spans follows it). Raises
+    TimeoutError after `timeout` seconds; the thread finishes in the
+    background.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(
+        get_io_executor(), functools.partial(context.run, _with_fresh_connections, func, *args, **kwargs),
+    )
+    return await asyncio.wait_for(future, timeout)
+
+
+async def gather_legs(legs, timeouts):
+    """
+    Await independent legs ({name: awaitable}) concurrently, each bounded
+    by timeouts[name] (seconds, None for no limit). Returns (values, errors):
+    a leg that times out or raises gets value None and an error message,
+    so callers can still answer with the legs that finished.
+    """
+    names = list(legs)
+    outcomes = await asyncio.gather(
+        *(asyncio.wait_for(legs[name], timeouts.get(name)) for name in names),
+        return_exceptions=True,
+    )
+    values, errors = {}, {}
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            values[name] = None
+            errors[name] = f"Timed out after {timeouts.get(name)}s."
+        elif isinstance(outcome, Exception):
+            values[name] = None
+            errors[name] = str(outcome)
+        else:
+            values[name] = outcome
+    return values, errors
+
+
+def offload_view(view, timeout=None):
+    """
+    Async twin of a blocking sync view: the whole view runs on the I/O pool
+    and the event loop stays free. Answers 504 after `timeout` seconds.
+    """
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        try:
+            return await run_io(view, request, *args, timeout=timeout, **kwargs)
+        except asyncio.TimeoutError:
+            return error_response(f"Request timed out after {timeout}s.", status=504)
+
+    return async_view
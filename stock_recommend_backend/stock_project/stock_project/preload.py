@@ -0,0 +1,57 @@
+"""
+Preloading for pre-forking servers.
+
+`preload_master()` runs in the master before workers are forked: it loads
+the risk model (publishing its compiled trees to shared memory when
+SHARED_ARRAYS is enabled), the stock universe, the indicator state and the
+sentiment analyzer once, then freezes the garbage collector so those
+objects stay in pages the workers share copy-on-write. `after_fork()`
+runs in every worker. See gunicorn.conf.py for the wiring.
+
+What is shared, and how:
+
+- risk model trees: SharedArrays (stock_project.shared) when SHARED_ARRAYS
+  is enabled, otherwise copy-on-write after the fork
+- OHLCV store (ai_analysis.store) and risk grid: .npy files opened with
+  mmap_mode='r', so workers share the page cache however they are started
+- stock universe and indicator state: Python objects, shared copy-on-write
+  only, so only with a forking master. The universe is a small table of
+  ticker and company-name strings and the indicator state is one MA window
+  of closes. Neither goes through SharedArrays; a worker that reloads them
+  after an ingest or append holds a private copy.
+"""
+import gc
+import logging
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def preload_master():
+    """Load every dataset a worker needs, once, in the forking process."""
+    from ai_analysis.indicators import get_indicator_store
+    from ai_analysis.sentiment import warm_up as warm_up_sentiment
+    from riskpredictor.registry import get_registry
+    from stock_app.ingest import warm_up as warm_up_ingest
+    from stock_app.universe import get_universe
+
+    get_registry().warm_up()
+    get_universe()
+    warm_up_ingest()
+    warm_up_sentiment()
+    try:
+        get_indicator_store().state()
+    except Exception:
+        logger.warning('Could not preload the indicator store.', exc_info=True)
+    # Database connections must not be inherited by the workers
+    connections.close_all()
+    # Move everything loaded so far out of the collector's reach: its passes
+    # would otherwise write to every object header and unshare the pages
+    gc.collect()
+    gc.freeze()
+
+
+def after_fork():
+    """Per-worker setup after the fork."""
+    connections.close_all()
@@ -0,0 +1,234 @@
+"""
+On-demand profiling of single requests.
+
+A request is profiled when it carries a valid signed X-Profile header or
+falls in REQUEST_PROFILING['SAMPLE_RATE'], and only when its view belongs
+to one of APPS. The view runs under cProfile and two files land in PATH,
+named after the request:
+
+    <stem>.prof       cProfile stats (python -m pstats, snakeviz, ...)
+    <stem>.collapsed  "frame;frame;frame microseconds" lines for
+                      flamegraph.pl / speedscope
+
+The collapsed stacks are derived from cProfile's caller/callee edges, so
+a function reached by several paths has its time split in proportion to
+its callers; exact for tree-shaped call graphs, an approximation
+otherwise. Only the newest MAX_FILES profiles are kept. The response
+names its profile in an X-Profile-Id header.
+
+Tokens come from `make_profile_token()`:
+
+    python manage.py shell -c "from stock_project.profiling import make_profile_token; print(make_profile_token())"
+
+With ENABLED off the middleware removes itself; when it is on, a request
+that is not profiled costs one header lookup (plus a random() call when
+SAMPLE_RATE is set). Only one request per process is profiled at a
+time; a request sampled while another is being profiled is served
+unprofiled. Under ASGI only the event-loop thread is profiled: work the
+async views hand to executor threads is not in the profile, and other
+requests interleaving on the loop are.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+SALT = "stock_project.profiling"
+TOKEN_VALUE = "profile"
+
+_write_lock = threading.Lock()
+
+# Held while a request is being profiled. One profiler at a time: on the
+# ASGI event loop overlapping requests would share a thread, and from
+# Python 3.12 a second enabled profiler raises ValueError
+_active = threading.Lock()
+
+
+def get_profiling_config():
+    return getattr(settings, "REQUEST_PROFILING", {})
+
+
+def make_profile_token():
+    """A value for the X-Profile header, valid for TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=SALT).sign(TOKEN_VALUE)
+
+
+def valid_token(value, max_age):
+    try:
+        return signing.TimestampSigner(salt=SALT).unsign(value, max_age=max_age) == TOKEN_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name  # built-ins, e.g. <method 'append' of 'list' objects>
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(stats, max_depth=64):
+    """
+    Collapse a pstats.Stats into {"a;b;c": microseconds of self time}.
+    Each function's time along a path is split among its callees by the
+    cumulative time recorded on each caller -> callee edge.
+    """
+    entries = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    stacks = {}
+
+    def walk(func, path, share, on_path):
+        _, _, tt, ct, _ = entries[func]
+        path = f"{path};{_label(func)}" if path else _label(func)
+        if ct <= 0:
+            return
+        own = share * min(tt / ct, 1.0)
+        if own > 0:
+            stacks[path] = stacks.get(path, 0.0) + own
+        if len(on_path) >= max_depth:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            if callee in on_path or callee not in entries:
+                continue
+            walk(callee, path, share * min(edge_ct / ct, 1.0), on_path | {callee})
+
+    for func, (_, _, _, ct, callers) in entries.items():
+        if not callers:
+            walk(func, "", ct, frozenset([func]))
+    return {path: int(round(seconds * 1e6)) for path, seconds in stacks.items() if seconds * 1e6 >= 0.5}
+
+
+def profile_stem(request):
+    endpoint = request.path_info.strip("/").replace("/", "_") or "root"
+    now = time.time_ns()
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now // 10**9))
+    return f"{stamp}.{now % 10**9:09d}-{os.getpid()}-{request.method}-{endpoint}"
+
+
+def write_profile(profiler, directory, stem, max_files):
+    """Write `<stem>.prof` and `<stem>.collapsed`, then drop the oldest profiles."""
+    os.makedirs(directory, exist_ok=True)
+    profiler.create_stats()
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(os.path.join(directory, f"{stem}.prof"))
+    lines = sorted(f"{path} {micros}" for path, micros in collapsed_stacks(stats).items())
+    with open(os.path.join(directory, f"{stem}.collapsed"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    with _write_lock:
+        # Stems start with a timestamp, so name order is age order
+        stems = sorted({name.rsplit(".", 1)[0] for name in os.listdir(directory) if name.endswith(".prof")})
+        for old in stems[:max(len(stems) - max_files, 0)]:
+            for suffix in (".prof", ".collapsed"):
+                try:
+                    os.remove(os.path.join(directory, old + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles sampled requests to views of REQUEST_PROFILING['APPS']. Place
+    it last in MIDDLEWARE so the profile covers the view and little else.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = get_profiling_config()
+        if not config.get("ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config.get("SAMPLE_RATE", 0.0)
+        # HTTP header name -> its request.META key
+        self.meta_key = "HTTP_" + config.get("HEADER", "X-Profile").upper().replace("-", "_")
+        self.max_age = config.get("TOKEN_MAX_AGE", 3600)
+        self.apps = tuple(config.get("APPS", ()))
+        self.directory = str(config.get("PATH") or os.path.join(settings.BASE_DIR, "data", "profiles"))
+        self.max_files = config.get("MAX_FILES", 50)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self, request):
+        token = request.META.get(self.meta_key)
+        if token is not None:
+            return valid_token(token, self.max_age)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _profiles_view(self, request):
+        try:
+            module = resolve(request.path_info).func.__module__
+        except Resolver404:
+            return False
+        return module.split(".")[0] in self.apps
+
+    def _start(self, request):
+        """
+        An enabled profiler for `request`, or None when it is not sampled
+        or another profile is in progress. Holds `_active` until `_stop`.
+        """
+        if not (self._sampled(request) and self._profiles_view(request)):
+            return None
+        if not _active.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger's) is already active
+            _active.release()
+            logger.warning("Could not start profiling %s.", request.path_info, exc_info=True)
+            return None
+        return profiler
+
+    def _stop(self, profiler):
+        try:
+            profiler.disable()
+        finally:
+            _active.release()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profiler = self._start(request)
+        if profiler is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self._stop(profiler)
+        return self._finish(request, response, profiler)
+
+    async def __acall__(self, request):
+        profiler = self._start(request)
+        if profiler is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._stop(profiler)
+        return self._finish(request, response, profiler)
+
+    def _finish(self, request, response, profiler):
+        stem = profile_stem(request)
+        try:
+            write_profile(profiler, self.directory, stem, self.max_files)
+        except OSError:
+            logger.warning("Could not write profile %s.", stem, exc_info=True)
+            return response
+        response["X-Profile-Id"] = stem
+        return response
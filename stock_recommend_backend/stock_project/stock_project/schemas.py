@@ -0,0 +1,173 @@
+"""
+Typed request schemas compiled to plain Python validators.
+
+A Schema lists its Fields once; `compile()` turns them into a single
+generated function (as namedtuple and dataclasses do) that reads each key
+once and checks it with straight-line code. No per-field dispatch or
+reflection runs per request, which matters for batch bodies that validate
+thousands of objects.
+
+    PROFILE = Schema([Field("age", "int"), ...], object_error=..., error=ProfileError)
+    age, income, period = PROFILE(data)
+
+Every failure raises `error` (a SchemaError subclass) carrying the message
+the view returns with a 400.
+"""
+import math
+import numbers
+
+MISSING = object()
+
+# Field kinds:
+#   number  JSON number (not bool), finite; kept as is
+#   string  str
+#   int     anything int() accepts ("42", 42.9 -> 42)
+#   float   anything float() accepts
+#   count   non-negative int (not bool)
+#   list    list, optionally of `items` ("string") and min/max length
+KINDS = ("number", "string", "int", "float", "count", "list")
+
+
+class SchemaError(ValueError):
+    """Raised when a payload does not match its schema."""
+
+
+def _is_number(value):
+    return not isinstance(value, bool) and isinstance(value, numbers.Real) and math.isfinite(value)
+
+
+class Field:
+    """
+    One key of a payload object.
+
+    `error` is the message for a wrong type or shape (formatted with
+    {name}); `limit_error` the one for gt/ge/max_items violations. A field
+    that is not `required` takes `default` when it is absent or null. `key`
+    renames the field in dict output.
+    """
+
+    def __init__(self, name, kind, required=True, default=None, key=None, error=None,
+                 gt=None, ge=None, items=None, min_items=None, max_items=None, limit_error=None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown field kind {kind!r}.")
+        self.name = name
+        self.kind = kind
+        self.required = required
+        self.default = default
+        self.key = key or name
+        self.error = (error or "Invalid value for {name}.").format(name=name)
+        self.gt = gt
+        self.ge = ge
+        self.items = items
+        self.min_items = min_items
+        self.max_items = max_items
+        self.limit_error = (limit_error or self.error).format(name=name, max_items=max_items)
+
+
+class Schema:
+    """
+    A JSON object schema. Calling it validates `data` and returns a dict
+    keyed by each field's `key` (output="dict") or a tuple in field order
+    (output="tuple").
+
+    `object_error` is raised when `data` is not an object and
+    `missing_error` when a required field is absent or null (without it
+    that field's own error is used). Fields are checked in order, so the
+    first failing field decides the message.
+    """
+
+    def __init__(self, fields, object_error, missing_error=None, error=SchemaError, output="dict"):
+        self.fields = list(fields)
+        self.object_error = object_error
+        self.missing_error = missing_error
+        self.error = error
+        self.output = output
+        self.validate = self.compile()
+
+    def __call__(self, data):
+        return self.validate(data)
+
+    def compile(self):
+        namespace = {
+            "_Error": self.error, "_is_number": _is_number, "_isfinite": math.isfinite,
+            "_object_error": self.object_error, "_missing_error": self.missing_error,
+        }
+        lines = [
+            "def validate(data):",
+            "    if not isinstance(data, dict):",
+            "        raise _Error(_object_error)",
+        ]
+        names = []
+        for i, field in enumerate(self.fields):
+            v = f"v{i}"
+            names.append(v)
+            namespace[f"_e{i}"] = field.error
+            namespace[f"_l{i}"] = field.limit_error
+            namespace[f"_d{i}"] = field.default
+            lines.append(f"    {v} = data.get({field.name!r})")
+
+        required = [(names[i], i) for i, field in enumerate(self.fields) if field.required]
+        if required and self.missing_error is not None:
+            condition = " or ".join(f"{v} is None" for v, _ in required)
+            lines += [f"    if {condition}:", "        raise _Error(_missing_error)"]
+
+        for i, field in enumerate(self.fields):
+            lines += self._field_lines(field, names[i], i)
+
+        if self.output == "tuple":
+            lines.append(f"    return ({', '.join(names)},)")
+        else:
+            items = ", ".join(f"{field.key!r}: {names[i]}" for i, field in enumerate(self.fields))
+            lines.append(f"    return {{{items}}}")
+
+        exec("\n".join(lines), namespace)
+        return namespace["validate"]
+
+    def _field_lines(self, field, v, i):
+        out = []
+        if field.required:
+            if self.missing_error is None:
+                out += [f"    if {v} is None:", f"        raise _Error(_e{i})"]
+            body = "    "
+        elif field.default is not None:
+            out += [f"    if {v} is None:", f"        {v} = _d{i}"]
+            body = "    "
+        else:
+            # Optional without default: only check a value that was sent
+            out.append(f"    if {v} is not None:")
+            body = "        "
+
+        if field.kind == "number":
+            out += [
+                f"{body}if not (({v}.__class__ is int) or ({v}.__class__ is float and _isfinite({v}))"
+                f" or _is_number({v})):",
+                f"{body}    raise _Error(_e{i})",
+            ]
+        elif field.kind == "string":
+            out += [f"{body}if not isinstance({v}, str):", f"{body}    raise _Error(_e{i})"]
+        elif field.kind in ("int", "float"):
+            out += [
+                f"{body}try:",
+                f"{body}    {v} = {field.kind}({v})",
+                f"{body}except (TypeError, ValueError, OverflowError):",
+                f"{body}    raise _Error(_e{i}) from None",
+            ]
+        elif field.kind == "count":
+            out += [
+                f"{body}if {v}.__class__ is not int or {v} < 0:",
+                f"{body}    raise _Error(_e{i})",
+            ]
+        elif field.kind == "list":
+            out += [f"{body}if not isinstance({v}, list):", f"{body}    raise _Error(_e{i})"]
+            if field.min_items:
+                out += [f"{body}if len({v}) < {int(field.min_items)}:", f"{body}    raise _Error(_e{i})"]
+            if field.items == "string":
+                out += [f"{body}if not all(isinstance(x, str) for x in {v}):", f"{body}    raise _Error(_e{i})"]
+            if field.max_items is not None:
+                out += [f"{body}if len({v}) > {int(field.max_items)}:", f"{body}    raise _Error(_l{i})"]
+
+        if field.gt is not None:
+            out += [f"{body}if not {v} > {field.gt!r}:", f"{body}    raise _Error(_l{i})"]
+        if field.ge is not None:
+            out += [f"{body}if not {v} >= {field.ge!r}:", f"{body}    raise _Error(_l{i})"]
+        return out
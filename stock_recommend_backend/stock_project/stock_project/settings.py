@@ -32,10 +32,13 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'stock_app',      # Your custom app
     'riskpredictor',  # Your risk predictor app
+    'ai_analysis',
 ]
 
 MIDDLEWARE = [
-    'corsheaders.middleware.CorsMiddleware',  # CORS middleware added at the top
+    'stock_project.timing.RequestTimingMiddleware',  # first, so its total covers the rest
+    'corsheaders.middleware.CorsMiddleware',  # ahead of everything that can answer, so responses carry CORS headers
+    'stock_project.admission.AdmissionMiddleware',  # after CORS, so 503s keep CORS headers
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,6 +46,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'stock_project.profiling.RequestProfilingMiddleware',  # last, so profiles cover the view
 ]
 
 ROOT_URLCONF = 'stock_project.urls'
@@ -114,3 +118,196 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:8000",
     "http://localhost:5173",
 ]
+
+# Stock universe: the stock_app.Stock table is the source of truth. The CSV is
+# an optional export of it, and is read by /api/recommend/ while the table is empty.
+STOCK_UNIVERSE_CSV = BASE_DIR / "stock_project" / "data" / "stocks_output.csv"
+STOCK_UNIVERSE_EXPORT_CSV = True
+# How often (seconds) each worker checks the table for changes
+STOCK_UNIVERSE_REFRESH_SECONDS = 1.0
+
+# Set to "asgi" by stock_project/asgi.py so URLconfs can route async views
+SERVER_INTERFACE = os.environ.get('DJANGO_SERVER_INTERFACE', 'wsgi')
+
+# Coalesce concurrent /risk/predict/ calls into one model.predict (opt-in)
+RISK_MICROBATCH = {
+    'ENABLED': False,
+    'MAX_BATCH_SIZE': 32,
+    'MAX_WAIT_MS': 2.0,
+}
+
+# Evaluate the risk model on NumPy arrays instead of pandas when it can be compiled
+RISK_COMPILED_INFERENCE = True
+
+# Memoize risk predictions. BACKEND is 'local' (per-process LRU) or the alias
+# of a cache in CACHES (e.g. a FileBasedCache) to share entries across workers.
+RISK_PREDICTION_CACHE = {
+    'ENABLED': True,
+    'BACKEND': 'local',
+    'MAX_ENTRIES': 10000,
+    'TTL': 3600,
+}
+
+# Heavy dependencies (pandas, textblob, the pickled model) load on first use,
+# so manage.py commands and autoreloads start fast. STARTUP_WARMUP makes each
+# app load and exercise them in AppConfig.ready instead, so the first request
+# after a worker boots is not slow; turn it on for server processes.
+STARTUP_WARMUP = False
+
+# Risk model registry. The model loads lazily on first use unless PRELOAD (or
+# STARTUP_WARMUP) is set; replacing either file hot-swaps a new version after a warm-up check.
+RISK_MODEL = {
+    'MODEL_PATH': BASE_DIR / 'riskpredictor' / 'model.pkl',
+    'PRODUCTS_PATH': BASE_DIR / 'riskpredictor' / 'insurance_products.json',
+    'PRELOAD': False,
+    'CHECK_INTERVAL': 5.0,
+}
+
+# ai_analysis: OHLCV history and the checkpoint of its incrementally
+# maintained indicators (rebuilt from the CSV whenever the CSV changes)
+AI_HISTORICAL_CSV = BASE_DIR / 'data' / 'historical_stock_data.csv'
+AI_INDICATOR_CHECKPOINT = BASE_DIR / 'data' / 'indicator_state.json'
+AI_MA_WINDOW = 50
+
+# Columnar, memory-mapped OHLCV bars for many tickers (see build_ohlcv_store).
+# AI_INDICATOR_LOOKBACK caps the bars read per ticker (None reads all of them;
+# EMA/RSI/ATR then match a computation over the full history).
+AI_OHLCV_STORE = BASE_DIR / 'data' / 'ohlcv'
+AI_INDICATOR_LOOKBACK = None
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Headline polarities: persistent across restarts, shared by workers and
+    # bounded by MAX_ENTRIES (Django culls the oldest third when full)
+    'sentiment': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'data' / 'sentiment_cache',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# ai_analysis news sentiment. CACHE is the CACHES alias polarities are kept in;
+# WORKERS > 0 scores batches of unseen headlines in a process pool.
+AI_SENTIMENT = {
+    'HEADLINES_FILE': BASE_DIR / 'data' / 'headlines.txt',
+    'CACHE': 'sentiment',
+    'BATCH_SIZE': 256,
+    'WORKERS': 0,
+}
+
+# Executors behind the async views served through asgi.py: a thread pool for
+# blocking I/O and, if CPU_WORKERS > 0, a process pool for CPU-bound work.
+ASYNC_EXECUTORS = {
+    'IO_THREADS': 32,
+    'CPU_WORKERS': 0,
+}
+
+# Per-leg timeouts (seconds) of the async ai_analysis views; a leg that runs
+# over is reported as missing instead of holding up the response.
+AI_LEG_TIMEOUTS = {
+    'trend_indicator': 2.0,
+    'news_sentiment': 5.0,
+}
+
+# Timeout (seconds) of the async stock_app recommendation views (None: no limit)
+STOCK_VIEW_TIMEOUT = 10.0
+
+# Precomputed /ai/analyze/, /ai/news/ and /ai/historical/ responses, served
+# with ETag/Last-Modified. A snapshot older than MAX_AGE seconds is recomputed
+# before it is served. Refreshing is left to `manage.py refresh_analysis_snapshot`;
+# REFRESH_INTERVAL instead runs a refresher thread in every worker (they take
+# turns through a file lock).
+AI_SNAPSHOT = {
+    'ENABLED': True,
+    'PATH': BASE_DIR / 'data' / 'analysis_snapshot.json',
+    'MAX_AGE': 300.0,
+    'REFRESH_INTERVAL': None,
+    'CHECK_INTERVAL': 1.0,
+}
+
+# Per-request timing spans (stock_project.timing). SAMPLE_RATE of requests
+# get their phases recorded into the /metrics histograms and, with
+# SERVER_TIMING_HEADER, reported in a Server-Timing response header.
+# Raise SAMPLE_RATE (up to 1.0) while investigating latency. ENABLED False
+# removes the middleware entirely.
+REQUEST_TIMING = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.01,
+    'SERVER_TIMING_HEADER': True,
+}
+
+# Large read-only arrays (the compiled risk model's trees) published as
+# memory-mapped .npy generations under PATH (None: /dev/shm/stock_project),
+# so every worker on the host maps one copy. Only the model uses it; see
+# stock_project.preload for how the other datasets are shared.
+SHARED_ARRAYS = {
+    'ENABLED': False,
+    'PATH': None,
+    'KEEP_GENERATIONS': 2,
+}
+
+# Precomputed risk lookup grid (riskpredictor.grid), built offline with
+# `manage.py build_risk_grid` and memory-mapped at runtime. Applicants whose
+# category combination was measured within TOLERANCE risk points of the
+# model, and whose numbers fall inside the grid, are answered by
+# interpolation; everyone else goes to the live model. A grid built for
+# another model version is ignored. A rebuilt grid is picked up within
+# CHECK_INTERVAL seconds (None: only at start).
+RISK_GRID = {
+    'ENABLED': False,
+    'PATH': BASE_DIR / 'data' / 'risk_grid',
+    'TOLERANCE': 1.0,
+    'CHECK_INTERVAL': 5.0,
+    # {column: (start, stop, points)} overrides of riskpredictor.grid.DEFAULT_AXES
+    'AXES': None,
+}
+
+# Admission control (stock_project.admission): requests under each class's
+# PATHS share MAX_CONCURRENCY slots per worker and wait in a queue of at most
+# MAX_QUEUE for QUEUE_TIMEOUT seconds before being shed with a 503 and
+# Retry-After. With an SLO (seconds) the limit adapts to the SLO_PERCENTILE
+# latency of every WINDOW requests. Other paths are never held back.
+ADMISSION_CONTROL = {
+    'ENABLED': False,
+    'RETRY_AFTER': 1,
+    'CLASSES': {
+        'risk': {
+            'PATHS': ['/risk/predict/'],
+            'MAX_CONCURRENCY': 8,
+            'MAX_QUEUE': 32,
+            'QUEUE_TIMEOUT': 1.0,
+            'SLO': 0.5,
+        },
+        'recommend': {
+            'PATHS': ['/api/recommend/'],
+            'MAX_CONCURRENCY': 8,
+            'MAX_QUEUE': 32,
+            'QUEUE_TIMEOUT': 1.0,
+            'SLO': 0.5,
+        },
+        'analysis': {
+            'PATHS': ['/ai/analyze/', '/ai/news/', '/ai/historical/'],
+            'MAX_CONCURRENCY': 4,
+            'MAX_QUEUE': 16,
+            'QUEUE_TIMEOUT': 2.0,
+            'SLO': 2.0,
+        },
+    },
+}
+
+# On-demand request profiling (stock_project.profiling). Requests to APPS
+# views that carry a signed HEADER token (see make_profile_token; valid for
+# TOKEN_MAX_AGE seconds) or fall in SAMPLE_RATE are run under cProfile; the
+# .prof and .collapsed files go to PATH, keeping the newest MAX_FILES.
+REQUEST_PROFILING = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.0,
+    'HEADER': 'X-Profile',
+    'TOKEN_MAX_AGE': 3600,
+    'APPS': ['stock_app', 'riskpredictor', 'ai_analysis'],
+    'PATH': BASE_DIR / 'data' / 'profiles',
+    'MAX_FILES': 50,
+}
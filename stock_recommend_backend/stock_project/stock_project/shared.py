@@ -0,0 +1,175 @@
+"""
+NumPy arrays shared between worker processes through memory-mapped files.
+
+A publisher writes a named set of arrays as .npy files into a new
+generation directory under SHARED_ARRAYS['PATH'] (tmpfs /dev/shm by
+default, so the files are shared memory) and atomically replaces the
+set's `current.json`. Every worker attaches with mmap_mode='r' and so maps
+the same physical pages: N workers cost one copy of the arrays, whether
+they were forked from a preloading master or started independently.
+
+Each publish bumps the set's generation counter; readers compare it on
+`attach()` and re-map when it changed. Older generation directories are
+removed after a publish. On POSIX a worker that still maps one keeps its
+pages until it re-attaches.
+
+The risk model registry is the only publisher. The other datasets are
+covered in stock_project.preload.
+"""
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+from django.conf import settings
+
+MANIFEST = "current.json"
+SHARED_FORMAT = 1
+
+
+def default_shared_path():
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "stock_project")
+
+
+def get_shared_config():
+    return getattr(settings, "SHARED_ARRAYS", {})
+
+
+def shared_arrays_enabled():
+    return get_shared_config().get("ENABLED", False)
+
+
+class SharedGeneration:
+    """One attached generation: read-only memmapped `arrays` plus JSON `meta`."""
+
+    def __init__(self, generation, source, arrays, meta):
+        self.generation = generation
+        self.source = source
+        self.arrays = arrays
+        self.meta = meta
+
+
+class SharedArrays:
+    """
+    The published generations of one named array set (e.g. "risk-model").
+    `source` identifies what the arrays were built from (a file
+    fingerprint), so a reader can tell whether they are current.
+    """
+
+    def __init__(self, root, name, keep_generations=2):
+        self.root = str(root)
+        self.name = name
+        self.path = os.path.join(self.root, name)
+        self.keep_generations = keep_generations
+        self._attached = None
+        self._lock = threading.Lock()
+
+    def _manifest(self):
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("format") == SHARED_FORMAT else None
+
+    def generation(self):
+        """The published generation number (0 when nothing is published)."""
+        manifest = self._manifest()
+        return manifest["generation"] if manifest else 0
+
+    def publish(self, arrays, meta, source):
+        """
+        Write `arrays` ({name: ndarray}) and `meta` (JSON-serializable) as
+        the next generation, built from `source`. Publishers are serialized
+        with a file lock; if another process already published `source`,
+        its generation is kept and returned.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            manifest = self._manifest()
+            if manifest and manifest["source"] == source:
+                return manifest["generation"]
+            generation = (manifest["generation"] if manifest else 0) + 1
+            directory = f"gen-{generation}"
+            tmp_dir = tempfile.mkdtemp(dir=self.path, prefix=".gen-")
+            try:
+                for key, array in arrays.items():
+                    np.save(os.path.join(tmp_dir, f"{key}.npy"), np.ascontiguousarray(array))
+                os.replace(tmp_dir, os.path.join(self.path, directory))
+            except BaseException:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+            fd, tmp_manifest = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({
+                    "format": SHARED_FORMAT, "generation": generation, "source": source,
+                    "directory": directory, "arrays": sorted(arrays), "meta": meta,
+                }, f)
+            os.replace(tmp_manifest, os.path.join(self.path, MANIFEST))
+            self._remove_old_generations(generation)
+        return generation
+
+    def _remove_old_generations(self, generation):
+        for entry in os.listdir(self.path):
+            if entry.startswith("gen-") and int(entry[4:]) <= generation - self.keep_generations:
+                shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+    def attach(self):
+        """
+        Map the current generation read-only, or return None if nothing is
+        published. Re-maps only when the generation changed.
+        """
+        manifest = self._manifest()
+        if manifest is None:
+            return None
+        attached = self._attached
+        if attached is not None and attached.generation == manifest["generation"]:
+            return attached
+        with self._lock:
+            directory = os.path.join(self.path, manifest["directory"])
+            try:
+                arrays = {
+                    key: np.load(os.path.join(directory, f"{key}.npy"), mmap_mode="r")
+                    for key in manifest["arrays"]
+                }
+            except OSError:
+                # Superseded and removed between reading the manifest and mapping it
+                return None
+            self._attached = SharedGeneration(manifest["generation"], manifest["source"], arrays, manifest["meta"])
+            return self._attached
+
+
+_sets = {}
+_sets_lock = threading.Lock()
+
+
+def get_shared_arrays(name):
+    """Return the process-wide SharedArrays for `name` (see SHARED_ARRAYS)."""
+    shared = _sets.get(name)
+    if shared is None:
+        with _sets_lock:
+            shared = _sets.get(name)
+            if shared is None:
+                config = get_shared_config()
+                shared = SharedArrays(
+                    config.get("PATH") or default_shared_path(), name,
+                    keep_generations=config.get("KEEP_GENERATIONS", 2),
+                )
+                _sets[name] = shared
+    return shared
+
+
+def reset_shared_arrays():
+    """Forget attached sets so settings changes take effect (tests)."""
+    with _sets_lock:
+        _sets.clear()
+
+
+def attached_generations():
+    """{name: generation} of the sets this process has attached."""
+    return {name: shared._attached.generation for name, shared in list(_sets.items()) if shared._attached}
@@ -0,0 +1,223 @@
+"""
+Per-request timing spans.
+
+Views wrap their phases in `span(name)`; `RequestTimingMiddleware` collects
+the spans of sampled requests into per-endpoint histograms, reports them
+in a `Server-Timing` header and `/metrics` serves the histograms in the
+Prometheus text format. Outside a sampled request `span()` returns a
+shared no-op context manager, and with REQUEST_TIMING['ENABLED'] off the
+middleware removes itself from the stack.
+"""
+import contextlib
+import contextvars
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import Histogram
+
+# Upper bounds in seconds, from sub-millisecond phases to slow requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Pseudo-phase holding the whole request (middleware included)
+TOTAL = "total"
+
+_current = contextvars.ContextVar("request_timings", default=None)
+_NOOP = contextlib.nullcontext()
+
+
+class RequestTimings:
+    """Span durations (seconds) of one request, in the order they started."""
+
+    def __init__(self):
+        self.spans = {}
+
+    def start(self, name):
+        self.spans.setdefault(name, 0.0)
+
+    def add(self, name, seconds):
+        self.spans[name] += seconds
+
+
+class _Span:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.timings.start(self.name)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timings.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def span(name):
+    """
+    Time a block as phase `name` of the current request. Repeated spans
+    with the same name add up. A no-op when the request is not sampled.
+    """
+    timings = _current.get()
+    if timings is None:
+        return _NOOP
+    return _Span(timings, name)
+
+
+class TimingRegistry:
+    """Histograms keyed by (method, endpoint, phase)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, key):
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, method, endpoint, spans):
+        for phase, seconds in spans.items():
+            self._histogram((method, endpoint, phase)).observe(seconds)
+
+    def render(self):
+        """All histograms in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self._histograms.items())
+        families = {
+            "http_request_duration_seconds": (
+                "Latency of sampled requests by endpoint.",
+                [(key, h) for key, h in items if key[2] == TOTAL],
+            ),
+            "http_request_phase_duration_seconds": (
+                "Time spent in each instrumented phase of sampled requests.",
+                [(key, h) for key, h in items if key[2] != TOTAL],
+            ),
+        }
+        lines = []
+        for name, (help_text, series) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, endpoint, phase), histogram in series:
+                labels = f'method="{_escape(method)}",endpoint="{_escape(endpoint)}"'
+                if phase != TOTAL:
+                    labels += f',phase="{_escape(phase)}"'
+                snapshot = histogram.snapshot()
+                for bound, count in snapshot["buckets"].items():
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {snapshot['sum']!r}")
+                lines.append(f"{name}_count{{{labels}}} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def get_timing_config():
+    return getattr(settings, "REQUEST_TIMING", {})
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_timing_registry():
+    """Return the process-wide TimingRegistry (buckets from REQUEST_TIMING)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TimingRegistry(get_timing_config().get("BUCKETS", DEFAULT_BUCKETS))
+    return _registry
+
+
+def reset_timing_registry():
+    """Drop all recorded histograms (tests)."""
+    global _registry
+    with _registry_lock:
+        _registry = None
+
+
+def endpoint_label(request):
+    """The matched URL pattern, so label cardinality stays bounded."""
+    match = getattr(request, "resolver_match", None)
+    if match is None or match.route is None:
+        return "unmatched"
+    return "/" + match.route
+
+
+def server_timing_header(spans):
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in spans.items())
+
+
+class RequestTimingMiddleware:
+    """
+    Samples REQUEST_TIMING['SAMPLE_RATE'] of requests: their spans (plus
+    `total`) are recorded and, with SERVER_TIMING_HEADER, returned in a
+    Server-Timing header. Works under WSGI and ASGI; place it first in
+    MIDDLEWARE so `total` covers the other middleware too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = get_timing_config()
+        if not config.get("ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config.get("SAMPLE_RATE", 0.01)
+        self.header = config.get("SERVER_TIMING_HEADER", True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    def _finish(self, request, response, timings, elapsed):
+        spans = {**timings.spans, TOTAL: elapsed}
+        get_timing_registry().observe(request.method, endpoint_label(request), spans)
+        if self.header:
+            response["Server-Timing"] = server_timing_header(spans)
+        return response
@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from . import views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('stock_app.urls')),
     path('risk/', include('riskpredictor.urls')),
     path('ai/', include('ai_analysis.urls')),        # API endpoints under /api/
+    path('metrics', views.metrics, name='metrics'),  # Prometheus scrape target
 ]
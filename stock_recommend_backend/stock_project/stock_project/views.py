@@ -0,0 +1,44 @@
+import os
+
+from django.http import HttpResponse
+
+from .admission import get_admission_controller
+from .metrics import process_memory
+from .shared import attached_generations
+from .timing import get_timing_registry
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def process_gauges():
+    """
+    Memory of the worker serving the scrape (each worker reports its own,
+    labelled by pid) and the shared-array generations it has attached.
+    """
+    lines = []
+    memory = process_memory()
+    if memory is not None:
+        pid = os.getpid()
+        for kind in ("rss", "pss", "uss"):
+            name = f"process_memory_{kind}_bytes"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f'{name}{{pid="{pid}"}} {memory[kind]}')
+    generations = attached_generations()
+    if generations:
+        lines.append("# TYPE shared_arrays_generation gauge")
+        for name, generation in sorted(generations.items()):
+            lines.append(f'shared_arrays_generation{{name="{name}"}} {generation}')
+    return "".join(line + "\n" for line in lines)
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint: request and phase latency histograms
+    recorded by RequestTimingMiddleware, per-worker memory gauges and,
+    when admission control is on, its per-class slots and shed counts.
+    """
+    body = get_timing_registry().render() + process_gauges()
+    controller = get_admission_controller()
+    if controller is not None:
+        body += controller.render()
+    return HttpResponse(body, content_type=PROMETHEUS_CONTENT_TYPE)